@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark the client's hot paths: message throughput for Synth creation and control
+changes, round-trip latency of Server.sync and Synth.get, and Buffer transfer rates.
+
+By default, runs against an in-process mock SC server, so that it measures the cost
+of the client (and the mock) rather than of audio processing. To run against a real
+scsynth, start the server, store the `sine` SynthDef (see CONTRIBUTING.md), and pass
+its port with --port.
+
+Usage:
+    python3 benchmarks/benchmark.py
+    python3 benchmarks/benchmark.py --port 57110 --count 5000
+"""
+
+import argparse
+import statistics
+import time
+
+from supercollider import Server, Synth, Group, Buffer
+from supercollider.mock import MockSCSynth
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+def percentiles(durations: list) -> dict:
+    """
+    Returns the 50th, 90th and 99th percentiles of a list of durations, in milliseconds.
+    """
+    quantiles = statistics.quantiles(durations, n=100)
+    return {"p50": quantiles[49] * 1000, "p90": quantiles[89] * 1000, "p99": quantiles[98] * 1000}
+
+def report_rate(name: str, count: int, duration: float, unit: str = "msgs/sec") -> None:
+    print("%-28s %12.1f %s" % (name, count / duration, unit))
+
+def report_latency(name: str, durations: list) -> None:
+    values = percentiles(durations)
+    print("%-28s  p50 %.3fms  p90 %.3fms  p99 %.3fms" % (name, values["p50"], values["p90"], values["p99"]))
+
+def benchmark_synths(server: Server, count: int) -> None:
+    group = Group(server)
+
+    t0 = time.perf_counter()
+    synths = [Synth(server, "sine", {"freq": 440.0, "gain": -96}, target=group) for _ in range(count)]
+    server.sync()
+    report_rate("Synth creation", count, time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    for n, synth in enumerate(synths):
+        synth.set("freq", 440.0 + n)
+    server.sync()
+    report_rate("Synth.set", count, time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    with server.bundle():
+        for n, synth in enumerate(synths):
+            synth.set("freq", 220.0 + n)
+    server.sync()
+    report_rate("Synth.set (bundled)", count, time.perf_counter() - t0)
+
+    group.free()
+    server.sync()
+
+def benchmark_latency(server: Server, count: int) -> None:
+    durations = []
+    for _ in range(count):
+        t0 = time.perf_counter()
+        server.sync()
+        durations.append(time.perf_counter() - t0)
+    report_latency("Server.sync", durations)
+
+    synth = Synth(server, "sine", {"freq": 440.0, "gain": -96})
+    durations = []
+    for _ in range(count):
+        t0 = time.perf_counter()
+        synth.get("freq")
+        durations.append(time.perf_counter() - t0)
+    report_latency("Synth.get", durations)
+    synth.free()
+
+def benchmark_buffers(server: Server, num_frames: int) -> None:
+    if np is None:
+        print("Skipping Buffer benchmarks: NumPy is not installed")
+        return
+
+    samples = np.random.uniform(-1, 1, num_frames).astype(np.float32)
+    megabytes = samples.nbytes / 1e6
+    buf = Buffer.alloc(server, num_frames)
+
+    t0 = time.perf_counter()
+    buf.set_array(samples)
+    server.sync()
+    report_rate("Buffer.set_array", megabytes, time.perf_counter() - t0, "MB/s")
+
+    t0 = time.perf_counter()
+    buf.get_array()
+    report_rate("Buffer.get_array", megabytes, time.perf_counter() - t0, "MB/s")
+    buf.free()
+
+    t0 = time.perf_counter()
+    buf = Buffer.from_array(server, samples)
+    report_rate("Buffer.from_array", megabytes, time.perf_counter() - t0, "MB/s")
+
+    t0 = time.perf_counter()
+    buf.to_array()
+    report_rate("Buffer.to_array", megabytes, time.perf_counter() - t0, "MB/s")
+    buf.free()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark python-supercollider")
+    parser.add_argument("--port", type=int, default=None, help="Port of a running scsynth (default: use a mock server)")
+    parser.add_argument("--count", type=int, default=2000, help="Number of messages or queries per benchmark")
+    parser.add_argument("--frames", type=int, default=1 << 18, help="Number of frames per Buffer transfer")
+    args = parser.parse_args()
+
+    mock = None
+    if args.port is None:
+        mock = MockSCSynth()
+        mock.add_synthdef("sine", {"out": 0.0, "freq": 440.0, "gain": 0.0})
+        port = mock.port
+        print("Benchmarking against a mock server")
+    else:
+        port = args.port
+        print("Benchmarking against the server on port %d" % port)
+
+    server = Server(port=port)
+    benchmark_synths(server, args.count)
+    benchmark_latency(server, args.count)
+    benchmark_buffers(server, args.frames)
+
+    if mock:
+        mock.close()
+
+if __name__ == "__main__":
+    main()
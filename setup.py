@@ -14,6 +14,7 @@ setup(
     url='https://github.com/ideoforms/supercollider',
     packages=['supercollider'],
     install_requires=['python-osc'],
+    extras_require={'numpy': ['numpy']},
     keywords=('sound', 'music', 'supercollider', 'synthesis'),
     classifiers=[
         'Topic :: Multimedia :: Sound/Audio',
@@ -1,20 +1,132 @@
-from . import globals
+from bisect import bisect_left
+from collections import deque
+from threading import Lock
 from .exceptions import SuperColliderAllocationError
 
 class Allocator:
-    def __init__(self, resource_name="generic"):
-        self.index = globals.ALLOCATOR_BUS_START_INDEX
+    def __init__(self, resource_name: str, start_index: int, capacity: int):
+        """
+        Allocates contiguous blocks of indices (e.g. bus channels or buffer numbers) from a
+        fixed range. Freed blocks are returned to a free list, in which adjacent blocks are
+        merged, so that the range can be reused indefinitely.
+
+        Args:
+            resource_name (str): The name of the resource, for error messages.
+            start_index (int): The first index in the range.
+            capacity (int): The number of indices in the range.
+        """
         self.resource_name = resource_name
-        self.capacity = globals.ALLOCATOR_BUS_CAPACITY
-
-    def allocate(self, channels):
-        if self.index <= globals.ALLOCATOR_BUS_START_INDEX + self.capacity - channels:
-            rv = self.index
-            self.index += channels
-            return rv
-        else:
-            raise SuperColliderAllocationError("No more %s resources available" % self.resource_name)
-
-    def free(self, index):
-        # TODO: Implement me
-        pass
+        self.start_index = start_index
+        self.capacity = capacity
+        self.lock = Lock()
+
+        # Sorted, non-adjacent (start, size) pairs of unallocated indices.
+        self.free_ranges = [(self.start_index, self.capacity)]
+
+        # Allocated blocks: start -> size
+        self.allocated = {}
+
+    def allocate(self, count: int = 1, split: bool = False) -> int:
+        """
+        Allocate a contiguous block of indices, using the first free range that is large enough.
+
+        Args:
+            count (int): The number of indices to allocate.
+            split (bool): If True, each index in the block is subsequently freed individually,
+                          rather than the whole block being freed by its first index.
+
+        Returns:
+            The first index of the block.
+
+        Raises:
+            SuperColliderAllocationError: If there is no free range large enough.
+        """
+        with self.lock:
+            for n, (start, size) in enumerate(self.free_ranges):
+                if size >= count:
+                    if size == count:
+                        del self.free_ranges[n]
+                    else:
+                        self.free_ranges[n] = (start + count, size - count)
+                    if split:
+                        for index in range(start, start + count):
+                            self.allocated[index] = 1
+                    else:
+                        self.allocated[start] = count
+                    return start
+
+        raise SuperColliderAllocationError("No more %s resources available" % self.resource_name)
+
+    def free(self, index: int) -> None:
+        """
+        Free the block starting at `index`, merging it with any adjacent free ranges.
+        Indices that are not allocated are ignored.
+        """
+        with self.lock:
+            count = self.allocated.pop(index, None)
+            if count is None:
+                return
+
+            start, end = index, index + count
+            n = bisect_left(self.free_ranges, (start,))
+            if n < len(self.free_ranges) and self.free_ranges[n][0] == end:
+                end += self.free_ranges[n][1]
+                del self.free_ranges[n]
+            if n > 0 and sum(self.free_ranges[n - 1]) == start:
+                n -= 1
+                start = self.free_ranges[n][0]
+                del self.free_ranges[n]
+            self.free_ranges.insert(n, (start, end - start))
+
+    @property
+    def num_free(self) -> int:
+        """
+        The number of unallocated indices.
+        """
+        return sum(size for _, size in self.free_ranges)
+
+class NodeIDAllocator:
+    def __init__(self, start_index: int, end_index: int = 2 ** 31):
+        """
+        Allocates node IDs. IDs are issued in increasing order until the range is exhausted,
+        and freed IDs are then reused, least-recently-freed first. This maximises the time
+        before an ID is reused, so that messages scheduled for a freed node cannot affect
+        a new node with the same ID.
+
+        Args:
+            start_index (int): The first ID to allocate.
+            end_index (int): One more than the last ID to allocate.
+        """
+        self.next_index = start_index
+        self.end_index = end_index
+        self.freed = deque()
+        self.allocated = set()
+        self.lock = Lock()
+
+    def allocate(self) -> int:
+        """
+        Returns:
+            A node ID that is not in use.
+
+        Raises:
+            SuperColliderAllocationError: If all IDs are in use.
+        """
+        with self.lock:
+            if self.next_index < self.end_index:
+                index = self.next_index
+                self.next_index += 1
+            elif self.freed:
+                index = self.freed.popleft()
+            else:
+                raise SuperColliderAllocationError("No more node IDs available")
+            self.allocated.add(index)
+            return index
+
+    def free(self, index: int) -> None:
+        """
+        Return a node ID for reuse. IDs that are not allocated are ignored.
+        """
+        with self.lock:
+            if index in self.allocated:
+                self.allocated.remove(index)
+                self.freed.append(index)
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+from .server import Server
+from .exceptions import SuperColliderConnectionError
+from . import globals
+from typing import Optional
+import asyncio
+import logging
+import socket
+
+logger = logging.getLogger(__name__)
+
+class _ServerProtocol(asyncio.DatagramProtocol):
+    def __init__(self, server: AsyncServer):
+        self.server = server
+
+    def datagram_received(self, data: bytes, address) -> None:
+        self.server.dispatcher.call_handlers_for_packet(data, address)
+
+    def error_received(self, exc: Exception) -> None:
+        logger.warning(f'OSC socket error: {exc}')
+
+class AsyncServer(Server):
+    def __init__(self, hostname: str = "127.0.0.1", port: int = 57110, latency: Optional[float] = None):
+        """
+        Create a new AsyncServer object, a local representation of a remote SuperCollider
+        server that is driven by an asyncio event loop rather than a listener thread.
+
+        Queries return awaitables, so any number of them can be in flight on a single
+        event loop. This applies to the Server's own queries (sync, get_status, get_version,
+        query_tree) and to the blocking queries of objects created on the server:
+
+            >>> server = await AsyncServer().connect()
+            >>> synth = Synth(server, "sine", {"freq": 440.0})
+            >>> await synth.get("freq")
+            440.0
+            >>> buf = await Buffer.alloc(server, 1024)
+            >>> await buf.get_info()
+            {'num_frames': 1024, 'num_channels': 1, 'sample_rate': 44100.0}
+
+        Commands that do not wait for a reply (e.g. Synth.set) are sent immediately and
+        return as normal.
+
+        The server must be connected with `connect()`, or used as an async context manager,
+        before use.
+
+        Args:
+            hostname (str): Hostname or IP address of the server
+            port (int): Port of the server
+            latency (float): If set, commands are scheduled to execute this many seconds after
+                             they are sent, so that they are not subject to timing jitter.
+        """
+        self._init_state(hostname, port, latency)
+        self.loop = None
+        self.transport = None
+
+    async def connect(self) -> AsyncServer:
+        """
+        Open the UDP endpoint and wait for the server to respond.
+
+        Returns:
+            The AsyncServer, to allow `server = await AsyncServer().connect()`.
+
+        Raises:
+            SuperColliderConnectionError: If the server does not respond.
+        """
+        self.loop = asyncio.get_running_loop()
+        self.transport, _ = await self.loop.create_datagram_endpoint(lambda: _ServerProtocol(self),
+                                                                     remote_addr=self.client_address)
+
+        # Many replies may arrive at once when queries are issued concurrently, so use a
+        # larger receive buffer than the OS default to avoid dropping them.
+        sock = self.transport.get_extra_info("socket")
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, globals.SOCKET_RECEIVE_BUFFER_SIZE)
+        await self.sync(timeout=self.response_timeout)
+        return self
+
+    def close(self) -> None:
+        """
+        Close the UDP endpoint.
+        """
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+
+    async def __aenter__(self) -> AsyncServer:
+        return await self.connect()
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    #--------------------------------------------------------------------------------
+    # Transport
+    #--------------------------------------------------------------------------------
+
+    def _send_dgram(self, dgram: bytes) -> None:
+        if self.transport is None:
+            raise SuperColliderConnectionError("AsyncServer is not connected. Call connect() first.")
+        self.transport.sendto(dgram)
+
+    def _create_future(self) -> asyncio.Future:
+        return self.loop.create_future()
+
+    def _start_auto_bundle(self, bundle, interval: float) -> None:
+        async def _flush_loop():
+            while self.auto_bundle is bundle:
+                await asyncio.sleep(interval)
+                bundle.flush()
+
+        self.loop.create_task(_flush_loop())
+
+    def _call_later(self, delay: float, callback) -> None:
+        self.loop.call_later(delay, callback)
+
+    def _run_callback(self, callback, *args) -> None:
+        # Replies are received on the event loop, from which callbacks can await queries.
+        callback(*args)
+
+    async def _await_response(self, future: asyncio.Future, timeout: Optional[float] = None):
+        grace = timeout is None
+        timeout = self._get_timeout(future, timeout)
+        self._flush_bundles()
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            pass
+        grace_period = self._get_grace_period(future) if grace else 0.0
+        try:
+            return await asyncio.wait_for(future, grace_period)
+        except asyncio.TimeoutError:
+            self._discard_timed_out(future)
+            raise SuperColliderConnectionError("Connection to SuperCollider server timed out. Is scsynth running?")
@@ -1,10 +1,18 @@
 from __future__ import annotations
-from . import globals
 from .globals import SAMPLE_FORMAT_FLOAT
 from .globals import HEADER_FORMAT_WAV
-from typing import TYPE_CHECKING, Callable
+from .wavfile import temporary_path, write_float_wav, read_float_wav
+from .exceptions import SuperColliderCommandError, SuperColliderConnectionError
+from typing import TYPE_CHECKING, Callable, Optional
+from collections import deque
+import time
 import os
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 if TYPE_CHECKING:
     from .server import Server
 
@@ -16,7 +24,8 @@ class Buffer:
         Creates a Buffer object, but does not allocate any memory for it. This constructor should only be used if
         you want to create an object to interface with an already-created buffer.
 
-        If the `id` passed is None, the created Buffer will have an automatically-allocated id.
+        If the `id` passed is None, the created Buffer will have an automatically-allocated id,
+        which is released for reuse when the Buffer is freed.
 
         Args:
             server (Server): The SC server on which the Group is created.
@@ -26,14 +35,21 @@ class Buffer:
         self.num_frames = None
         self.num_channels = None
 
+        # Whether the id was allocated by this Buffer, and so should be released on free.
+        self.id_allocated = id is None
+
         if id is None:
-            self.id = globals.LAST_BUFFER_ID
-            globals.LAST_BUFFER_ID += 1
+            self.id = server.buffer_allocator.allocate()
         else:
             self.id = id
 
     @classmethod
-    def alloc(cls, server: Server, num_frames: int, num_channels: int = 1, blocking: bool = True):
+    def alloc(cls,
+              server: Server,
+              num_frames: int,
+              num_channels: int = 1,
+              blocking: bool = True,
+              timeout: Optional[float] = None):
         """
         Create and allocate a new Buffer.
 
@@ -42,27 +58,71 @@ class Buffer:
             num_frames (int): The number of frames to allocate.
             num_channels (int): The number of channels in the buffer.
             blocking (bool): Wait for the alloc task to complete before returning.
+            timeout (float): The time to wait, in seconds. Defaults to the server's command_timeout.
 
         Returns:
             A new Buffer object.
+
+        Raises:
+            SuperColliderCommandError: If the server fails to allocate the Buffer.
         """
         buf = Buffer(server, id=None)
         buf.num_frames = num_frames
         buf.num_channels = num_channels
-        buf.server._send_msg("/b_alloc", buf.id, num_frames, num_channels)
-
         if blocking:
-            buf.server._await_response("/done", ["/b_alloc", buf.id])
+            future = buf.server._expect_response("/done", ["/b_alloc", buf.id], lambda *args: buf, command="/b_alloc")
+            buf.server._send_msg("/b_alloc", buf.id, num_frames, num_channels, timestamp=0)
+            return buf.server._await_response(future, timeout)
+        else:
+            buf.server._send_msg("/b_alloc", buf.id, num_frames, num_channels)
 
         return buf
 
+    @classmethod
+    def alloc_consecutive(cls,
+                          server: Server,
+                          count: int,
+                          num_frames: int,
+                          num_channels: int = 1,
+                          blocking: bool = True) -> list[Buffer]:
+        """
+        Create and allocate a number of Buffers with consecutive IDs, as required by UGens
+        such as VOsc that index a range of buffers.
+
+        Args:
+            server (Server): The SC server on which the Buffers are allocated.
+            count (int): The number of Buffers.
+            num_frames (int): The number of frames to allocate for each Buffer.
+            num_channels (int): The number of channels in each Buffer.
+            blocking (bool): Wait for the alloc tasks to complete before returning.
+
+        Returns:
+            A list of new Buffer objects.
+        """
+        start_index = server.buffer_allocator.allocate(count, split=True)
+        buffers = []
+        for index in range(start_index, start_index + count):
+            buf = Buffer(server, id=index)
+            buf.id_allocated = True
+            buf.num_frames = num_frames
+            buf.num_channels = num_channels
+            buffers.append(buf)
+
+        with server.bundle(timestamp=0):
+            for buf in buffers:
+                server._send_msg("/b_alloc", buf.id, num_frames, num_channels)
+        if blocking:
+            server.sync()
+        return buffers
+
     @classmethod
     def read(cls,
              server: Server,
              path: str,
              start_frame: int = 0,
              num_frames: int = 0,
-             blocking: bool = True) -> Buffer:
+             blocking: bool = True,
+             timeout: Optional[float] = None) -> Buffer:
         """
         Create a new Buffer and read its contents from disk.
 
@@ -72,12 +132,14 @@ class Buffer:
             start_frame (int): The frame index to start reading from.
             num_frames (int): The number of frames to read.
             blocking (bool): Wait for the read task to complete before returning.
+            timeout (float): The time to wait, in seconds. Defaults to the server's command_timeout.
 
         Returns:
             A new Buffer object.
 
         Raises:
             FileNotFoundError: If the path does not exist.
+            SuperColliderCommandError: If the server fails to read the file.
         """
         if not os.path.exists(path):
             raise FileNotFoundError("File not found: %s" % path)
@@ -85,16 +147,166 @@ class Buffer:
         if not path.startswith("/"):
             path = os.path.abspath(path)
         buf = Buffer(server, id=None)
-        buf.server._send_msg("/b_allocRead", buf.id, path, start_frame, num_frames)
-
-        def _handler(address, *args):
-            return args
 
         if blocking:
-            buf.server._await_response("/done", ["/b_allocRead", buf.id], _handler)
+            future = buf.server._expect_response("/done", ["/b_allocRead", buf.id], lambda *args: buf,
+                                                 command="/b_allocRead")
+            buf.server._send_msg("/b_allocRead", buf.id, path, start_frame, num_frames, timestamp=0)
+            return buf.server._await_response(future, timeout)
+        else:
+            buf.server._send_msg("/b_allocRead", buf.id, path, start_frame, num_frames)
+
+        return buf
+
+    @classmethod
+    def read_many(cls,
+                  server: Server,
+                  paths: list[str],
+                  window: int = 16,
+                  progress: Optional[Callable] = None,
+                  ignore_errors: bool = False,
+                  timeout: Optional[float] = None) -> list[Optional[Buffer]]:
+        """
+        Create a Buffer for each of a list of audio files, and read their contents from disk.
+
+        Reads are pipelined, with up to `window` /b_allocRead commands in progress at once, so
+        that loading many files is not bound by the round-trip time of each. The /done or /fail
+        reply to each read is matched by its buffer ID. Requires a Server rather than an AsyncServer.
+
+        Example:
+            >>> buffers = Buffer.read_many(server, glob.glob("samples/*.wav"),
+            ...                            progress=lambda done, total: print("%d/%d" % (done, total)))
+
+        Args:
+            server (Server): The SC server on which the Buffers are created.
+            paths (list[str]): The pathnames of the audio files to read.
+            window (int): The maximum number of reads in progress at once.
+            progress (function): Called with the number of reads completed and the total number,
+                                 after each read completes.
+            ignore_errors (bool): If True, files that cannot be read are skipped, and their entries
+                                  in the returned list are None.
+            timeout (float): The time to wait for each read, in seconds. Defaults to the server's
+                             command_timeout.
+
+        Returns:
+            A list of new Buffer objects, in the order of `paths`.
+
+        Raises:
+            FileNotFoundError: If any path does not exist. No files are read.
+            SuperColliderCommandError: If the server fails to read a file, and ignore_errors is not
+                                       set. Any Buffers already read are freed.
+            SuperColliderConnectionError: If a read does not complete within the timeout. Any Buffers
+                                          already read, or still being read, are freed.
+        """
+        for path in paths:
+            if not os.path.exists(path):
+                raise FileNotFoundError("File not found: %s" % path)
+
+        buffers = [None] * len(paths)
+        in_flight = deque()
+        num_completed = 0
+        error = None
+
+        def _receive_read():
+            nonlocal num_completed, error
+            index, buf, future = in_flight[0]
+            try:
+                server._await_response(future, timeout)
+                buffers[index] = buf
+            except SuperColliderCommandError as e:
+                server.buffer_allocator.free(buf.id)
+                buf.id_allocated = False
+                if not ignore_errors and error is None:
+                    error = e
+            in_flight.popleft()
+            num_completed += 1
+            if progress is not None:
+                progress(num_completed, len(paths))
+
+        try:
+            for index, path in enumerate(paths):
+                if error is not None:
+                    break
+                buf = Buffer(server, id=None)
+                future = server._expect_response("/done", ["/b_allocRead", buf.id], command="/b_allocRead")
+                in_flight.append((index, buf, future))
+                server._send_msg("/b_allocRead", buf.id, os.path.abspath(path), 0, 0, timestamp=0)
+                if len(in_flight) >= window:
+                    _receive_read()
+            while in_flight:
+                _receive_read()
+        except SuperColliderConnectionError as e:
+            error = e
+        finally:
+            # Reads that have not completed (including one that timed out) may still complete
+            # on the server, so their Buffers are freed, which releases their IDs once done.
+            for _, buf, future in in_flight:
+                server.responses.discard(future)
+                buf.free()
+
+        if error is not None:
+            for buf in buffers:
+                if buf is not None:
+                    buf.free()
+            raise error
+        return buffers
+
+    @classmethod
+    def from_array(cls, server: Server, samples, sample_rate: int = 44100) -> Buffer:
+        """
+        Create a new Buffer containing the given samples, by writing them to a temporary
+        32-bit float WAV file through a memory-mapped view and reading it on the server
+        with a single /b_allocRead. The file is created in shared memory (/dev/shm) where
+        available, and deleted once the server has read it.
+
+        This is much faster than `set_array` for large buffers, but requires the server to
+        be running on the local machine. Requires NumPy, and a Server rather than an AsyncServer.
+
+        Args:
+            server (Server): The SC server on which the Buffer is created.
+            samples: A NumPy array of shape (frames,) or (frames, channels).
+            sample_rate (int): The sample rate of the Buffer.
 
+        Returns:
+            A new Buffer object.
+        """
+        if np is None:
+            raise ImportError("Buffer.from_array requires NumPy")
+
+        path = temporary_path()
+        try:
+            write_float_wav(path, samples, sample_rate)
+            buf = Buffer.read(server, path)
+        finally:
+            os.unlink(path)
+
+        buf.num_frames = len(samples)
+        buf.num_channels = samples.shape[1] if np.ndim(samples) > 1 else 1
         return buf
 
+    def to_array(self):
+        """
+        Returns the Buffer's contents, by writing them with a single /b_write to a temporary
+        32-bit float WAV file and reading it through a memory-mapped view. The file is created
+        in shared memory (/dev/shm) where available, and deleted once read.
+
+        This is much faster than `get_array` for large buffers, but requires the server to
+        be running on the local machine. Requires NumPy, and a Server rather than an AsyncServer.
+
+        Returns:
+            A NumPy float32 array of shape (frames,) for single-channel Buffers, or
+            (frames, channels) otherwise.
+        """
+        if np is None:
+            raise ImportError("Buffer.to_array requires NumPy")
+
+        path = temporary_path()
+        try:
+            self.write(path, HEADER_FORMAT_WAV, SAMPLE_FORMAT_FLOAT)
+            return read_float_wav(path)
+        finally:
+            os.unlink(path)
+
     def write(self,
               path: str,
               header_format: int = HEADER_FORMAT_WAV,
@@ -102,7 +314,8 @@ class Buffer:
               num_frames: int = -1,
               start_frame: int = 0,
               leave_open: bool = False,
-              blocking: bool = True):
+              blocking: bool = True,
+              timeout: Optional[float] = None):
         """
         Write the Buffer's contents to an audio file.
 
@@ -114,14 +327,22 @@ class Buffer:
             start_frame (int): Index of the first frame to write.
             leave_open (bool): Whether to leave the file open after write.
             blocking (bool): Wait for the write task to complete before returning.
+            timeout (float): The time to wait, in seconds. Defaults to the server's command_timeout.
+
+        Raises:
+            SuperColliderCommandError: If the server fails to write the file.
         """
-        self.server._send_msg("/b_write", self.id, path, header_format, sample_format,
-                              num_frames, start_frame, int(leave_open))
+        args = [self.id, path, header_format, sample_format, num_frames, start_frame, int(leave_open)]
 
         if blocking:
-            self.server._await_response("/done", ["/b_write", self.id])
+            future = self.server._expect_response("/done", ["/b_write", self.id], lambda *args: None,
+                                                  command="/b_write")
+            self.server._send_msg("/b_write", *args, timestamp=0)
+            return self.server._await_response(future, timeout)
+        else:
+            self.server._send_msg("/b_write", *args)
 
-    def get(self, start_index: int = 0, count: int = 1024) -> list[float]:
+    def get(self, start_index: int = 0, count: int = 1024, timeout: Optional[float] = None) -> list[float]:
         """
         Query the Buffer's contents.
 
@@ -133,25 +354,121 @@ class Buffer:
         Args:
             start_index (int): Index of first frame in the Buffer to read from.
             count (int): Number of samples to retrieve.
+            timeout (float): The time to wait for a reply, in seconds. Defaults to the adaptive timeout.
         """
 
         def _handler(address, *args):
             return args[3:]
 
-        self.server._send_msg("/b_getn", self.id, start_index, count)
-        return self.server._await_response("/b_setn", [self.id], _handler)
+        future = self.server._expect_response("/b_setn", [self.id, start_index], _handler, command="/b_getn")
+        self.server._send_msg("/b_getn", self.id, start_index, count, timestamp=0)
+        return self.server._await_response(future, timeout)
 
-    def set(self, samples: list[float], start_index: int = 0):
+    def set(self, samples: list[float], start_index: int = 0, timestamp: Optional[float] = None):
         """
         Set the Buffer's contents to the values given in the supplied float array.
 
         Args:
             samples (List[float]): Array of floats to write to the Buffer.
             start_index (int): Index of first frame in the Buffer to write to.
+            timestamp (float): The time at which to execute the command, in seconds since the epoch.
+                               Defaults to now, plus the server's latency if set.
+        """
+        self.server._send_msg("/b_setn", self.id, start_index, len(samples), *samples, timestamp=timestamp)
+
+    def get_array(self, start_index: int = 0, count: Optional[int] = None, window: int = 16):
+        """
+        Query the Buffer's contents as a NumPy float32 array, of any length.
+
+        The transfer is split into chunks that each fit in a single datagram, with up to
+        `window` chunks in flight at once. Samples of multi-channel buffers are interleaved.
+        Requires NumPy, and a Server rather than an AsyncServer.
+
+        Args:
+            start_index (int): Index of the first sample to read.
+            count (int): Number of samples to read. Defaults to the rest of the Buffer.
+            window (int): Maximum number of chunk requests awaiting replies at once.
+
+        Returns:
+            A 1-dimensional NumPy float32 array.
+        """
+        if np is None:
+            raise ImportError("Buffer.get_array requires NumPy")
+
+        if count is None:
+            count = self._get_num_samples() - start_index
+
+        samples = np.empty(count, dtype=np.float32)
+        chunk_size = self._get_chunk_size()
+        in_flight = deque()
+
+        def _handler(address, *args):
+            return args[3:]
+
+        def _receive_chunk():
+            offset, future = in_flight.popleft()
+            values = self.server._await_response(future)
+            samples[offset:offset + len(values)] = values
+
+        try:
+            for offset in range(0, count, chunk_size):
+                index = start_index + offset
+                future = self.server._expect_response("/b_setn", [self.id, index], _handler, command="/b_getn")
+                in_flight.append((offset, future))
+                self.server._send_msg("/b_getn", self.id, index, min(chunk_size, count - offset), timestamp=0)
+                if len(in_flight) >= window:
+                    _receive_chunk()
+            while in_flight:
+                _receive_chunk()
+        finally:
+            for _, future in in_flight:
+                self.server.responses.discard(future)
+
+        return samples
+
+    def set_array(self, samples, start_index: int = 0, window: int = 16) -> None:
+        """
+        Set the Buffer's contents from an array of samples, of any length.
+
+        The transfer is split into chunks that each fit in a single datagram. After every
+        `window` chunks, the server is synced so that its receive queue does not overflow.
+        Samples of multi-channel buffers should be interleaved, or given as a 2-dimensional
+        array of shape (frames, channels). Requires NumPy, and a Server rather than an AsyncServer.
+
+        Args:
+            samples: A NumPy array or list of samples.
+            start_index (int): Index of the first sample to write.
+            window (int): Number of chunks to send between each sync.
+        """
+        if np is None:
+            raise ImportError("Buffer.set_array requires NumPy")
+
+        samples = np.asarray(samples, dtype=np.float32).ravel()
+        chunk_size = self._get_chunk_size()
+        for chunk_index, offset in enumerate(range(0, len(samples), chunk_size)):
+            chunk = samples[offset:offset + chunk_size]
+            self.server._send_msg("/b_setn", self.id, start_index + offset, len(chunk), *chunk.tolist(),
+                                  timestamp=0)
+            if (chunk_index + 1) % window == 0:
+                self.server.sync()
+        self.server.sync()
+
+    def _get_chunk_size(self) -> int:
         """
-        self.server._send_msg("/b_setn", self.id, start_index, len(samples), *samples)
+        Returns the number of samples that fit in a /b_setn message no larger than the
+        server's max_packet_size. Each sample takes 4 bytes plus 1 byte of type tag, and
+        the address, type tag prefix and 3 integer arguments take up to 32 bytes.
+        """
+        return max(1, (self.server.max_packet_size - 32) // 5)
+
+    def _get_num_samples(self) -> int:
+        if self.num_frames is None or self.num_channels is None:
+            info = self.get_info()
+            self.num_frames = info["num_frames"]
+            self.num_channels = info["num_channels"]
+        return self.num_frames * self.num_channels
 
-    def fill(self, count: int, value: float, start_index: int = 0):
+    def fill(self, count: int, value: float, start_index: int = 0, timestamp: Optional[float] = None):
         """
         Fill the Buffer's contents with a specified sample.
 
@@ -159,22 +476,52 @@ class Buffer:
             count (int): The number of frames to write.
             value (float): The sample to write.
             start_index (int): Index of first frame in the Buffer to write to.
+            timestamp (float): The time at which to execute the command, in seconds since the epoch.
+                               Defaults to now, plus the server's latency if set.
         """
-        self.server._send_msg("/b_fill", self.id, start_index, count, value)
+        self.server._send_msg("/b_fill", self.id, start_index, count, value, timestamp=timestamp)
 
-    def free(self):
+    def free(self, timestamp: Optional[float] = None):
         """
-        Free the buffer.
-        """
-        self.server._send_msg("/b_free", self.id)
+        Free the buffer, and release its ID for reuse once the server has freed it, so that
+        a Buffer allocated in the meantime cannot be freed by a scheduled /b_free.
 
-    def get_info(self, callback: Callable = None, blocking: bool = True):
+        Args:
+            timestamp (float): The time at which to execute the command, in seconds since the epoch.
+                               Defaults to now, plus the server's latency if set.
+        """
+        if self.id_allocated:
+            self.id_allocated = False
+            timestamp = self.server._resolve_timestamp(timestamp)
+            buffer_id = self.id
+
+            def _release(future):
+                # Release the ID on failure or timeout too, as the buffer is then not allocated,
+                # or the server is no longer reachable.
+                if not future.cancelled():
+                    future.exception()
+                self.server.buffer_allocator.free(buffer_id)
+
+            future = self.server._expect_response("/done", ["/b_free", buffer_id], command="/b_free")
+            future.add_done_callback(_release)
+            delay = max(0.0, timestamp - time.time()) if timestamp else 0.0
+            self.server._schedule_timeout(future, delay + self.server.command_timeout)
+        self.server._send_msg("/b_free", self.id, timestamp=timestamp)
+
+    def get_info(self, callback: Callable = None, blocking: bool = True, timeout: Optional[float] = None):
         """
         Returns info about the Buffer.
 
         Example:
             >>> buffer.info
             {'num_frames': 1024, 'num_channels': 1, 'sample_rate': 44100.0}
+
+        Args:
+            callback (function): Called with the info when it is received from the SC server.
+            blocking (bool): Set to False to query the info asynchronously, returning a Future
+                             that is resolved with the info, or fails if the server does not reply
+                             within the timeout.
+            timeout (float): The time to wait for a reply, in seconds. Defaults to the adaptive timeout.
         """
 
         def _handler(address, *args):
@@ -186,8 +533,9 @@ class Buffer:
 
             return rv
 
-        self.server._send_msg("/b_query", self.id)
+        future = self.server._expect_response("/b_info", [self.id], _handler, command="/b_query")
+        self.server._send_msg("/b_query", self.id, timestamp=0)
         if blocking:
-            return self.server._await_response("/b_info", [self.id], _handler)
+            return self.server._await_response(future, timeout)
         else:
-            self.server.dispatcher.map("/b_info", lambda *args: callback(_handler(*args)))
+            return self.server._defer_response(future, callback, timeout)
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+from .osc import encode_bundle, BUNDLE_OVERHEAD, BUNDLE_ELEMENT_OVERHEAD, TIMETAG_IMMEDIATE
+from typing import TYPE_CHECKING, Optional
+from threading import Lock, Event
+import time
+
+if TYPE_CHECKING:
+    from .server import Server
+
+class Bundle:
+    def __init__(self,
+                 server: Server,
+                 max_size: Optional[int] = None,
+                 timestamp: Optional[float] = None):
+        """
+        A queue of OSC messages that are sent to the server together, packed into as few
+        OSC bundles as possible, each no larger than `max_size` bytes. Messages that share
+        a timetag are coalesced into the same bundle.
+
+        Typically used as a context manager via `Server.bundle()`, in which case every
+        message sent by the current thread within the block is queued, and the queue is
+        flushed when the block exits:
+
+            >>> with server.bundle():
+            ...     for n in range(100):
+            ...         Synth(server, "grain", {"freq": 440.0 + n})
+
+        The queue is also flushed whenever it reaches `max_size`, and before the server
+        waits for the reply to a query.
+
+        Args:
+            server (Server): The SC server to send to.
+            max_size (int): The maximum size of each bundle, in bytes. Defaults to the
+                            server's max_packet_size.
+            timestamp (float): The time at which messages that do not specify their own
+                               timestamp are executed, in seconds since the epoch.
+        """
+        self.server = server
+        self.max_size = max_size or server.max_packet_size
+        self.timestamp = timestamp
+        self.lock = Lock()
+
+        # The enclosing bundle, if this bundle is opened within another.
+        self.parent = None
+
+        # Encoded messages and total bundle size, keyed by timetag.
+        self.dgrams = {}
+        self.sizes = {}
+
+        # Set when the queue becomes non-empty, for time-based flushing.
+        self.pending = Event()
+
+        # The timestamp shared by messages queued without one since the last flush,
+        # when they are scheduled with the server's latency.
+        self.window_timestamp = None
+
+    def __len__(self) -> int:
+        return sum(len(dgrams) for dgrams in self.dgrams.values())
+
+    def __enter__(self) -> Bundle:
+        self.server._push_bundle(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.server._pop_bundle(self)
+        self.flush()
+
+    def add(self, dgram: bytes, timetag: bytes = TIMETAG_IMMEDIATE) -> None:
+        """
+        Queue an encoded OSC message, first flushing messages with the same timetag
+        if the message would not fit in their bundle.
+
+        Args:
+            dgram (bytes): The encoded message.
+            timetag (bytes): The encoded timetag at which the message is executed.
+        """
+        element_size = BUNDLE_ELEMENT_OVERHEAD + len(dgram)
+        if BUNDLE_OVERHEAD + element_size > self.max_size:
+            # Too large to be bundled with anything else: send it on its own,
+            # after anything already queued.
+            self.flush()
+            if self.parent is not None:
+                self.parent.add(dgram, timetag)
+            else:
+                self.server._send_bundle([dgram], timetag)
+            return
+
+        with self.lock:
+            size = self.sizes.get(timetag, BUNDLE_OVERHEAD)
+            if size + element_size > self.max_size:
+                self._send_locked(timetag)
+                size = BUNDLE_OVERHEAD
+            self.dgrams.setdefault(timetag, []).append(dgram)
+            self.sizes[timetag] = size + element_size
+            self.pending.set()
+
+    def get_window_timestamp(self, latency: float) -> float:
+        """
+        Returns the timestamp of messages queued without one since the last flush: the time
+        at which the first of them was queued, plus `latency`. Messages queued together thus
+        share a timetag, and can be sent in a single bundle.
+        """
+        with self.lock:
+            if self.window_timestamp is None:
+                self.window_timestamp = time.time() + latency
+            return self.window_timestamp
+
+    def flush(self) -> None:
+        """
+        Send all queued messages.
+        """
+        with self.lock:
+            for timetag in list(self.dgrams):
+                self._send_locked(timetag)
+            self.pending.clear()
+            self.window_timestamp = None
+
+    def _send_locked(self, timetag: bytes) -> None:
+        dgrams = self.dgrams.pop(timetag, None)
+        if not dgrams:
+            return
+        del self.sizes[timetag]
+
+        # A nested bundle passes its messages to the enclosing bundle, so that they
+        # are not sent ahead of messages queued before it.
+        if self.parent is not None:
+            for dgram in dgrams:
+                self.parent.add(dgram, timetag)
+            return
+
+        # Messages queued by the server-wide auto bundle were sent before these,
+        # so must reach the server first.
+        auto_bundle = self.server.auto_bundle
+        if auto_bundle is not None and auto_bundle is not self:
+            auto_bundle.flush()
+
+        self.server._send_bundle(dgrams, timetag)
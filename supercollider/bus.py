@@ -1,6 +1,13 @@
 from __future__ import annotations
-from . import globals
-from typing import TYPE_CHECKING
+from threading import Thread, Event
+from typing import TYPE_CHECKING, Optional, Union
+import numbers
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 if TYPE_CHECKING:
     from .server import Server
@@ -11,21 +18,272 @@ class Bus:
         self.channels = channels
         self.id = None
 
-    def free(self):
-        pass
+        # Whether the bus's channels are allocated, and so should be released on free.
+        self.id_allocated = False
+
+        # The time at which the last message scheduled for the bus is executed.
+        self.scheduled_until = 0.0
+
+    def free(self, timestamp: Optional[float] = None):
+        """
+        Release the bus's channels for reuse. If messages scheduled for the bus have not yet been
+        executed, the channels are released only once they have, so that they cannot affect a bus
+        allocated in the meantime. Freeing a bus that has already been freed has no effect.
+
+        Args:
+            timestamp (float): The time after which the bus is no longer used, in seconds since the epoch.
+                               Defaults to now, plus the server's latency if set.
+        """
+        if not self.id_allocated:
+            return
+        timestamp = max(self.server._resolve_timestamp(timestamp) or 0.0, self.scheduled_until)
+        delay = timestamp - time.time()
+        if delay > 0:
+            self.server._call_later(delay, self._release)
+        else:
+            self._release()
+
+    def _release(self):
+        if self.id_allocated:
+            self.id_allocated = False
+            self._allocator().free(self.id)
+
+    def _allocator(self):
+        raise NotImplementedError
+
+    def _schedule(self, timestamp: Optional[float]) -> Optional[float]:
+        """
+        Returns the time at which to execute a message for the bus, recording it if it is later
+        than those of the messages already scheduled.
+        """
+        timestamp = self.server._resolve_timestamp(timestamp)
+        if timestamp:
+            self.scheduled_until = max(self.scheduled_until, timestamp)
+        return timestamp
 
 class ControlBus(Bus):
     def __init__(self, server, channels):
         super(type(self), self).__init__(server, channels)
-        self.id = globals.CONTROL_BUS_ALLOCATOR.allocate(channels)
+        self.id = server.control_bus_allocator.allocate(channels)
+        self.id_allocated = True
+
+    def _allocator(self):
+        return self.server.control_bus_allocator
+
+    def set(self, value: Union[float, list], timestamp: Optional[float] = None) -> None:
+        """
+        Set the value of the bus. Every Synth control mapped to the bus follows its value,
+        so a single message can modulate any number of Synths.
+
+        Example:
+            >>> bus.set(0.5)
+            >>> stereo_bus.set([0.5, 0.25])
+
+        Args:
+            value: The value of the first channel, or a list or NumPy array of values for
+                   consecutive channels, starting with the first.
+            timestamp (float): The time at which to execute the command, in seconds since the epoch.
+                               Defaults to now, plus the server's latency if set.
+        """
+        timestamp = self._schedule(timestamp)
+        if isinstance(value, numbers.Real):
+            self.server._send_msg("/c_set", self.id, float(value), timestamp=timestamp)
+        else:
+            values = value.tolist() if hasattr(value, "tolist") else list(value)
+            self.server._send_msg("/c_setn", self.id, len(values), *values, timestamp=timestamp)
+
+    def get(self, timeout: Optional[float] = None):
+        """
+        Query the value of the bus.
+
+        Example:
+            >>> bus.get()
+            0.5
+            >>> stereo_bus.get()
+            [0.5, 0.25]
+
+        Args:
+            timeout (float): The time to wait for a reply, in seconds. Defaults to the adaptive timeout.
+
+        Returns:
+            The value, for a single-channel bus, or else a list of the value of each channel.
+        """
+        if self.channels == 1:
+            def _handler(address, *args):
+                return args[1]
+
+            future = self.server._expect_response("/c_set", [self.id], _handler, command="/c_get")
+            self.server._send_msg("/c_get", self.id, timestamp=0)
+        else:
+            def _handler(address, *args):
+                return list(args[2:])
+
+            future = self.server._expect_response("/c_setn", [self.id, self.channels], _handler, command="/c_getn")
+            self.server._send_msg("/c_getn", self.id, self.channels, timestamp=0)
+        return self.server._await_response(future, timeout)
+
+    def set_array(self, values, timestamp: Optional[float] = None) -> None:
+        """
+        Set the values of consecutive channels of the bus from an array, in as many
+        /c_setn messages as are needed to fit within the server's max_packet_size.
+
+        Args:
+            values: A NumPy array or list of values, starting with the first channel.
+            timestamp (float): The time at which to execute the commands, in seconds since the epoch.
+                               Defaults to now, plus the server's latency if set.
+        """
+        values = values.tolist() if hasattr(values, "tolist") else list(values)
+        chunk_size = self._get_chunk_size()
+        timestamp = self._schedule(timestamp)
+        for offset in range(0, len(values), chunk_size):
+            chunk = values[offset:offset + chunk_size]
+            self.server._send_msg("/c_setn", self.id + offset, len(chunk), *chunk, timestamp=timestamp)
+
+    def get_array(self):
+        """
+        Query the values of every channel of the bus, as a NumPy float32 array.
+        Requires NumPy, and a Server rather than an AsyncServer.
+        """
+        if np is None:
+            raise ImportError("ControlBus.get_array requires NumPy")
+
+        def _handler(address, *args):
+            return args[2:]
+
+        values = np.empty(self.channels, dtype=np.float32)
+        chunk_size = self._get_chunk_size()
+        futures = []
+        for offset in range(0, self.channels, chunk_size):
+            count = min(chunk_size, self.channels - offset)
+            future = self.server._expect_response("/c_setn", [self.id + offset, count], _handler, command="/c_getn")
+            futures.append((offset, future))
+            self.server._send_msg("/c_getn", self.id + offset, count, timestamp=0)
+        for offset, future in futures:
+            chunk = self.server._await_response(future)
+            values[offset:offset + len(chunk)] = chunk
+        return values
+
+    def stream(self,
+               values,
+               rate: float,
+               batch_interval: float = 0.05,
+               latency: Optional[float] = None,
+               loop: bool = False) -> BusStream:
+        """
+        Start streaming a control signal to the bus, at a fixed rate. See BusStream.
+
+        Example:
+            >>> lfo = numpy.sin(numpy.linspace(0, 2 * numpy.pi, 100))
+            >>> stream = bus.stream(lfo, rate=100, latency=0.1, loop=True)
+            >>> stream.stop()
+
+        Returns:
+            The running BusStream.
+        """
+        stream = BusStream(self, values, rate, batch_interval, latency, loop)
+        stream.start()
+        return stream
+
+    def _get_chunk_size(self) -> int:
+        """
+        Returns the number of values that fit in a /c_setn message no larger than the
+        server's max_packet_size.
+        """
+        return max(1, (self.server.max_packet_size - 32) // 5)
+
+class BusStream:
+    def __init__(self,
+                 bus: ControlBus,
+                 values,
+                 rate: float,
+                 batch_interval: float = 0.05,
+                 latency: Optional[float] = None,
+                 loop: bool = False):
+        """
+        Streams a control signal to a ControlBus from a background thread, setting the bus to
+        each frame of the signal in turn, `rate` frames per second.
+
+        The thread wakes every `batch_interval` seconds. If `latency` is given, each wakeup sends
+        every frame due before the next one, as timetagged messages that the server executes
+        `latency` seconds after each frame is due, so the signal is applied with sample-accurate
+        timing. Otherwise, each wakeup sends only the most recent frame that is due, for immediate
+        execution; frames are skipped if `rate` exceeds 1 / `batch_interval`.
+
+        Args:
+            bus (ControlBus): The bus to write to.
+            values: A NumPy array or list of frames: shape (frames,) for one channel, or
+                    (frames, channels) to set consecutive channels of the bus.
+            rate (float): The number of frames per second.
+            batch_interval (float): The interval between wakeups of the sending thread, in seconds.
+            latency (float): If set, send timetagged frames this many seconds ahead of time.
+            loop (bool): If True, repeat the signal until stopped.
+        """
+        self.bus = bus
+        self.frames = [frame.tolist() if hasattr(frame, "tolist") else frame for frame in values]
+        self.rate = rate
+        self.batch_interval = batch_interval
+        self.latency = latency
+        self.loop = loop
+        self.start_time = None
+        self.frame_index = 0
+        self.stopped = Event()
+        self.thread = Thread(target=self._run, daemon=True)
+
+    @property
+    def is_running(self) -> bool:
+        return self.thread.is_alive()
+
+    def start(self) -> None:
+        self.start_time = time.time()
+        self.thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop streaming. Frames that have already been sent with timetags are still executed.
+        """
+        self.stopped.set()
+        if self.thread.is_alive():
+            self.thread.join()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        """
+        Wait until every frame has been sent.
+        """
+        self.thread.join(timeout)
+
+    def _run(self) -> None:
+        num_frames = len(self.frames)
+        while num_frames and not self.stopped.is_set():
+            now = time.time()
+            if self.latency is not None:
+                # Every frame due before the next wakeup.
+                end_index = int((now + self.batch_interval - self.start_time) * self.rate) + 1
+                indices = range(self.frame_index, end_index)
+            else:
+                # Only the most recent frame that is due.
+                end_index = int((now - self.start_time) * self.rate) + 1
+                indices = range(max(self.frame_index, end_index - 1), end_index)
+
+            if not self.loop:
+                indices = indices[:max(0, num_frames - self.frame_index)]
+
+            with self.bus.server.bundle():
+                for index in indices:
+                    timestamp = 0
+                    if self.latency is not None:
+                        timestamp = self.start_time + index / self.rate + self.latency
+                    self.bus.set(self.frames[index % num_frames], timestamp=timestamp)
+            self.frame_index = max(self.frame_index, end_index)
 
-    def free(self):
-        globals.CONTROL_BUS_ALLOCATOR.free(self.id)
+            if not self.loop and self.frame_index >= num_frames:
+                break
+            self.stopped.wait(self.batch_interval)
 
 class AudioBus(Bus):
     def __init__(self, server, channels):
         super(type(self), self).__init__(server, channels)
-        self.id = globals.AUDIO_BUS_ALLOCATOR.allocate(channels)
+        self.id = server.audio_bus_allocator.allocate(channels)
+        self.id_allocated = True
 
-    def free(self):
-        globals.AUDIO_BUS_ALLOCATOR.free(self.id)
+    def _allocator(self):
+        return self.server.audio_bus_allocator
@@ -3,3 +3,16 @@ class SuperColliderConnectionError (Exception):
 
 class SuperColliderAllocationError (Exception):
     pass
+
+class SuperColliderCommandError (Exception):
+    def __init__(self, command: str, message: str):
+        """
+        Raised when the server replies to a command with /fail.
+
+        Args:
+            command (str): The OSC address of the command that failed, e.g. /b_allocRead.
+            message (str): The server's error message.
+        """
+        super().__init__("%s failed: %s" % (command, message))
+        self.command = command
+        self.message = message
@@ -1,14 +1,25 @@
-from .allocators import Allocator
-
 ALLOCATOR_BUS_START_INDEX = 32
 ALLOCATOR_BUS_CAPACITY = 1024
 
-CONTROL_BUS_ALLOCATOR = Allocator("control")
-AUDIO_BUS_ALLOCATOR = Allocator("audio")
+# scsynth's default number of buffers (-b)
+ALLOCATOR_BUFFER_START_INDEX = 0
+ALLOCATOR_BUFFER_CAPACITY = 1024
 
-LAST_NODE_ID = 1000
-LAST_BUFFER_ID = 0
+NODE_ID_START = 1000
 RESPONSE_TIMEOUT = 0.25
+# The floor of adaptive query timeouts. Round trips on a LAN take well under a millisecond, so
+# a lost reply is detected quickly; a reply that is merely held up is given a grace period
+# (see Server._get_grace_period) before the query fails.
+MIN_RESPONSE_TIMEOUT = 0.02
+COMMAND_TIMEOUT = 5.0
+SOCKET_RECEIVE_BUFFER_SIZE = 1 << 22
+
+# Largest datagram to send: an Ethernet MTU of 1500 bytes less IP and UDP headers.
+MAX_PACKET_SIZE = 1472
+
+# Largest datagram that can be sent at all, for messages that cannot be split: the
+# maximum UDP payload of 65507 bytes, less headroom.
+MAX_DATAGRAM_SIZE = 65000
 
 ADD_TO_HEAD = 0
 ADD_TO_TAIL = 1
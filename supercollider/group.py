@@ -1,16 +1,17 @@
 from __future__ import annotations
 
-from . import globals
-from typing import TYPE_CHECKING
+from .node import Node
+from typing import TYPE_CHECKING, Optional
 
 if TYPE_CHECKING:
     from .server import Server
 
-class Group:
+class Group(Node):
     def __init__(self,
                  server: Server,
                  action: int = 0,
-                 target: int = 0):
+                 target: int = 0,
+                 timestamp: Optional[float] = None):
         """
         Create a new Group.
 
@@ -18,17 +19,25 @@ class Group:
             server (Server): The SC server on which the Group is created.
             target (int): The Group to create the Group in, default 0.
             action (int): The add action.
+            timestamp (float): The time at which to execute the command, in seconds since the epoch.
+                               Defaults to now, plus the server's latency if set.
         """
         self.server = server
-        self.id = globals.LAST_NODE_ID
-        globals.LAST_NODE_ID += 1
+        self.id = server.node_id_allocator.allocate()
 
-        self.server._send_msg("/g_new", self.id, action, target)
+        self.server._send_msg("/g_new", self.id, action, target, timestamp=timestamp)
 
-    def free(self) -> None:
+    def free(self, timestamp: Optional[float] = None) -> None:
         """
-        Free the group and all Synths within it.
+        Free the group and all Synths within it, and release the group's node ID for reuse.
+
+        Args:
+            timestamp (float): The time at which to execute the command, in seconds since the epoch.
+                               Defaults to now, plus the server's latency if set.
         """
         # /g_deepFree does not free the group itself; must also call /n_free.
-        self.server._send_msg("/g_deepFree", self.id)
-        self.server._send_msg("/n_free", self.id)
+        # Both share a timestamp so that they are executed together.
+        timestamp = self.server._resolve_timestamp(timestamp)
+        self.server._send_msg("/g_deepFree", self.id, timestamp=timestamp)
+        self.server._send_msg("/n_free", self.id, timestamp=timestamp)
+        self.server.node_id_allocator.free(self.id)
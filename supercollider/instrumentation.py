@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+from pythonosc.dispatcher import Dispatcher
+from pythonosc.osc_packet import OscPacket, ParseError
+from array import array
+from bisect import bisect_left
+from threading import Lock
+from typing import TYPE_CHECKING, Optional
+import time
+
+if TYPE_CHECKING:
+    from .server import Server
+
+# Outcomes of a request, as passed to Hooks.on_response.
+RESPONSE_MATCHED = "matched"
+RESPONSE_FAILED = "failed"
+RESPONSE_TIMEOUT = "timeout"
+
+class Hooks:
+    """
+    Base class for instrumentation hooks, which are called as the Server sends and receives
+    messages and as requests complete. Register hooks with `Server.add_hooks()`; while none
+    are registered, the cost to the Server is a single check per message.
+
+    Hooks are called on the thread that sends or receives the message, so must be quick and
+    thread-safe. Timestamps are per time.perf_counter().
+    """
+
+    def on_send(self, address: str, size: int, timestamp: float) -> None:
+        """
+        Called for each message sent, whether alone or in a bundle.
+
+        Args:
+            address (str): The OSC address of the message.
+            size (int): The size of the encoded message, in bytes.
+            timestamp (float): The time the message was sent or queued.
+        """
+        pass
+
+    def on_receive(self, address: str, size: int, timestamp: float) -> None:
+        """
+        Called for each message received from the server, before it is dispatched.
+
+        Args:
+            address (str): The OSC address of the message.
+            size (int): The size of the encoded message, in bytes.
+            timestamp (float): The time the packet containing the message was received.
+        """
+        pass
+
+    def on_response(self, address: str, command: Optional[str], latency: float, status: str) -> None:
+        """
+        Called when a request that expects a reply completes.
+
+        Args:
+            address (str): The OSC address of the expected reply, e.g. /n_set.
+            command (str): The OSC address of the command sent, e.g. /s_get, if known.
+            latency (float): The time from the request to its completion, in seconds.
+            status (str): RESPONSE_MATCHED if a reply was received, RESPONSE_FAILED if the server
+                          replied with /fail, or RESPONSE_TIMEOUT if no reply was received in time.
+        """
+        pass
+
+class LatencyHistogram:
+    # Upper bounds of the buckets, in seconds: 10us doubling to ~21s.
+    DEFAULT_BOUNDS = tuple(1e-5 * 2 ** n for n in range(22))
+
+    def __init__(self, bounds: Optional[tuple] = None):
+        """
+        A histogram of latencies with fixed buckets, plus an overflow bucket for values
+        above the highest bound.
+
+        Args:
+            bounds (tuple): The upper bounds of the buckets, in seconds, in increasing order.
+        """
+        self.bounds = tuple(bounds or self.DEFAULT_BOUNDS)
+        self.counts = array("Q", bytes(8 * (len(self.bounds) + 1)))
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """
+        Returns the upper bound of the bucket containing the given percentile (0-100),
+        or None if there are no values. Values in the overflow bucket are reported as infinite.
+        """
+        if self.count == 0:
+            return None
+        threshold = self.count * percentile / 100.0
+        total = 0
+        for index, count in enumerate(self.counts):
+            total += count
+            if total >= threshold and total > 0:
+                return self.bounds[index] if index < len(self.bounds) else float("inf")
+        return float("inf")
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+def escape_label(value: str) -> str:
+    """
+    Escape a Prometheus label value: backslashes, double quotes and newlines.
+    """
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class MessageStats(Hooks):
+    def __init__(self):
+        """
+        Built-in hooks that count the messages and bytes sent and received per OSC address,
+        the outcomes of requests, and a LatencyHistogram of request latencies per command.
+
+        Example:
+            >>> stats = MessageStats()
+            >>> server.add_hooks(stats)
+            >>> synth.get("freq")
+            >>> stats.latencies["/s_get"].percentile(99)
+            0.00032
+            >>> stats.sent["/s_get"]
+            [1, 20]
+        """
+        # address -> [messages, bytes]
+        self.sent = {}
+        self.received = {}
+        # command (or reply address) -> {status: count}
+        self.responses = {}
+        # command (or reply address) -> LatencyHistogram
+        self.latencies = {}
+        self.lock = Lock()
+
+    def on_send(self, address: str, size: int, timestamp: float) -> None:
+        with self.lock:
+            totals = self.sent.get(address)
+            if totals is None:
+                totals = self.sent[address] = [0, 0]
+            totals[0] += 1
+            totals[1] += size
+
+    def on_receive(self, address: str, size: int, timestamp: float) -> None:
+        with self.lock:
+            totals = self.received.get(address)
+            if totals is None:
+                totals = self.received[address] = [0, 0]
+            totals[0] += 1
+            totals[1] += size
+
+    def on_response(self, address: str, command: Optional[str], latency: float, status: str) -> None:
+        key = command or address
+        with self.lock:
+            outcomes = self.responses.setdefault(key, {})
+            outcomes[status] = outcomes.get(status, 0) + 1
+            if status == RESPONSE_MATCHED:
+                histogram = self.latencies.get(key)
+                if histogram is None:
+                    histogram = self.latencies[key] = LatencyHistogram()
+                histogram.observe(latency)
+
+    def export(self) -> str:
+        """
+        Returns the statistics in the Prometheus text exposition format.
+        """
+        lines = []
+        with self.lock:
+            lines.append("# TYPE supercollider_messages_sent_total counter")
+            for address, (count, _) in sorted(self.sent.items()):
+                lines.append('supercollider_messages_sent_total{address="%s"} %d' % (escape_label(address), count))
+            lines.append("# TYPE supercollider_messages_received_total counter")
+            for address, (count, _) in sorted(self.received.items()):
+                lines.append('supercollider_messages_received_total{address="%s"} %d' % (escape_label(address), count))
+            lines.append("# TYPE supercollider_responses_total counter")
+            for command, outcomes in sorted(self.responses.items()):
+                command = escape_label(command)
+                for status, count in sorted(outcomes.items()):
+                    lines.append('supercollider_responses_total{command="%s",status="%s"} %d' % (command, status, count))
+            lines.append("# TYPE supercollider_response_latency_seconds histogram")
+            for command, histogram in sorted(self.latencies.items()):
+                command = escape_label(command)
+                total = 0
+                for bound, count in zip(histogram.bounds, histogram.counts):
+                    total += count
+                    lines.append('supercollider_response_latency_seconds_bucket{command="%s",le="%g"} %d' % (
+                        command, bound, total))
+                lines.append('supercollider_response_latency_seconds_bucket{command="%s",le="+Inf"} %d' % (
+                    command, histogram.count))
+                lines.append('supercollider_response_latency_seconds_sum{command="%s"} %r' % (command, histogram.sum))
+                lines.append('supercollider_response_latency_seconds_count{command="%s"} %d' % (
+                    command, histogram.count))
+        return "\n".join(lines) + "\n"
+
+class InstrumentedDispatcher(Dispatcher):
+    def __init__(self, server: Server):
+        """
+        A Dispatcher that passes each received message to the server's hooks, if any,
+        before dispatching it as usual.
+        """
+        super().__init__()
+        self.server = server
+
+    def call_handlers_for_packet(self, data: bytes, client_address) -> list:
+        hooks = self.server.hooks
+        if hooks:
+            timestamp = time.perf_counter()
+            try:
+                for timed_message in OscPacket(data).messages:
+                    message = timed_message.message
+                    for hook in hooks:
+                        hook.on_receive(message.address, message.size, timestamp)
+            except ParseError:
+                pass
+        return super().call_handlers_for_packet(data, client_address)
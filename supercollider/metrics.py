@@ -0,0 +1,303 @@
+from __future__ import annotations
+
+from .exceptions import SuperColliderConnectionError
+from .instrumentation import escape_label
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread, Event
+from typing import TYPE_CHECKING, Callable, Optional
+import logging
+import math
+import time
+
+if TYPE_CHECKING:
+    from .server import Server
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+class ClientStats:
+    def __init__(self):
+        """
+        Running totals of the client's traffic with the server, kept by every Server.
+
+        Attributes:
+            messages_sent (int): OSC messages sent, whether alone or in bundles.
+            datagrams_sent (int): UDP datagrams sent.
+            bytes_sent (int): The total size of the datagrams sent.
+            messages_received (int): OSC messages received from the server.
+            replies_matched (int): Replies that resolved a pending request.
+            response_timeouts (int): Requests that timed out without a reply.
+        """
+        self.messages_sent = 0
+        self.datagrams_sent = 0
+        self.bytes_sent = 0
+        self.messages_received = 0
+        self.replies_matched = 0
+        self.response_timeouts = 0
+
+    def as_dict(self) -> dict:
+        return dict(vars(self))
+
+class StatusHistory:
+    # The fields of each sample, each stored in its own column.
+    FIELDS = ("timestamp", "cpu_average", "cpu_peak", "num_ugens", "num_synths", "num_groups", "num_synthdefs",
+              "sample_rate_nominal", "sample_rate_actual", "status_latency", "round_trip_time",
+              "messages_sent", "bytes_sent", "replies_matched", "response_timeouts")
+
+    def __init__(self, capacity: int = 3600):
+        """
+        A fixed-size ring buffer of status samples. Each field is stored in a preallocated array
+        of doubles, so that sampling does not allocate, and the oldest samples are overwritten
+        once `capacity` samples have been added.
+
+        Args:
+            capacity (int): The number of samples to keep.
+        """
+        self.capacity = capacity
+        self.columns = {field: array("d", bytes(8 * capacity)) for field in self.FIELDS}
+        self.index = 0
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def append(self, sample: dict) -> None:
+        """
+        Add a sample, as a dict of field names and values. Missing fields are recorded as NaN.
+        """
+        for field, column in self.columns.items():
+            column[self.index] = sample.get(field, math.nan)
+        self.index = (self.index + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def get(self, field: str, window: Optional[int] = None) -> list[float]:
+        """
+        Returns the values of a field, oldest first.
+
+        Args:
+            field (str): The name of the field.
+            window (int): If set, return only the most recent `window` samples.
+        """
+        column = self.columns[field]
+        count = self.count if window is None else min(window, self.count)
+        start = (self.index - count) % self.capacity
+        if start + count <= self.capacity:
+            return column[start:start + count].tolist()
+        return column[start:].tolist() + column[:self.index].tolist()
+
+    def get_array(self, field: str, window: Optional[int] = None):
+        """
+        Returns the values of a field as a NumPy array, oldest first.
+        """
+        if np is None:
+            raise ImportError("StatusHistory.get_array requires NumPy")
+        return np.array(self.get(field, window))
+
+    def latest(self) -> Optional[dict]:
+        """
+        Returns the most recent sample as a dict, or None if there are no samples.
+        """
+        if self.count == 0:
+            return None
+        index = (self.index - 1) % self.capacity
+        return {field: column[index] for field, column in self.columns.items()}
+
+    def summary(self, field: str, window: Optional[int] = None) -> Optional[dict]:
+        """
+        Returns the minimum, mean and maximum of a field, ignoring missing values,
+        or None if there are no values.
+        """
+        values = [value for value in self.get(field, window) if not math.isnan(value)]
+        if not values:
+            return None
+        return {"min": min(values), "mean": sum(values) / len(values), "max": max(values)}
+
+    def rate(self, field: str, window: Optional[int] = None) -> Optional[float]:
+        """
+        Returns the rate of change of a cumulative field, such as messages_sent, per second,
+        or None if there are fewer than two samples.
+        """
+        values = self.get(field, window)
+        timestamps = self.get("timestamp", window)
+        if len(values) < 2 or timestamps[-1] == timestamps[0]:
+            return None
+        return (values[-1] - values[0]) / (timestamps[-1] - timestamps[0])
+
+class StatusMonitor:
+    def __init__(self,
+                 server: Server,
+                 interval: float = 1.0,
+                 capacity: int = 3600,
+                 timeout: Optional[float] = None,
+                 callback: Optional[Callable] = None,
+                 labels: Optional[dict] = None):
+        """
+        Samples the server's status in a background thread, recording the server's CPU load, node
+        counts and sample rate along with the client's traffic and reply latencies in a StatusHistory.
+        Typically created by `Server.start_status_monitor()`.
+
+        Metrics can be exported in the Prometheus text exposition format with `export()`, or served
+        over HTTP with `serve()`.
+
+        Example:
+            >>> monitor = server.start_status_monitor(interval=0.5)
+            >>> monitor.history.summary("cpu_peak", window=120)
+            {'min': 10.2, 'mean': 14.6, 'max': 31.0}
+            >>> monitor.cpu_headroom
+            69.0
+
+        Args:
+            server (Server): The SC server to monitor.
+            interval (float): The time between samples, in seconds.
+            capacity (int): The number of samples to keep.
+            timeout (float): The time to wait for each status reply, in seconds. Defaults to the
+                             server's adaptive query timeout.
+            callback (function): Called with the StatusMonitor after each sample.
+            labels (dict): Labels added to each exported metric. Defaults to the server's address.
+        """
+        self.server = server
+        self.interval = interval
+        self.timeout = timeout
+        self.callback = callback
+        self.labels = labels or {"server": "%s:%d" % server.client_address}
+        self.history = StatusHistory(capacity)
+        self.num_failures = 0
+
+        self.stopped = Event()
+        self.thread = None
+        self.http_server = None
+
+    def start(self) -> None:
+        self.stopped.clear()
+        self.thread = Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.http_server is not None:
+            self.http_server.shutdown()
+            self.http_server.server_close()
+            self.http_server = None
+
+    @property
+    def cpu_headroom(self) -> Optional[float]:
+        """
+        The percentage of CPU available before the server's peak load reaches 100%, per the
+        highest peak in the history, or None if there are no samples.
+        """
+        summary = self.history.summary("cpu_peak")
+        return None if summary is None else 100.0 - summary["max"]
+
+    def sample(self) -> bool:
+        """
+        Query the server's status once, and add a sample to the history.
+
+        Returns:
+            True if the server replied. If not, the sample is recorded with only the client's metrics.
+        """
+        t0 = time.perf_counter()
+        try:
+            sample = self.server.get_status(timeout=self.timeout)
+            sample["status_latency"] = time.perf_counter() - t0
+        except SuperColliderConnectionError:
+            self.num_failures += 1
+            sample = {}
+
+        stats = self.server.client_stats
+        sample["timestamp"] = time.time()
+        sample["messages_sent"] = stats.messages_sent
+        sample["bytes_sent"] = stats.bytes_sent
+        sample["replies_matched"] = stats.replies_matched
+        sample["response_timeouts"] = stats.response_timeouts
+        if self.server.round_trip.mean is not None:
+            sample["round_trip_time"] = self.server.round_trip.mean
+        self.history.append(sample)
+
+        if self.callback is not None:
+            self.callback(self)
+        return "status_latency" in sample
+
+    def export(self) -> str:
+        """
+        Returns the most recent metrics in the Prometheus text exposition format.
+        """
+        latest = self.history.latest() or {}
+        labels = ",".join('%s="%s"' % (key, escape_label(str(value))) for key, value in self.labels.items())
+        lines = []
+
+        def _metric(name: str, metric_type: str, description: str, value: Optional[float]):
+            if value is None or math.isnan(value):
+                return
+            lines.append("# HELP supercollider_%s %s" % (name, description))
+            lines.append("# TYPE supercollider_%s %s" % (name, metric_type))
+            lines.append("supercollider_%s{%s} %s" % (name, labels, repr(float(value))))
+
+        nominal = latest.get("sample_rate_nominal", math.nan)
+        drift = (latest.get("sample_rate_actual", math.nan) - nominal) / nominal * 1e6 if nominal else None
+
+        _metric("cpu_average_percent", "gauge", "Average CPU load of the audio thread.", latest.get("cpu_average"))
+        _metric("cpu_peak_percent", "gauge", "Peak CPU load of the audio thread.", latest.get("cpu_peak"))
+        _metric("cpu_headroom_percent", "gauge", "CPU headroom below the highest recorded peak load.",
+                self.cpu_headroom)
+        _metric("ugens", "gauge", "Number of running unit generators.", latest.get("num_ugens"))
+        _metric("synths", "gauge", "Number of running Synths.", latest.get("num_synths"))
+        _metric("groups", "gauge", "Number of Groups.", latest.get("num_groups"))
+        _metric("synthdefs", "gauge", "Number of loaded SynthDefs.", latest.get("num_synthdefs"))
+        _metric("sample_rate_hertz", "gauge", "Measured sample rate.", latest.get("sample_rate_actual"))
+        _metric("sample_rate_drift_ppm", "gauge", "Deviation of the measured from the nominal sample rate.", drift)
+        _metric("status_latency_seconds", "gauge", "Time taken to reply to the last status query.",
+                latest.get("status_latency"))
+        _metric("round_trip_seconds", "gauge", "Smoothed round-trip time of queries.", latest.get("round_trip_time"))
+        _metric("messages_sent_total", "counter", "OSC messages sent.", latest.get("messages_sent"))
+        _metric("bytes_sent_total", "counter", "Bytes sent.", latest.get("bytes_sent"))
+        _metric("replies_matched_total", "counter", "Replies matched to requests.", latest.get("replies_matched"))
+        _metric("response_timeouts_total", "counter", "Requests that timed out.", latest.get("response_timeouts"))
+        _metric("status_failures_total", "counter", "Status queries that went unanswered.", self.num_failures)
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int = 9110, hostname: str = "127.0.0.1") -> int:
+        """
+        Serve `export()` over HTTP, for scraping by Prometheus, until the monitor is stopped.
+
+        Args:
+            port (int): The port to listen on, or 0 to use any free port.
+            hostname (str): The address to listen on.
+
+        Returns:
+            The port listened on.
+        """
+        monitor = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = monitor.export().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        self.http_server = ThreadingHTTPServer((hostname, port), _Handler)
+        Thread(target=self.http_server.serve_forever, daemon=True).start()
+        return self.http_server.server_address[1]
+
+    def _run(self) -> None:
+        while not self.stopped.is_set():
+            t0 = time.perf_counter()
+            try:
+                self.sample()
+            except Exception as e:
+                logger.warning("Status sample failed: %s" % e)
+            # Sample at a fixed rate, regardless of the time taken by the query.
+            self.stopped.wait(max(0.0, self.interval - (time.perf_counter() - t0)))
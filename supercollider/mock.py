@@ -0,0 +1,754 @@
+"""
+An in-process stand-in for scsynth, for testing and benchmarking the client without
+an audio server. It speaks the subset of the SuperCollider server command protocol
+used by this library, over UDP, and maintains a node tree, buffers and control buses.
+
+No audio is generated. Unknown SynthDef names are accepted, with the controls given
+on creation; SynthDefs can be registered with default control values using
+`add_synthdef`, or sent as compiled SynthDef files with /d_recv, /d_load and /d_loadDir.
+
+Example:
+    >>> with MockSCSynth() as mock:
+    ...     server = Server(port=mock.port)
+    ...     synth = Synth(server, "sine", {"freq": 440.0})
+    ...     synth.get("freq")
+    440.0
+
+It can also be run as a standalone process, accepting scsynth's -u argument:
+
+    python -m supercollider.mock -u 57110
+"""
+
+from __future__ import annotations
+
+from pythonosc.osc_packet import OscPacket, ParseError
+from pythonosc.osc_bundle import OscBundle
+from .osc import encode_message
+from threading import Thread, Lock, current_thread
+from typing import Optional
+import glob
+import heapq
+import itertools
+import logging
+import os
+import socket
+import struct
+import time
+import wave
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Add actions, as numbered by the server command reference.
+ACTION_HEAD = 0
+ACTION_TAIL = 1
+ACTION_BEFORE = 2
+ACTION_AFTER = 3
+ACTION_REPLACE = 4
+
+class MockCommandError(Exception):
+    """
+    Raised by a command handler to reply with /fail.
+    """
+    pass
+
+class MockNode:
+    def __init__(self, id: int, is_group: bool, synthdef: Optional[str] = None, controls: dict = None):
+        self.id = id
+        self.is_group = is_group
+        self.synthdef = synthdef
+        self.controls = controls or {}
+        self.mappings = {}
+        self.running = True
+        self.parent = None
+        self.children = []
+
+    def siblings(self) -> tuple:
+        """
+        Returns the IDs of the nodes before and after this one in its group, or -1.
+        """
+        if self.parent is None:
+            return -1, -1
+        children = self.parent.children
+        index = children.index(self)
+        prev_id = children[index - 1].id if index > 0 else -1
+        next_id = children[index + 1].id if index < len(children) - 1 else -1
+        return prev_id, next_id
+
+    def descendants(self) -> list[MockNode]:
+        nodes = []
+        for child in self.children:
+            nodes.append(child)
+            nodes += child.descendants()
+        return nodes
+
+class MockBuffer:
+    def __init__(self, num_frames: int, num_channels: int, sample_rate: float, samples: list = None):
+        self.num_frames = num_frames
+        self.num_channels = num_channels
+        self.sample_rate = sample_rate
+        self.samples = samples if samples is not None else [0.0] * (num_frames * num_channels)
+
+class MockSCSynth:
+    def __init__(self,
+                 port: int = 0,
+                 hostname: str = "127.0.0.1",
+                 sample_rate: float = 44100.0,
+                 num_control_buses: int = 16384):
+        """
+        Create and start a mock SC server.
+
+        Args:
+            port (int): The UDP port to listen on, or 0 to use any free port.
+            hostname (str): The address to listen on.
+            sample_rate (float): The nominal sample rate reported by /status.
+            num_control_buses (int): The number of control buses.
+        """
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 22)
+        self.socket.bind((hostname, port))
+        self.port = self.socket.getsockname()[1]
+
+        self.sample_rate = sample_rate
+        self.synthdefs = {}
+        self.nodes = {0: MockNode(0, True)}
+        self.buffers = {}
+        self.control_buses = [0.0] * num_control_buses
+        self.notify_clients = {}
+        self.client_ids = itertools.count(0)
+
+        # Bundles scheduled for the future: (time, sequence, messages, client address)
+        self.scheduled = []
+        self.sequence = itertools.count()
+
+        self.num_packets = 0
+        self.num_messages = 0
+        self.lock = Lock()
+        self.running = True
+        self.thread = Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def __enter__(self) -> MockSCSynth:
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Stop the server and close its socket.
+        """
+        self.running = False
+        # Wake the network thread from recvfrom, so that the socket is released before returning.
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        if self.thread is not current_thread():
+            self.thread.join()
+        self.socket.close()
+
+    def add_synthdef(self, name: str, controls: dict) -> None:
+        """
+        Register a SynthDef, so that its Synths are created with the given default controls.
+
+        Args:
+            name (str): The SynthDef name.
+            controls (dict): The control names and default values, in order.
+        """
+        self.synthdefs[name] = dict(controls)
+
+    #--------------------------------------------------------------------------------
+    # Network loop
+    #--------------------------------------------------------------------------------
+
+    def _serve(self) -> None:
+        while self.running:
+            timeout = None
+            if self.scheduled:
+                timeout = max(0.0, self.scheduled[0][0] - time.time())
+            try:
+                self.socket.settimeout(timeout)
+                data, address = self.socket.recvfrom(65536)
+            except (socket.timeout, BlockingIOError):
+                # A timeout of zero, when a bundle is already due, makes the socket non-blocking.
+                data = None
+            except OSError:
+                break
+            if not self.running:
+                break
+
+            if data is not None:
+                self.num_packets += 1
+                self._receive_packet(data, address)
+            self._run_scheduled()
+
+    def _receive_packet(self, data: bytes, address) -> None:
+        try:
+            if OscBundle.dgram_is_bundle(data):
+                bundle = OscBundle(data)
+                messages = [message for message in _bundle_messages(bundle)]
+                if bundle.timestamp > time.time():
+                    heapq.heappush(self.scheduled, (bundle.timestamp, next(self.sequence), messages, address))
+                    return
+            else:
+                messages = [message.message for message in OscPacket(data).messages]
+        except ParseError:
+            logger.warning("Mock scsynth received an invalid packet")
+            return
+
+        for message in messages:
+            self._perform(message.address, list(message.params), address)
+
+    def _run_scheduled(self) -> None:
+        now = time.time()
+        while self.scheduled and self.scheduled[0][0] <= now:
+            _, _, messages, address = heapq.heappop(self.scheduled)
+            for message in messages:
+                self._perform(message.address, list(message.params), address)
+
+    def _perform(self, command: str, args: list, address) -> None:
+        self.num_messages += 1
+        handler = self.COMMANDS.get(command)
+        if handler is None:
+            self._reply(address, "/fail", command, "Command not found")
+            return
+        try:
+            with self.lock:
+                handler(self, args, address)
+        except MockCommandError as e:
+            fail_args = [command, str(e)]
+            if command.startswith("/b_") and args and isinstance(args[0], int):
+                fail_args.append(args[0])
+            self._reply(address, "/fail", *fail_args)
+        except (IndexError, ValueError, TypeError, KeyError) as e:
+            self._reply(address, "/fail", command, "Invalid arguments: %s" % e)
+
+    def _reply(self, address, reply_address: str, *args) -> None:
+        try:
+            self.socket.sendto(encode_message(reply_address, args), address)
+        except OSError:
+            pass
+
+    def _notify(self, reply_address: str, node: MockNode) -> None:
+        if not self.notify_clients:
+            return
+        parent_id = node.parent.id if node.parent else -1
+        prev_id, next_id = node.siblings()
+        args = [node.id, parent_id, prev_id, next_id, int(node.is_group)]
+        if node.is_group:
+            args += [node.children[0].id if node.children else -1,
+                     node.children[-1].id if node.children else -1]
+        for client in self.notify_clients:
+            self._reply(client, reply_address, *args)
+
+    #--------------------------------------------------------------------------------
+    # Node tree
+    #--------------------------------------------------------------------------------
+
+    def _get_node(self, node_id: int) -> MockNode:
+        node = self.nodes.get(node_id)
+        if node is None:
+            raise MockCommandError("Node %d not found" % node_id)
+        return node
+
+    def _get_group(self, node_id: int) -> MockNode:
+        node = self._get_node(node_id)
+        if not node.is_group:
+            raise MockCommandError("Node %d is not a group" % node_id)
+        return node
+
+    def _insert(self, node: MockNode, action: int, target_id: int) -> None:
+        target = self._get_node(target_id)
+        if action in (ACTION_HEAD, ACTION_TAIL):
+            if not target.is_group:
+                raise MockCommandError("Node %d is not a group" % target_id)
+            parent = target
+            index = 0 if action == ACTION_HEAD else len(parent.children)
+        elif action in (ACTION_AFTER, ACTION_BEFORE, ACTION_REPLACE):
+            parent = target.parent
+            if parent is None:
+                raise MockCommandError("Cannot add relative to the root node")
+            index = parent.children.index(target)
+            if action == ACTION_AFTER:
+                index += 1
+        else:
+            raise MockCommandError("Invalid add action %d" % action)
+
+        node.parent = parent
+        parent.children.insert(index, node)
+        if action == ACTION_REPLACE:
+            self._free_node(target)
+
+    def _add(self, node: MockNode, action: int, target_id: int) -> None:
+        if node.id in self.nodes:
+            raise MockCommandError("Node %d already exists" % node.id)
+        self._insert(node, action, target_id)
+        self.nodes[node.id] = node
+        self._notify("/n_go", node)
+
+    def _move(self, node: MockNode, action: int, target_id: int) -> None:
+        if node.id == target_id:
+            return
+        node.parent.children.remove(node)
+        self._insert(node, action, target_id)
+        self._notify("/n_move", node)
+
+    def _free_node(self, node: MockNode) -> None:
+        for child in list(node.children):
+            self._free_node(child)
+        self._notify("/n_end", node)
+        if node.parent is not None:
+            node.parent.children.remove(node)
+            node.parent = None
+        del self.nodes[node.id]
+
+    def _set_control(self, node: MockNode, control, value) -> None:
+        if isinstance(control, int):
+            names = list(node.controls)
+            if control >= len(names):
+                return
+            control = names[control]
+        node.controls[control] = float(value)
+        node.mappings.pop(control, None)
+
+    def _synths_in(self, node: MockNode) -> list[MockNode]:
+        if node.is_group:
+            return [descendant for descendant in node.descendants() if not descendant.is_group]
+        return [node]
+
+    def _query_tree(self, group: MockNode, include_controls: bool) -> list:
+        args = [group.id, len(group.children)]
+        for child in group.children:
+            if child.is_group:
+                args += self._query_tree(child, include_controls)
+            else:
+                args += [child.id, -1, child.synthdef]
+                if include_controls:
+                    args.append(len(child.controls))
+                    for name, value in child.controls.items():
+                        args += [name, child.mappings.get(name, value)]
+        return args
+
+    #--------------------------------------------------------------------------------
+    # Commands
+    #--------------------------------------------------------------------------------
+
+    def _cmd_quit(self, args, address):
+        self._reply(address, "/done", "/quit")
+        self.running = False
+
+    def _cmd_notify(self, args, address):
+        if args[0]:
+            client_id = self.notify_clients.setdefault(address, next(self.client_ids))
+            self._reply(address, "/done", "/notify", client_id)
+        else:
+            self.notify_clients.pop(address, None)
+            self._reply(address, "/done", "/notify")
+
+    def _cmd_status(self, args, address):
+        synths = [node for node in self.nodes.values() if not node.is_group]
+        num_groups = len(self.nodes) - len(synths)
+        # Simulate a small, constant CPU cost per Synth.
+        cpu_average = 0.1 + 0.05 * len(synths)
+        self._reply(address, "/status.reply", 1, len(synths), len(synths), num_groups, len(self.synthdefs),
+                    cpu_average, cpu_average * 1.5, self.sample_rate, self.sample_rate)
+
+    def _cmd_version(self, args, address):
+        self._reply(address, "/version.reply", "scsynth", 3, 13, ".0", "mock", "0")
+
+    def _cmd_sync(self, args, address):
+        self._reply(address, "/synced", args[0])
+
+    def _cmd_s_new(self, args, address):
+        synthdef, node_id, action, target_id = args[:4]
+        controls = dict(self.synthdefs.get(synthdef, {}))
+        node = MockNode(node_id, False, synthdef, controls)
+        for control, value in zip(args[4::2], args[5::2]):
+            self._set_control(node, control, value)
+        self._add(node, action, target_id)
+
+    def _cmd_g_new(self, args, address):
+        for node_id, action, target_id in zip(args[0::3], args[1::3], args[2::3]):
+            self._add(MockNode(node_id, True), action, target_id)
+
+    def _cmd_n_free(self, args, address):
+        for node_id in args:
+            self._free_node(self._get_node(node_id))
+
+    def _cmd_n_run(self, args, address):
+        for node_id, flag in zip(args[0::2], args[1::2]):
+            node = self._get_node(node_id)
+            if node.running != bool(flag):
+                node.running = bool(flag)
+                self._notify("/n_on" if flag else "/n_off", node)
+
+    def _cmd_n_set(self, args, address):
+        node = self._get_node(args[0])
+        for synth in self._synths_in(node):
+            for control, value in zip(args[1::2], args[2::2]):
+                self._set_control(synth, control, value)
+
+    def _cmd_n_setn(self, args, address):
+        node = self._get_node(args[0])
+        index = 1
+        while index < len(args):
+            control, count = args[index], args[index + 1]
+            values = args[index + 2:index + 2 + count]
+            for synth in self._synths_in(node):
+                names = list(synth.controls)
+                start = names.index(control) if isinstance(control, str) and control in names else control
+                for offset, value in enumerate(values):
+                    if isinstance(start, int) and start + offset < len(names):
+                        self._set_control(synth, names[start + offset], value)
+                    elif offset == 0:
+                        self._set_control(synth, control, value)
+            index += 2 + count
+
+    def _cmd_n_map(self, args, address, suffix="c"):
+        node = self._get_node(args[0])
+        for control, bus in zip(args[1::2], args[2::2]):
+            for synth in self._synths_in(node):
+                if bus < 0:
+                    synth.mappings.pop(control, None)
+                else:
+                    synth.mappings[control] = "%s%d" % (suffix, bus)
+
+    def _cmd_n_mapa(self, args, address):
+        self._cmd_n_map(args, address, "a")
+
+    def _cmd_n_mapn(self, args, address, suffix="c"):
+        node = self._get_node(args[0])
+        for control, bus, count in zip(args[1::3], args[2::3], args[3::3]):
+            for synth in self._synths_in(node):
+                names = list(synth.controls)
+                start = names.index(control) if control in names else None
+                for offset in range(count):
+                    name = names[start + offset] if start is not None and start + offset < len(names) else control
+                    if bus < 0:
+                        synth.mappings.pop(name, None)
+                    else:
+                        synth.mappings[name] = "%s%d" % (suffix, bus + offset)
+
+    def _cmd_n_mapan(self, args, address):
+        self._cmd_n_mapn(args, address, "a")
+
+    def _cmd_n_before(self, args, address):
+        for node_id, target_id in zip(args[0::2], args[1::2]):
+            self._move(self._get_node(node_id), ACTION_BEFORE, target_id)
+
+    def _cmd_n_after(self, args, address):
+        for node_id, target_id in zip(args[0::2], args[1::2]):
+            self._move(self._get_node(node_id), ACTION_AFTER, target_id)
+
+    def _cmd_g_head(self, args, address):
+        for group_id, node_id in zip(args[0::2], args[1::2]):
+            self._move(self._get_node(node_id), ACTION_HEAD, group_id)
+
+    def _cmd_g_tail(self, args, address):
+        for group_id, node_id in zip(args[0::2], args[1::2]):
+            self._move(self._get_node(node_id), ACTION_TAIL, group_id)
+
+    def _cmd_g_freeAll(self, args, address):
+        for group_id in args:
+            for child in list(self._get_group(group_id).children):
+                self._free_node(child)
+
+    def _cmd_g_deepFree(self, args, address):
+        for group_id in args:
+            for synth in self._synths_in(self._get_group(group_id)):
+                self._free_node(synth)
+
+    def _cmd_s_get(self, args, address):
+        node = self._get_node(args[0])
+        for control in args[1:]:
+            if isinstance(control, int):
+                names = list(node.controls)
+                value = node.controls[names[control]] if control < len(names) else 0.0
+            else:
+                value = node.controls.get(control, 0.0)
+            self._reply(address, "/n_set", node.id, control, value)
+
+    def _cmd_g_queryTree(self, args, address):
+        for group_id, flag in zip(args[0::2], args[1::2]):
+            group = self._get_group(group_id)
+            self._reply(address, "/g_queryTree.reply", flag, *self._query_tree(group, bool(flag)))
+
+    def _get_buffer(self, buffer_id: int) -> MockBuffer:
+        buf = self.buffers.get(buffer_id)
+        if buf is None:
+            raise MockCommandError("Buffer %d not allocated" % buffer_id)
+        return buf
+
+    def _cmd_b_alloc(self, args, address):
+        buffer_id, num_frames = args[:2]
+        num_channels = args[2] if len(args) > 2 else 1
+        self.buffers[buffer_id] = MockBuffer(num_frames, num_channels, self.sample_rate)
+        self._reply(address, "/done", "/b_alloc", buffer_id)
+
+    def _cmd_b_allocRead(self, args, address):
+        buffer_id, path = args[:2]
+        start_frame = args[2] if len(args) > 2 else 0
+        num_frames = args[3] if len(args) > 3 else 0
+        samples, num_channels, sample_rate = _read_audio_file(path)
+        samples = samples[start_frame * num_channels:]
+        if num_frames > 0:
+            samples = samples[:num_frames * num_channels]
+        self.buffers[buffer_id] = MockBuffer(len(samples) // num_channels, num_channels, sample_rate, samples)
+        self._reply(address, "/done", "/b_allocRead", buffer_id)
+
+    def _cmd_b_write(self, args, address):
+        buffer_id, path = args[:2]
+        header_format = args[2] if len(args) > 2 else "aiff"
+        sample_format = args[3] if len(args) > 3 else "int24"
+        num_frames = args[4] if len(args) > 4 else -1
+        start_frame = args[5] if len(args) > 5 else 0
+        buf = self._get_buffer(buffer_id)
+        if header_format != "wav":
+            raise MockCommandError("Unsupported header format: %s" % header_format)
+        end_frame = buf.num_frames if num_frames < 0 else min(buf.num_frames, start_frame + num_frames)
+        samples = buf.samples[start_frame * buf.num_channels:end_frame * buf.num_channels]
+        _write_audio_file(path, samples, buf.num_channels, int(buf.sample_rate), sample_format)
+        self._reply(address, "/done", "/b_write", buffer_id)
+
+    def _cmd_b_free(self, args, address):
+        self._get_buffer(args[0])
+        del self.buffers[args[0]]
+        self._reply(address, "/done", "/b_free", args[0])
+
+    def _cmd_b_query(self, args, address):
+        for buffer_id in args:
+            buf = self._get_buffer(buffer_id)
+            self._reply(address, "/b_info", buffer_id, buf.num_frames, buf.num_channels, buf.sample_rate)
+
+    def _cmd_b_getn(self, args, address):
+        buf = self._get_buffer(args[0])
+        for start, count in zip(args[1::2], args[2::2]):
+            if start < 0 or start + count > len(buf.samples):
+                raise MockCommandError("Index out of range")
+            self._reply(address, "/b_setn", args[0], start, count, *buf.samples[start:start + count])
+
+    def _cmd_b_setn(self, args, address):
+        buf = self._get_buffer(args[0])
+        index = 1
+        while index < len(args):
+            start, count = args[index], args[index + 1]
+            values = [float(value) for value in args[index + 2:index + 2 + count]]
+            buf.samples[start:start + count] = values[:max(0, len(buf.samples) - start)]
+            index += 2 + count
+
+    def _cmd_b_fill(self, args, address):
+        buf = self._get_buffer(args[0])
+        for start, count, value in zip(args[1::3], args[2::3], args[3::3]):
+            for index in range(start, min(start + count, len(buf.samples))):
+                buf.samples[index] = float(value)
+
+    def _cmd_c_set(self, args, address):
+        for index, value in zip(args[0::2], args[1::2]):
+            self.control_buses[index] = float(value)
+
+    def _cmd_c_setn(self, args, address):
+        index = 0
+        while index < len(args):
+            start, count = args[index], args[index + 1]
+            self.control_buses[start:start + count] = [float(value) for value in args[index + 2:index + 2 + count]]
+            index += 2 + count
+
+    def _cmd_c_fill(self, args, address):
+        for start, count, value in zip(args[0::3], args[1::3], args[2::3]):
+            self.control_buses[start:start + count] = [float(value)] * count
+
+    def _cmd_c_get(self, args, address):
+        reply = []
+        for index in args:
+            reply += [index, self.control_buses[index]]
+        self._reply(address, "/c_set", *reply)
+
+    def _cmd_c_getn(self, args, address):
+        reply = []
+        for start, count in zip(args[0::2], args[1::2]):
+            reply += [start, count, *self.control_buses[start:start + count]]
+        self._reply(address, "/c_setn", *reply)
+
+    def _receive_synthdefs(self, data: bytes) -> None:
+        from .synthdef import SynthDef
+
+        try:
+            synthdefs = SynthDef.parse(data)
+        except (ValueError, IndexError, struct.error, UnicodeDecodeError):
+            raise MockCommandError("Invalid SynthDef data")
+        for synthdef in synthdefs:
+            self.add_synthdef(synthdef.name, synthdef.controls)
+
+    def _load_synthdef_files(self, paths: list) -> None:
+        for path in paths:
+            try:
+                with open(path, "rb") as fd:
+                    self._receive_synthdefs(fd.read())
+            except OSError:
+                raise MockCommandError("File '%s' could not be opened" % path)
+
+    def _cmd_d_recv(self, args, address):
+        self._receive_synthdefs(args[0])
+        self._reply(address, "/done", "/d_recv")
+
+    def _cmd_d_load(self, args, address):
+        self._load_synthdef_files(sorted(glob.glob(args[0])))
+        self._reply(address, "/done", "/d_load")
+
+    def _cmd_d_loadDir(self, args, address):
+        if not os.path.isdir(args[0]):
+            raise MockCommandError("Directory '%s' not found" % args[0])
+        self._load_synthdef_files(sorted(glob.glob(os.path.join(args[0], "**", "*.scsyndef"), recursive=True)))
+        self._reply(address, "/done", "/d_loadDir")
+
+    def _cmd_d_free(self, args, address):
+        for name in args:
+            self.synthdefs.pop(name, None)
+
+    def _cmd_ignore(self, args, address):
+        pass
+
+    COMMANDS = {
+        "/quit": _cmd_quit,
+        "/notify": _cmd_notify,
+        "/status": _cmd_status,
+        "/version": _cmd_version,
+        "/sync": _cmd_sync,
+        "/dumpOSC": _cmd_ignore,
+        "/clearSched": _cmd_ignore,
+        "/error": _cmd_ignore,
+        "/d_recv": _cmd_d_recv,
+        "/d_load": _cmd_d_load,
+        "/d_loadDir": _cmd_d_loadDir,
+        "/d_free": _cmd_d_free,
+        "/s_new": _cmd_s_new,
+        "/s_get": _cmd_s_get,
+        "/g_new": _cmd_g_new,
+        "/g_head": _cmd_g_head,
+        "/g_tail": _cmd_g_tail,
+        "/g_freeAll": _cmd_g_freeAll,
+        "/g_deepFree": _cmd_g_deepFree,
+        "/g_queryTree": _cmd_g_queryTree,
+        "/n_free": _cmd_n_free,
+        "/n_run": _cmd_n_run,
+        "/n_set": _cmd_n_set,
+        "/n_setn": _cmd_n_setn,
+        "/n_map": _cmd_n_map,
+        "/n_mapn": _cmd_n_mapn,
+        "/n_mapa": _cmd_n_mapa,
+        "/n_mapan": _cmd_n_mapan,
+        "/n_before": _cmd_n_before,
+        "/n_after": _cmd_n_after,
+        "/b_alloc": _cmd_b_alloc,
+        "/b_allocRead": _cmd_b_allocRead,
+        "/b_write": _cmd_b_write,
+        "/b_free": _cmd_b_free,
+        "/b_query": _cmd_b_query,
+        "/b_getn": _cmd_b_getn,
+        "/b_setn": _cmd_b_setn,
+        "/b_fill": _cmd_b_fill,
+        "/c_set": _cmd_c_set,
+        "/c_setn": _cmd_c_setn,
+        "/c_fill": _cmd_c_fill,
+        "/c_get": _cmd_c_get,
+        "/c_getn": _cmd_c_getn,
+    }
+
+def _bundle_messages(bundle: OscBundle):
+    for content in bundle:
+        if isinstance(content, OscBundle):
+            yield from _bundle_messages(content)
+        else:
+            yield content
+
+def _read_audio_file(path: str) -> tuple:
+    """
+    Read a WAV file as a flat list of interleaved samples.
+
+    Returns:
+        A tuple of (samples, num_channels, sample_rate).
+    """
+    from .wavfile import read_float_wav
+
+    try:
+        with wave.open(path, "rb") as fd:
+            num_channels = fd.getnchannels()
+            sample_width = fd.getsampwidth()
+            sample_rate = fd.getframerate()
+            data = fd.readframes(fd.getnframes())
+    except FileNotFoundError:
+        raise MockCommandError("File '%s' could not be opened" % path)
+    except wave.Error:
+        # The wave module does not support float WAV files.
+        if np is None:
+            raise MockCommandError("File '%s' could not be read" % path)
+        try:
+            samples = read_float_wav(path)
+        except ValueError:
+            raise MockCommandError("File '%s' could not be read" % path)
+        with open(path, "rb") as fd:
+            fd.seek(24)
+            sample_rate = int.from_bytes(fd.read(4), "little")
+        num_channels = 1 if samples.ndim == 1 else samples.shape[1]
+        return samples.ravel().tolist(), num_channels, float(sample_rate)
+
+    if sample_width == 1:
+        samples = [(byte - 128) / 128 for byte in data]
+    else:
+        scale = float(1 << (8 * sample_width - 1))
+        samples = [int.from_bytes(data[n:n + sample_width], "little", signed=True) / scale
+                   for n in range(0, len(data), sample_width)]
+    return samples, num_channels, float(sample_rate)
+
+def _write_audio_file(path: str, samples: list, num_channels: int, sample_rate: int, sample_format: str) -> None:
+    from .wavfile import write_float_wav
+
+    if sample_format == "float":
+        if np is None:
+            raise MockCommandError("Writing float files requires NumPy")
+        write_float_wav(path, np.array(samples, dtype=np.float32).reshape(-1, num_channels), sample_rate)
+        return
+
+    sample_widths = {"int8": 1, "int16": 2, "int24": 3, "int32": 4}
+    if sample_format not in sample_widths:
+        raise MockCommandError("Unsupported sample format: %s" % sample_format)
+    sample_width = sample_widths[sample_format]
+    scale = 1 << (8 * sample_width - 1)
+    data = bytearray()
+    for sample in samples:
+        value = max(-scale, min(scale - 1, int(sample * scale)))
+        if sample_width == 1:
+            data.append(value + 128)
+        else:
+            data += value.to_bytes(sample_width, "little", signed=True)
+
+    with wave.open(path, "wb") as fd:
+        fd.setnchannels(num_channels)
+        fd.setsampwidth(sample_width)
+        fd.setframerate(sample_rate)
+        fd.writeframes(bytes(data))
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Mock SuperCollider server, for testing")
+    parser.add_argument("-u", "--port", type=int, default=57110, help="UDP port to listen on")
+    parser.add_argument("-B", "--bind", default="127.0.0.1", help="Address to listen on")
+    args, _ = parser.parse_known_args()
+
+    mock = MockSCSynth(port=args.port, hostname=args.bind)
+    print("Mock SuperCollider server listening on port %d" % mock.port, flush=True)
+    try:
+        while mock.running:
+            time.sleep(0.1)
+    except KeyboardInterrupt:
+        pass
+    mock.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+from .buffer import Buffer
+from .bus import Bus, AudioBus
+from .nodetree import NodeInfo
+from typing import TYPE_CHECKING, Callable, Optional, Union
+
+if TYPE_CHECKING:
+    from .server import Server
+
+def control_value(value):
+    """
+    Convert a control value to a type that can be sent over OSC: Buffer and Bus objects
+    are replaced by their IDs, and NumPy scalars by the equivalent Python type.
+    """
+    if isinstance(value, (Buffer, Bus)):
+        return value.id
+    elif hasattr(value, "item") and not isinstance(value, (str, bytes)):
+        return value.item()
+    return value
+
+def control_args(parameters: dict) -> list:
+    """
+    Flatten a dict of control names (or indices) and values into an OSC argument list.
+    """
+    args = []
+    for parameter, value in parameters.items():
+        args += [parameter, control_value(value)]
+    return args
+
+def control_range_args(ranges: dict) -> list:
+    """
+    Flatten a dict of control names (or indices) and lists of values into the argument
+    list of /n_setn: [control, count, values...] for each range.
+    """
+    args = []
+    for parameter, values in ranges.items():
+        if hasattr(values, "tolist"):
+            # NumPy array
+            values = values.tolist()
+        else:
+            values = [control_value(value) for value in values]
+        args += [parameter, len(values), *values]
+    return args
+
+class Node:
+    """
+    Base class for Synth and Group, the nodes of the server's node tree.
+    """
+
+    server: Server
+    id: int
+
+    def set(self,
+            parameter: Union[str, int, dict],
+            value: Union[int, float, str, None] = None,
+            timestamp: Optional[float] = None) -> None:
+        """
+        Set one or more controls of the node, in a single /n_set message.
+        When called on a Group, sets the controls of every Synth within it.
+
+        Example:
+            >>> synth.set("freq", 880.0)
+            >>> synth.set({"freq": 880.0, "gain": -6.0})
+
+        Args:
+            parameter: The control name or index, or a dict of control names and values.
+            value: The value, if a single control name is given. Can be of type int, float, str,
+                   or a Buffer or Bus, which is replaced by its ID.
+            timestamp (float): The time at which to execute the command, in seconds since the epoch.
+                               Defaults to now, plus the server's latency if set.
+        """
+        if isinstance(parameter, dict):
+            args = control_args(parameter)
+        else:
+            args = [parameter, control_value(value)]
+        self.server._send_msg("/n_set", self.id, *args, timestamp=timestamp)
+
+    def setn(self,
+             parameter: Union[str, int, dict],
+             values: Optional[list] = None,
+             timestamp: Optional[float] = None) -> None:
+        """
+        Set one or more ranges of adjacent controls of the node, in a single /n_setn message.
+        Values may be given as lists or NumPy arrays.
+
+        Example:
+            >>> synth.setn("amps", [0.5, 0.25, 0.125])
+            >>> synth.setn({"amps": numpy.ones(8), "freqs": numpy.arange(8) * 110.0})
+
+        Args:
+            parameter: The name or index of the first control in the range, or a dict of
+                       names and values.
+            values (list): The values, if a single control name is given.
+            timestamp (float): The time at which to execute the command, in seconds since the epoch.
+                               Defaults to now, plus the server's latency if set.
+        """
+        if not isinstance(parameter, dict):
+            parameter = {parameter: values}
+        self.server._send_msg("/n_setn", self.id, *control_range_args(parameter), timestamp=timestamp)
+
+    def map(self,
+            parameter: Union[str, int, dict],
+            bus: Union[Bus, int, None] = None,
+            timestamp: Optional[float] = None) -> None:
+        """
+        Map one or more controls of the node to read from buses, so that they follow the buses'
+        values. A multi-channel bus maps consecutive controls, starting with the given one, to
+        consecutive channels. When called on a Group, maps the controls of every Synth within it.
+
+        Example:
+            >>> synth.map("freq", freq_bus)
+            >>> group.map({"freq": freq_bus, "pan": pan_bus})
+            >>> synth.map("freq", None)
+
+        Args:
+            parameter: The control name or index, or a dict of control names and buses.
+            bus: A ControlBus or AudioBus, an integer control bus index, or None to unmap the control.
+            timestamp (float): The time at which to execute the command, in seconds since the epoch.
+                               Defaults to now, plus the server's latency if set.
+        """
+        if not isinstance(parameter, dict):
+            parameter = {parameter: bus}
+
+        # Arguments of /n_map, /n_mapn, /n_mapa and /n_mapan.
+        commands = {"/n_map": [], "/n_mapn": [], "/n_mapa": [], "/n_mapan": []}
+        for name, bus in parameter.items():
+            address = "/n_mapa" if isinstance(bus, AudioBus) else "/n_map"
+            channels = bus.channels if isinstance(bus, Bus) else 1
+            index = control_value(bus) if bus is not None else -1
+            if channels > 1:
+                commands[address + "n"] += [name, index, channels]
+            else:
+                commands[address] += [name, index]
+
+        timestamp = self.server._resolve_timestamp(timestamp)
+        for address, args in commands.items():
+            if args:
+                self.server._send_msg(address, self.id, *args, timestamp=timestamp)
+
+    def unmap(self, parameter: Union[str, int, list], timestamp: Optional[float] = None) -> None:
+        """
+        Unmap one or more controls from the buses they are mapped to.
+
+        Args:
+            parameter: The control name or index, or a list of names.
+            timestamp (float): The time at which to execute the command, in seconds since the epoch.
+                               Defaults to now, plus the server's latency if set.
+        """
+        parameters = parameter if isinstance(parameter, list) else [parameter]
+        self.map({name: None for name in parameters}, timestamp=timestamp)
+
+    def run(self, running: bool = True, timestamp: Optional[float] = None) -> None:
+        """
+        Resume or pause the node. A paused node is not processed, but remains in the
+        node tree, and can be resumed later.
+
+        Args:
+            running (bool): True to resume the node, False to pause it.
+            timestamp (float): The time at which to execute the command, in seconds since the epoch.
+                               Defaults to now, plus the server's latency if set.
+        """
+        self.server._send_msg("/n_run", self.id, int(running), timestamp=timestamp)
+
+    @property
+    def is_playing(self) -> bool:
+        """
+        True if the node is playing on the server, as of the most recent notification.
+        A new node is playing once the server's /n_go notification has been received.
+        Requires notifications to be enabled with `Server.notify()`.
+        """
+        return self._get_node_info() is not None
+
+    @property
+    def is_running(self) -> bool:
+        """
+        True if the node is playing and has not been paused.
+        Requires notifications to be enabled with `Server.notify()`.
+        """
+        info = self._get_node_info()
+        return info is not None and info.is_running
+
+    def on_end(self, callback: Callable) -> None:
+        """
+        Register a function to be called with the node's ID when the node ends, for example
+        when it is freed or its envelope completes. The callback is called on the server's
+        callback thread, in the order that nodes end, so may itself query the server.
+        Requires notifications to be enabled with `Server.notify()`.
+
+        Args:
+            callback (function): The function to call.
+        """
+        self._get_node_info()
+        self.server.node_tree.add_end_callback(self.id, callback)
+
+    def _get_node_info(self) -> Optional[NodeInfo]:
+        if self.server.node_tree is None:
+            raise RuntimeError("Node state requires notifications. Call server.notify() first.")
+        return self.server.node_tree.get(self.id)
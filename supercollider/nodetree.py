@@ -0,0 +1,336 @@
+from __future__ import annotations
+
+from threading import Lock
+from typing import Callable, Optional
+import time
+
+# Node notifications sent by the server to clients registered with /notify.
+NODE_NOTIFICATIONS = ("/n_go", "/n_end", "/n_off", "/n_on", "/n_move")
+
+class NodeInfo:
+    def __init__(self, id: int, is_group: bool):
+        """
+        The last known state of a node on the server: its position in the tree, and whether
+        it is running. IDs of -1 indicate no such node.
+        """
+        self.id = id
+        self.is_group = is_group
+        self.is_running = True
+        self.parent_id = -1
+        self.prev_id = -1
+        self.next_id = -1
+        self.head_id = -1
+        self.tail_id = -1
+
+    def __repr__(self):
+        return "NodeInfo(id=%d, is_group=%s, parent_id=%d, is_running=%s)" % (self.id, self.is_group,
+                                                                               self.parent_id, self.is_running)
+
+class NodeTree:
+    def __init__(self, run_callback: Optional[Callable] = None):
+        """
+        A client-side mirror of the server's node tree, kept up to date incrementally from the
+        node notifications (/n_go, /n_end, /n_off, /n_on and /n_move) that the server sends to
+        clients registered with /notify. Used by Server when notifications are enabled with
+        `Server.notify()`.
+
+        Only nodes created after notifications are enabled are known to the tree.
+
+        Example:
+            >>> server.notify()
+            >>> synth = Synth(server, "sine")
+            >>> server.node_tree.get(synth.id)
+            NodeInfo(id=1000, is_group=False, parent_id=0, is_running=True)
+
+        Args:
+            run_callback (function): Called with each end callback and its argument, to run the
+                                     callback. Defaults to calling it directly, from `update()`.
+        """
+        self.nodes = {0: NodeInfo(0, True)}
+        self.end_callbacks = {}
+        self.run_callback = run_callback
+        self.lock = Lock()
+
+    def __contains__(self, node_id: int) -> bool:
+        return node_id in self.nodes
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def get(self, node_id: int) -> Optional[NodeInfo]:
+        """
+        Returns the state of the node with the given ID, or None if it is not known to be playing.
+        """
+        return self.nodes.get(node_id)
+
+    def children(self, group_id: int) -> list[int]:
+        """
+        Returns the IDs of the nodes in a group, in order from head to tail.
+        """
+        with self.lock:
+            group = self.nodes.get(group_id)
+            child_ids = []
+            node_id = group.head_id if group else -1
+            while node_id != -1 and node_id in self.nodes:
+                child_ids.append(node_id)
+                node_id = self.nodes[node_id].next_id
+            return child_ids
+
+    def add_end_callback(self, node_id: int, callback: Callable) -> None:
+        """
+        Register a function to be called with the node ID when the node ends.
+        """
+        with self.lock:
+            self.end_callbacks.setdefault(node_id, []).append(callback)
+
+    def update(self, address: str, args: tuple) -> None:
+        """
+        Update the tree from a node notification.
+
+        Args:
+            address (str): The notification's OSC address, e.g. /n_go.
+            args (tuple): The notification's arguments: node ID, parent ID, previous and next node
+                          IDs, is-group flag, and for groups, head and tail node IDs.
+        """
+        node_id = args[0]
+        callbacks = None
+        with self.lock:
+            if address == "/n_go":
+                node = NodeInfo(node_id, bool(args[4]))
+                self.nodes[node_id] = node
+                self._link(node, args)
+            elif address == "/n_end":
+                callbacks = self._remove(node_id)
+            elif address == "/n_move":
+                node = self.nodes.get(node_id)
+                if node is not None:
+                    self._unlink(node)
+                    self._link(node, args)
+            elif address in ("/n_off", "/n_on"):
+                node = self.nodes.get(node_id)
+                if node is not None:
+                    node.is_running = address == "/n_on"
+
+        for ended_id, callback in callbacks or ():
+            if self.run_callback is not None:
+                self.run_callback(callback, ended_id)
+            else:
+                callback(ended_id)
+
+    def _link(self, node: NodeInfo, args: tuple) -> None:
+        node.parent_id, node.prev_id, node.next_id = args[1:4]
+        if node.is_group and len(args) > 6:
+            node.head_id, node.tail_id = args[5:7]
+        self._set_neighbours(node, node.id, node.id)
+
+    def _unlink(self, node: NodeInfo) -> None:
+        self._set_neighbours(node, node.next_id, node.prev_id)
+
+    def _set_neighbours(self, node: NodeInfo, prev_next_id: int, next_prev_id: int) -> None:
+        """
+        Point the nodes either side of `node` (or its parent's head and tail) at new neighbours.
+        """
+        parent = self.nodes.get(node.parent_id)
+        if node.prev_id == -1:
+            if parent is not None:
+                parent.head_id = prev_next_id
+        elif node.prev_id in self.nodes:
+            self.nodes[node.prev_id].next_id = prev_next_id
+
+        if node.next_id == -1:
+            if parent is not None:
+                parent.tail_id = next_prev_id
+        elif node.next_id in self.nodes:
+            self.nodes[node.next_id].prev_id = next_prev_id
+
+    def _remove(self, node_id: int) -> list[tuple]:
+        """
+        Remove a node and any of its descendants still in the tree.
+
+        Returns:
+            The (node ID, callback) pairs of the removed nodes' end callbacks.
+        """
+        node = self.nodes.pop(node_id, None)
+        callbacks = [(node_id, callback) for callback in self.end_callbacks.pop(node_id, ())]
+        if node is None:
+            return callbacks
+        self._unlink(node)
+        child_id = node.head_id if node.is_group else -1
+        while child_id in self.nodes:
+            next_id = self.nodes[child_id].next_id
+            callbacks += self._remove(child_id)
+            child_id = next_id
+        return callbacks
+
+class SynthSnapshot:
+    is_group = False
+
+    def __init__(self, id: int, parent_id: int, synthdef: str, controls: Optional[dict] = None):
+        """
+        A Synth in a TreeSnapshot.
+
+        Args:
+            id (int): The node ID.
+            parent_id (int): The ID of the Group containing the Synth.
+            synthdef (str): The name of the Synth's SynthDef.
+            controls (dict): The control names and values, if queried. Controls that are mapped
+                             to a bus have a value such as "c0" (control bus 0) or "a2" (audio bus 2).
+        """
+        self.id = id
+        self.parent_id = parent_id
+        self.synthdef = synthdef
+        self.controls = controls
+
+    def __repr__(self):
+        return "SynthSnapshot(id=%d, synthdef=%r)" % (self.id, self.synthdef)
+
+class GroupSnapshot:
+    is_group = True
+
+    def __init__(self, id: int, parent_id: int):
+        """
+        A Group in a TreeSnapshot, whose `children` are its Synths and Groups in order
+        from head to tail.
+        """
+        self.id = id
+        self.parent_id = parent_id
+        self.children = []
+
+    def __repr__(self):
+        return "GroupSnapshot(id=%d, children=%r)" % (self.id, [child.id for child in self.children])
+
+class TreeDiff:
+    def __init__(self):
+        """
+        The differences between two TreeSnapshots.
+
+        Attributes:
+            added (list[int]): IDs of nodes that are only in the newer snapshot.
+            removed (list[int]): IDs of nodes that are only in the older snapshot.
+            moved (list[int]): IDs of nodes that are in a different Group.
+            changed (dict): For each Synth whose controls differ, a dict mapping each changed
+                            control name to its (old, new) values. Only compared when both
+                            snapshots include controls.
+        """
+        self.added = []
+        self.removed = []
+        self.moved = []
+        self.changed = {}
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.moved or self.changed)
+
+    def __repr__(self):
+        return "TreeDiff(added=%r, removed=%r, moved=%r, changed=%r)" % (self.added, self.removed,
+                                                                        self.moved, self.changed)
+
+class TreeSnapshot:
+    def __init__(self, root: GroupSnapshot, nodes: dict, include_controls: bool, timestamp: float):
+        """
+        A parsed /g_queryTree reply: the tree of Groups and Synths under a Group at the time
+        of the query. Nodes can be looked up by ID: `snapshot[1000]`.
+
+        Args:
+            root (GroupSnapshot): The queried Group.
+            nodes (dict): All nodes in the tree, including the root, keyed by ID.
+            include_controls (bool): Whether the Synths' control values were queried.
+            timestamp (float): The time at which the snapshot was requested, per time.time().
+        """
+        self.root = root
+        self.nodes = nodes
+        self.include_controls = include_controls
+        self.timestamp = timestamp
+
+    def __getitem__(self, node_id: int):
+        return self.nodes[node_id]
+
+    def __contains__(self, node_id: int) -> bool:
+        return node_id in self.nodes
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def synths(self) -> list[SynthSnapshot]:
+        """
+        Returns every Synth in the tree, in depth-first order.
+        """
+        return [node for node in self.nodes.values() if not node.is_group]
+
+    def diff(self, previous: TreeSnapshot) -> TreeDiff:
+        """
+        Compare this snapshot with an earlier one.
+
+        Example:
+            >>> before = server.get_tree(controls=True)
+            >>> synth.set("freq", 880.0)
+            >>> server.get_tree(controls=True).diff(before)
+            TreeDiff(added=[], removed=[], moved=[], changed={1000: {'freq': (440.0, 880.0)}})
+
+        Args:
+            previous (TreeSnapshot): The earlier snapshot.
+
+        Returns:
+            A TreeDiff describing the changes from `previous` to this snapshot.
+        """
+        diff = TreeDiff()
+        compare_controls = self.include_controls and previous.include_controls
+        for node_id, node in self.nodes.items():
+            old_node = previous.nodes.get(node_id)
+            if old_node is None or old_node.is_group != node.is_group:
+                diff.added.append(node_id)
+                continue
+            if old_node.parent_id != node.parent_id:
+                diff.moved.append(node_id)
+            if compare_controls and not node.is_group and node.controls != old_node.controls:
+                diff.changed[node_id] = {name: (old_node.controls.get(name), value)
+                                         for name, value in node.controls.items()
+                                         if old_node.controls.get(name) != value}
+        diff.removed = [node_id for node_id, node in previous.nodes.items()
+                        if node_id not in self.nodes or self.nodes[node_id].is_group != node.is_group]
+        return diff
+
+def parse_query_tree(args: tuple, timestamp: Optional[float] = None) -> TreeSnapshot:
+    """
+    Parse the arguments of a /g_queryTree.reply message.
+
+    Args:
+        args (tuple): The reply's arguments, starting with the controls flag.
+        timestamp (float): The time at which the query was made. Defaults to now.
+
+    Returns:
+        A TreeSnapshot.
+    """
+    include_controls = bool(args[0])
+    nodes = {}
+    root = GroupSnapshot(args[1], -1)
+    nodes[root.id] = root
+
+    # Stack of (group, number of children still to be parsed)
+    stack = [(root, args[2])]
+    index = 3
+    while stack:
+        group, remaining = stack[-1]
+        if remaining == 0:
+            stack.pop()
+            continue
+        stack[-1] = (group, remaining - 1)
+
+        node_id, num_children = args[index], args[index + 1]
+        index += 2
+        if num_children < 0:
+            synthdef = args[index]
+            index += 1
+            controls = None
+            if include_controls:
+                num_controls = args[index]
+                end = index + 1 + 2 * num_controls
+                controls = dict(zip(args[index + 1:end:2], args[index + 2:end:2]))
+                index = end
+            node = SynthSnapshot(node_id, group.id, synthdef, controls)
+        else:
+            node = GroupSnapshot(node_id, group.id)
+            stack.append((node, num_children))
+        group.children.append(node)
+        nodes[node_id] = node
+
+    return TreeSnapshot(root, nodes, include_controls, time.time() if timestamp is None else timestamp)
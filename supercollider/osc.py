@@ -0,0 +1,167 @@
+"""
+Low-level OSC encoding used by Server to build the datagrams it sends.
+"""
+
+from pythonosc.osc_message_builder import OscMessageBuilder
+from typing import Optional
+import struct
+
+BUNDLE_HEADER = b"#bundle\x00"
+
+# The OSC timetag with special meaning "immediately".
+TIMETAG_IMMEDIATE = struct.pack(">Q", 1)
+
+# Size of an empty bundle: header plus timetag.
+BUNDLE_OVERHEAD = len(BUNDLE_HEADER) + len(TIMETAG_IMMEDIATE)
+
+# Each bundle element is prefixed by its int32 size.
+BUNDLE_ELEMENT_OVERHEAD = 4
+
+# Seconds between the NTP epoch (1900) and the Unix epoch (1970).
+NTP_EPOCH_OFFSET = 2208988800
+
+def encode_timetag(timestamp: Optional[float]) -> bytes:
+    """
+    Encode a Unix timestamp as an OSC (NTP format) timetag.
+
+    Args:
+        timestamp (float): Seconds since the Unix epoch, as returned by time.time(),
+                           or None or 0 for "immediately".
+
+    Returns:
+        The encoded 8-byte timetag.
+    """
+    if not timestamp:
+        return TIMETAG_IMMEDIATE
+    seconds, fraction = divmod(timestamp + NTP_EPOCH_OFFSET, 1)
+    return struct.pack(">II", int(seconds), int(fraction * 4294967296))
+
+# Range of OSC int32 arguments; larger ints are sent as int64.
+INT32_MIN = -(1 << 31)
+INT32_MAX = (1 << 31) - 1
+
+# Maximum number of message templates to cache before the cache is cleared.
+MAX_TEMPLATES = 4096
+
+class MessageTemplate:
+    def __init__(self, address: str, signature: tuple):
+        """
+        A precompiled encoder for OSC messages with a given address and argument signature.
+        The address and type tags are encoded once, and each message is then packed with a
+        single call to a precompiled struct.
+
+        Args:
+            address (str): The OSC address.
+            signature (tuple): For each argument, its OSC type tag, or for strings and blobs,
+                               the length of its encoded data.
+        """
+        type_tags = ","
+        formats = []
+        for item in signature:
+            if item == "i":
+                type_tags += "i"
+                formats.append("i")
+            elif item == "h":
+                type_tags += "h"
+                formats.append("q")
+            elif item == "f":
+                type_tags += "f"
+                formats.append("f")
+            elif item in ("T", "F", "N"):
+                type_tags += item
+            elif isinstance(item, int):
+                # Strings are null-terminated, padded to a multiple of 4 bytes.
+                type_tags += "s"
+                formats.append("%ds" % _padded_size(item + 1))
+            else:
+                # Blobs are prefixed by their size and padded to a multiple of 4 bytes.
+                size = item[1]
+                type_tags += "b"
+                formats.append("i%ds" % _padded_size(size))
+
+        self.header = _encode_string(address) + _encode_string(type_tags)
+        self.struct = struct.Struct(">%ds" % len(self.header) + "".join(formats))
+
+    def encode(self, values: list) -> bytes:
+        return self.struct.pack(self.header, *values)
+
+_templates = {}
+
+def _padded_size(size: int) -> int:
+    return (size + 3) & ~3
+
+def _encode_string(value: str) -> bytes:
+    data = value.encode()
+    return data + b"\x00" * (_padded_size(len(data) + 1) - len(data))
+
+def encode_message(address: str, args) -> bytes:
+    """
+    Encode an OSC message.
+
+    Messages whose arguments are ints, floats, strings, blobs, bools or None are encoded with
+    a MessageTemplate, cached by address and argument signature, so that repeated messages of
+    the same shape (e.g. /n_set with an int, str and float) skip type inference and
+    concatenation. Other argument types are encoded by python-osc.
+
+    Args:
+        address (str): The OSC address.
+        args (list): The message arguments.
+
+    Returns:
+        The encoded datagram.
+    """
+    signature = []
+    values = []
+    for arg in args:
+        arg_type = type(arg)
+        if arg_type is float:
+            signature.append("f")
+            values.append(arg)
+        elif arg_type is int:
+            signature.append("i" if INT32_MIN <= arg <= INT32_MAX else "h")
+            values.append(arg)
+        elif arg_type is str:
+            data = arg.encode()
+            signature.append(len(data))
+            values.append(data)
+        elif arg_type is bool:
+            signature.append("T" if arg else "F")
+        elif arg is None:
+            signature.append("N")
+        elif arg_type is bytes:
+            signature.append(("b", len(arg)))
+            values.append(len(arg))
+            values.append(arg)
+        else:
+            return _encode_message_builder(address, args)
+
+    key = (address, *signature)
+    template = _templates.get(key)
+    if template is None:
+        if len(_templates) >= MAX_TEMPLATES:
+            _templates.clear()
+        template = _templates[key] = MessageTemplate(address, tuple(signature))
+    return template.encode(values)
+
+def _encode_message_builder(address: str, args) -> bytes:
+    builder = OscMessageBuilder(address)
+    for arg in args:
+        builder.add_arg(arg)
+    return builder.build().dgram
+
+def encode_bundle(dgrams: list[bytes], timetag: bytes = TIMETAG_IMMEDIATE) -> bytes:
+    """
+    Encode a list of encoded OSC messages as a single OSC bundle.
+
+    Args:
+        dgrams (list[bytes]): The encoded messages.
+        timetag (bytes): The encoded 8-byte timetag of the bundle.
+
+    Returns:
+        The encoded datagram.
+    """
+    parts = [BUNDLE_HEADER, timetag]
+    for dgram in dgrams:
+        parts.append(struct.pack(">i", len(dgram)))
+        parts.append(dgram)
+    return b"".join(parts)
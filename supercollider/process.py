@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+from .server import Server
+from .buffer import Buffer
+from .synthdef import SynthDef, synthdef_cache
+from .exceptions import SuperColliderConnectionError
+from .osc import encode_message
+from threading import Thread, Lock
+from typing import Callable, Optional, Union
+from collections import deque
+import logging
+import os
+import shlex
+import socket
+import subprocess
+import time
+
+logger = logging.getLogger(__name__)
+
+# Readiness polling: the first /status is retried after this interval, doubling up to the maximum.
+READY_POLL_INTERVAL = 0.002
+READY_POLL_MAX_INTERVAL = 0.1
+
+class ServerProcess:
+    def __init__(self,
+                 binary: Union[str, list[str]] = "scsynth",
+                 port: int = 57110,
+                 hostname: str = "127.0.0.1",
+                 block_size: Optional[int] = None,
+                 num_buffers: Optional[int] = None,
+                 max_nodes: Optional[int] = None,
+                 args: Optional[list[str]] = None,
+                 synthdefs: Optional[list] = None,
+                 buffers: Optional[list[str]] = None,
+                 load_default_synthdefs: bool = False,
+                 restart: bool = False,
+                 on_restart: Optional[Callable] = None,
+                 startup_timeout: float = 10.0):
+        """
+        Launches and manages a local scsynth process, and the Server connected to it.
+
+        `start()` returns once the server replies to /status, polling with a short interval
+        that backs off exponentially, so that startup is not delayed by a fixed timeout. The
+        server can be pre-warmed with SynthDefs and Buffers, which are sent as soon as it is
+        ready. To reduce startup time, SynthDefs in scsynth's default directory are not loaded
+        (-D 0) unless `load_default_synthdefs` is set, and Zeroconf publishing is disabled (-R 0).
+
+        The time taken to start and to pre-warm are recorded in `startup_time` and `warm_time`.
+
+        Example:
+            >>> process = ServerProcess(synthdefs=["synthdefs/sine.scsyndef"], buffers=["kick.wav"])
+            >>> server = process.start()
+            >>> synth = Synth(server, "sine")
+            >>> process.stop()
+
+        Args:
+            binary (str | list[str]): The scsynth executable, or a command line to run.
+            port (int): The UDP port for scsynth to listen on (-u).
+            hostname (str): The address at which to connect to the server.
+            block_size (int): The number of samples per control period (-z).
+            num_buffers (int): The number of sample buffers (-b).
+            max_nodes (int): The maximum number of nodes (-n).
+            args (list[str]): Additional command-line arguments to scsynth.
+            synthdefs (list): SynthDefs to send once the server is ready: SynthDef objects, or paths
+                              of .scsyndef files or of directories, which are loaded with /d_loadDir.
+            buffers (list[str]): Paths of audio files to read into Buffers once the server is ready.
+                                 The Buffers are stored in `buffers`, keyed by path.
+            load_default_synthdefs (bool): Load the SynthDefs in scsynth's default directory at startup.
+            restart (bool): If True, relaunch and pre-warm the server if the process exits unexpectedly,
+                            and replay the Server's journal, if enabled.
+            on_restart (function): Called with the ServerProcess after each restart.
+            startup_timeout (float): The time to wait for the server to become ready, in seconds.
+        """
+        self.binary = shlex.split(binary) if isinstance(binary, str) else list(binary)
+        self.port = port
+        self.hostname = hostname
+        self.block_size = block_size
+        self.num_buffers = num_buffers
+        self.max_nodes = max_nodes
+        self.args = list(args or [])
+        self.synthdefs = list(synthdefs or [])
+        self.buffer_paths = list(buffers or [])
+        self.load_default_synthdefs = load_default_synthdefs
+        self.restart = restart
+        self.on_restart = on_restart
+        self.startup_timeout = startup_timeout
+
+        self.process = None
+        self.server = None
+        self.buffers = {}
+        self.startup_time = None
+        self.warm_time = None
+        self.restart_count = 0
+
+        # The last lines written by the process, for reporting failures.
+        self.output = deque(maxlen=20)
+        self.stopping = False
+        self.lock = Lock()
+        self.monitor_thread = None
+
+    def __enter__(self) -> Server:
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def command(self) -> list[str]:
+        """
+        The command line used to launch the server.
+        """
+        command = self.binary + ["-u", str(self.port), "-R", "0"]
+        if not self.load_default_synthdefs:
+            command += ["-D", "0"]
+        if self.block_size is not None:
+            command += ["-z", str(self.block_size)]
+        if self.num_buffers is not None:
+            command += ["-b", str(self.num_buffers)]
+        if self.max_nodes is not None:
+            command += ["-n", str(self.max_nodes)]
+        return command + self.args
+
+    @property
+    def is_running(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def start(self) -> Server:
+        """
+        Launch the server, wait for it to become ready, and pre-warm it.
+
+        Returns:
+            The Server connected to the process.
+
+        Raises:
+            SuperColliderConnectionError: If the process exits or does not become ready within
+                                          `startup_timeout`.
+        """
+        with self.lock:
+            self.stopping = False
+            self._launch()
+            if self.restart:
+                self.monitor_thread = Thread(target=self._monitor, daemon=True)
+                self.monitor_thread.start()
+        return self.server
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """
+        Shut down the server with /quit, terminating the process if it has not exited
+        within `timeout` seconds.
+        """
+        with self.lock:
+            self.stopping = True
+            if self.process is None:
+                return
+            if self.is_running and self.server is not None:
+                self.server._send_msg("/quit", timestamp=0)
+            try:
+                self.process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                logger.warning("scsynth did not quit, terminating")
+                self.process.terminate()
+                try:
+                    self.process.wait(timeout)
+                except subprocess.TimeoutExpired:
+                    self.process.kill()
+                    self.process.wait()
+        if self.monitor_thread is not None:
+            self.monitor_thread.join()
+            self.monitor_thread = None
+
+    def _launch(self) -> None:
+        t0 = time.perf_counter()
+        self.output.clear()
+        self.process = subprocess.Popen(self.command,
+                                        stdin=subprocess.DEVNULL,
+                                        stdout=subprocess.PIPE,
+                                        stderr=subprocess.STDOUT,
+                                        text=True)
+        Thread(target=self._read_output, args=(self.process,), daemon=True).start()
+        try:
+            self._wait_until_ready()
+        except SuperColliderConnectionError:
+            self.process.kill()
+            self.process.wait()
+            raise
+        self.startup_time = time.perf_counter() - t0
+
+        if self.server is None:
+            self.server = Server(self.hostname, self.port)
+        self._warm()
+        logger.info("scsynth ready on port %d in %.1fms, warmed in %.1fms" % (self.port, self.startup_time * 1000,
+                                                                             self.warm_time * 1000))
+
+    def _wait_until_ready(self) -> None:
+        """
+        Poll the server with /status until it replies, backing off exponentially.
+        """
+        status = encode_message("/status", [])
+        deadline = time.perf_counter() + self.startup_timeout
+        interval = READY_POLL_INTERVAL
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            while True:
+                if self.process.poll() is not None:
+                    # Wait briefly for the output reader to collect the process's last words.
+                    time.sleep(0.05)
+                    raise SuperColliderConnectionError("scsynth exited with code %d: %s" % (self.process.returncode,
+                                                                                            " / ".join(self.output)))
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    raise SuperColliderConnectionError("scsynth did not become ready within %.1fs" % self.startup_timeout)
+                sock.settimeout(min(interval, remaining))
+                try:
+                    sock.sendto(status, (self.hostname, self.port))
+                    sock.recvfrom(1024)
+                    return
+                except (socket.timeout, ConnectionRefusedError):
+                    # A refused send fails at once, so wait out the interval before retrying.
+                    time.sleep(max(0, min(interval, deadline - time.perf_counter())))
+                interval = min(interval * 2, READY_POLL_MAX_INTERVAL)
+
+    def _warm(self) -> None:
+        """
+        Send the SynthDefs and read the Buffers that the server is pre-warmed with. After a restart,
+        the files are read into the same Buffers as before, so that Buffer objects taken from
+        `buffers` remain valid.
+        """
+        t0 = time.perf_counter()
+
+        # The process has just started, so has none of the SynthDefs sent to its predecessor.
+        synthdef_cache.clear(self.server)
+        synthdefs = []
+        synthdef_dirs = []
+        for synthdef in self.synthdefs:
+            if isinstance(synthdef, SynthDef):
+                synthdefs.append(synthdef)
+            elif os.path.isdir(synthdef):
+                SynthDef.load_dir(self.server, synthdef)
+                synthdef_dirs.append(synthdef)
+            else:
+                synthdefs += SynthDef.read(synthdef)
+        SynthDef.send_many(self.server, synthdefs)
+
+        if self.buffers:
+            with self.server.bundle(timestamp=0):
+                for path, buf in self.buffers.items():
+                    self.server._send_msg("/b_allocRead", buf.id, os.path.abspath(path), 0, 0)
+            self.server.sync()
+        else:
+            self.buffers = dict(zip(self.buffer_paths, Buffer.read_many(self.server, self.buffer_paths)))
+
+        # The pre-warmed state is rebuilt here on each restart, so is left out of the Server's
+        # journal, whose replay would otherwise rebuild it a second time.
+        if self.server.journal is not None:
+            self.server.journal.forget(buffer_ids=[buf.id for buf in self.buffers.values()],
+                                       synthdefs=[synthdef.name for synthdef in synthdefs],
+                                       synthdef_paths=synthdef_dirs)
+        self.warm_time = time.perf_counter() - t0
+
+    def _read_output(self, process: subprocess.Popen) -> None:
+        for line in process.stdout:
+            line = line.rstrip()
+            self.output.append(line)
+            logger.debug("scsynth: %s" % line)
+
+    def _monitor(self) -> None:
+        """
+        Relaunch the server whenever the process exits, until stop() is called.
+        """
+        while True:
+            process = self.process
+            process.wait()
+            with self.lock:
+                if self.stopping:
+                    return
+                logger.warning("scsynth exited with code %d, restarting" % process.returncode)
+                try:
+                    self._launch()
+                    if self.server.journal is not None:
+                        self.server.journal.replay(self.server)
+                except SuperColliderConnectionError as e:
+                    logger.error("Could not restart scsynth: %s" % e)
+                    return
+                self.restart_count += 1
+            if self.on_restart is not None:
+                self.on_restart(self)
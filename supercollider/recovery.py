@@ -0,0 +1,608 @@
+from __future__ import annotations
+
+from .bundle import Bundle
+from .exceptions import SuperColliderConnectionError, SuperColliderCommandError
+from .osc import encode_message
+from .synthdef import SynthDef, synthdef_cache
+from . import globals
+from threading import Thread, Lock, Event
+from typing import TYPE_CHECKING, Callable, Optional
+import logging
+import struct
+import time
+
+if TYPE_CHECKING:
+    from .server import Server
+
+logger = logging.getLogger(__name__)
+
+class JournalNode:
+    def __init__(self, id: int, is_group: bool, parent_id: int, action: int, target: int,
+                 synthdef: Optional[str] = None, controls: Optional[dict] = None):
+        """
+        A node recorded by a StateJournal: how it was created, its current parent Group, and the
+        controls, bus mappings and run state set since.
+        """
+        self.id = id
+        self.is_group = is_group
+        self.parent_id = parent_id
+        self.action = action
+        self.target = target
+        self.synthdef = synthdef
+        self.controls = controls or {}
+        # Control ranges set with /n_setn: control -> values
+        self.ranges = {}
+        # Bus mappings: control -> (address, args)
+        self.mappings = {}
+        self.is_running = True
+
+class StateJournal:
+    def __init__(self):
+        """
+        A record of the state that a client has created on the server, from which the state can
+        be rebuilt after the server restarts: live Groups, Synths with their current controls and
+        bus mappings, Buffers with their sizes or source paths, SynthDefs, and control bus values.
+
+        The journal is kept up to date from the commands sent by the Server that owns it, so it
+        covers state created through this library but not by other clients. The contents of
+        Buffers written with `set` or `fill` are not recorded, only how they were allocated.
+        Synths that end of their own accord (for example, by a doneAction) are only removed from
+        the journal while notifications are enabled with `Server.notify()`.
+
+        Typically created by `Server.enable_journal()`.
+
+        Example:
+            >>> server.enable_journal()
+            >>> synth = Synth(server, "sine", {"freq": 440.0})
+            >>> # ...scsynth restarts...
+            >>> server.journal.replay(server)
+        """
+        self.nodes = {}
+        self.moves = []
+        self.buffers = {}
+        self.synthdefs = {}
+        self.synthdef_paths = []
+        self.control_buses = {}
+        self.last_replay = None
+        self.lock = Lock()
+        self.replay_lock = Lock()
+
+    @property
+    def num_groups(self) -> int:
+        return sum(1 for node in self.nodes.values() if node.is_group)
+
+    @property
+    def num_synths(self) -> int:
+        return sum(1 for node in self.nodes.values() if not node.is_group)
+
+    def record(self, address: str, args: tuple) -> None:
+        """
+        Update the journal from a command sent to the server.
+        """
+        recorder = self.RECORDERS.get(address)
+        if recorder is not None:
+            with self.lock:
+                try:
+                    recorder(self, list(args))
+                except (IndexError, ValueError, TypeError, struct.error):
+                    logger.warning("Could not record %s in journal" % address)
+
+    def remove(self, node_id: int) -> None:
+        """
+        Remove a node that has ended, and its descendants.
+        """
+        with self.lock:
+            self._remove_node(node_id)
+
+    def update(self, address: str, args: tuple) -> None:
+        """
+        Update the journal from a node notification: nodes that end are removed, and nodes
+        that start or move are given the parent reported by the server.
+        """
+        if address == "/n_end":
+            self.remove(args[0])
+        elif address in ("/n_go", "/n_move"):
+            with self.lock:
+                self._set_parent(args[0], args[1])
+
+    def forget(self, buffer_ids: list[int] = (), synthdefs: list[str] = (), synthdef_paths: list[str] = ()) -> None:
+        """
+        Remove Buffers and SynthDefs from the journal, so that replay does not rebuild them:
+        for example, those that a ServerProcess rebuilds itself when it restarts the server.
+
+        Args:
+            buffer_ids (list[int]): The IDs of the Buffers to remove.
+            synthdefs (list[str]): The names of the SynthDefs to remove.
+            synthdef_paths (list[str]): The paths of SynthDef files or directories to remove.
+        """
+        with self.lock:
+            for buffer_id in buffer_ids:
+                self.buffers.pop(buffer_id, None)
+            for name in synthdefs:
+                self.synthdefs.pop(name, None)
+            self.synthdef_paths = [(address, path) for address, path in self.synthdef_paths
+                                   if path not in synthdef_paths]
+
+    def is_missing(self, status: dict, include_synths: bool = False) -> bool:
+        """
+        Returns True if a server status shows fewer Groups than the journal records, indicating
+        that the server has lost its state. The number of SynthDefs is not compared, as a restarted
+        server may load its default SynthDefs, and SynthDefs may be freed by other clients.
+
+        Args:
+            status (dict): The server status, as returned by `Server.get_status()`.
+            include_synths (bool): Also compare the number of Synths. Only reliable when
+                                   Synths that end are removed from the journal, i.e. when
+                                   notifications are enabled.
+        """
+        with self.lock:
+            # The server's count of groups includes the root group.
+            if status["num_groups"] < self.num_groups + 1:
+                return True
+            return include_synths and status["num_synths"] < self.num_synths
+
+    def missing_buffers(self, server: Server) -> list[int]:
+        """
+        Returns the IDs of the recorded Buffers that the server does not hold, by querying each
+        with /b_query. Requires a Server rather than an AsyncServer.
+
+        Args:
+            server (Server): The SC server to query.
+        """
+        with self.lock:
+            buffer_ids = list(self.buffers)
+        futures = []
+        for buffer_id in buffer_ids:
+            futures.append(server._expect_response("/b_info", [buffer_id], command="/b_query"))
+            server._send_msg("/b_query", buffer_id, timestamp=0)
+
+        missing = []
+        try:
+            for buffer_id, future in zip(buffer_ids, futures):
+                try:
+                    # Unallocated buffers have no frames.
+                    if server._await_response(future)[1] == 0:
+                        missing.append(buffer_id)
+                except SuperColliderCommandError:
+                    missing.append(buffer_id)
+        finally:
+            for future in futures:
+                server.responses.discard(future)
+        return missing
+
+    def replay(self, server: Server) -> None:
+        """
+        Rebuild the recorded state on a server that has lost it. SynthDefs are sent first, then
+        Buffers that the server does not hold are allocated and read, and then nodes are created with their current controls,
+        each Group before the nodes within it. Nodes are added relative to the same target as
+        originally, if it is still recorded, or else to the tail of their parent Group, and recorded
+        moves are then repeated. Messages are packed into as few bundles as possible, and the
+        server is synced after each stage. Nodes and Buffers keep their IDs, so existing Synth,
+        Group and Buffer objects remain valid. Requires a Server rather than an AsyncServer.
+
+        Args:
+            server (Server): The SC server to rebuild the state on.
+        """
+        with self.replay_lock:
+            t0 = time.perf_counter()
+            with self.lock:
+                nodes = list(self.nodes.values())
+                moves = list(self.moves)
+                buffers = list(self.buffers.values())
+                synthdefs = list(self.synthdefs.values())
+                synthdef_paths = list(self.synthdef_paths)
+                control_buses = sorted(self.control_buses.items())
+
+            # Buffers that the server still holds are not allocated again, which would clear them.
+            missing_buffers = set(self.missing_buffers(server))
+            buffers = [(address, args) for address, args in buffers if args[0] in missing_buffers]
+
+            # Register for notifications again, with a fresh node tree.
+            if server.node_tree is not None:
+                server.node_tree = None
+                server.notify()
+
+            synthdef_cache.clear(server)
+            SynthDef.send_many(server, synthdefs)
+
+            # Messages are queued in a Bundle directly, rather than sent with _send_msg, so that
+            # they are not recorded in the journal again.
+            bundle = Bundle(server)
+            for address, path in synthdef_paths:
+                bundle.add(encode_message(address, [path]))
+            for address, args in buffers:
+                bundle.add(encode_message(address, args))
+            bundle.flush()
+            server.sync()
+
+            for node, action, target in self._replay_order(nodes):
+                if node.is_group:
+                    bundle.add(encode_message("/g_new", [node.id, action, target]))
+                else:
+                    controls = [value for item in node.controls.items() for value in item]
+                    bundle.add(encode_message("/s_new", [node.synthdef, node.id, action, target, *controls]))
+                for control, values in node.ranges.items():
+                    bundle.add(encode_message("/n_setn", [node.id, control, len(values), *values]))
+                for control, (address, args) in node.mappings.items():
+                    bundle.add(encode_message(address, [node.id, control, *args]))
+                if not node.is_running:
+                    bundle.add(encode_message("/n_run", [node.id, 0]))
+            for address, args in moves:
+                bundle.add(encode_message(address, args))
+            for index, value in control_buses:
+                bundle.add(encode_message("/c_set", [index, value]))
+            bundle.flush()
+            server.sync()
+
+            self.last_replay = time.time()
+            logger.info("Replayed %d SynthDefs, %d Buffers and %d nodes in %.1fms" % (
+                len(synthdefs), len(buffers), len(nodes), (time.perf_counter() - t0) * 1000))
+
+    #--------------------------------------------------------------------------------
+    # Node tree
+    #--------------------------------------------------------------------------------
+
+    def _replay_order(self, nodes: list[JournalNode]) -> list[tuple]:
+        """
+        Returns the (node, add action, target ID) with which to re-create each node, in tree order,
+        so that each Group is created before the nodes within it and siblings keep their creation
+        order. A node's original target is used only if it is created first and is still in the
+        same place relative to the node; otherwise (for example, if the target has been freed),
+        the node is added to the tail of its parent.
+        """
+        by_id = {node.id: node for node in nodes}
+        children = {}
+        for node in nodes:
+            children.setdefault(node.parent_id, []).append(node)
+
+        ordered = []
+        pending = [node for node in reversed(nodes) if node.parent_id not in by_id]
+        while pending:
+            node = pending.pop()
+            ordered.append(node)
+            pending.extend(reversed(children.pop(node.id, ())))
+
+        created = set()
+        replay = []
+        for node in ordered:
+            if node.action in (globals.ADD_TO_HEAD, globals.ADD_TO_TAIL):
+                keep_target = node.target == node.parent_id
+            elif node.action in (globals.ADD_BEFORE, globals.ADD_AFTER):
+                keep_target = node.target in created and by_id[node.target].parent_id == node.parent_id
+            else:
+                keep_target = False
+            if keep_target:
+                replay.append((node, node.action, node.target))
+            else:
+                replay.append((node, globals.ADD_TO_TAIL, node.parent_id))
+            created.add(node.id)
+        return replay
+
+    def _add_node(self, node: JournalNode) -> None:
+        target = self.nodes.get(node.target)
+        if node.action not in (globals.ADD_TO_HEAD, globals.ADD_TO_TAIL):
+            node.parent_id = target.parent_id if target else 0
+        if node.action == globals.ADD_REPLACE:
+            self._remove_node(node.target)
+        # Re-adding an ID (after it was freed on the server) moves it to the end of the order.
+        self.nodes.pop(node.id, None)
+        self.nodes[node.id] = node
+
+    def _descendants(self, group_id: int) -> list[int]:
+        return [node_id for node_id in self.nodes if self._has_ancestor(node_id, group_id)]
+
+    def _has_ancestor(self, node_id: int, group_id: int) -> bool:
+        node = self.nodes.get(node_id)
+        while node is not None and node.parent_id != -1:
+            if node.parent_id == group_id:
+                return True
+            node = self.nodes.get(node.parent_id)
+        return False
+
+    def _remove_node(self, node_id: int) -> None:
+        node = self.nodes.pop(node_id, None)
+        if node is None:
+            return
+        if node.is_group:
+            for descendant_id in self._descendants(node_id):
+                self.nodes.pop(descendant_id, None)
+        self._prune_moves()
+
+    def _prune_moves(self) -> None:
+        """
+        Discard recorded moves of nodes that have been freed, or relative to them.
+        """
+        if self.moves:
+            self.moves = [(address, args) for address, args in self.moves
+                          if all(self._is_live(move_id) for move_id in args)]
+
+    def _is_live(self, node_id: int) -> bool:
+        return node_id == 0 or node_id in self.nodes
+
+    def _set_parent(self, node_id: int, parent_id: int) -> None:
+        node = self.nodes.get(node_id)
+        if node is not None and parent_id != node_id:
+            node.parent_id = parent_id
+
+    #--------------------------------------------------------------------------------
+    # Command recorders
+    #--------------------------------------------------------------------------------
+
+    def _record_s_new(self, args):
+        synthdef, node_id, action, target = args[:4]
+        if node_id < 0:
+            # Server-assigned IDs cannot be addressed again, so need not be recorded.
+            return
+        controls = dict(zip(args[4::2], args[5::2]))
+        self._add_node(JournalNode(node_id, False, target, action, target, synthdef, controls))
+
+    def _record_g_new(self, args):
+        for node_id, action, target in zip(args[0::3], args[1::3], args[2::3]):
+            self._add_node(JournalNode(node_id, True, target, action, target))
+
+    def _synths(self, node_id: int) -> list[JournalNode]:
+        """
+        Returns the Synth with the given ID, or the Synths within the Group with the given ID.
+        """
+        node = self.nodes.get(node_id)
+        if node is None:
+            return []
+        if not node.is_group:
+            return [node]
+        return [self.nodes[child_id] for child_id in self._descendants(node_id) if not self.nodes[child_id].is_group]
+
+    def _record_n_set(self, args):
+        controls = dict(zip(args[1::2], args[2::2]))
+        for synth in self._synths(args[0]):
+            synth.controls.update(controls)
+
+    def _record_n_setn(self, args):
+        ranges = {}
+        index = 1
+        while index < len(args):
+            control, count = args[index], args[index + 1]
+            ranges[control] = args[index + 2:index + 2 + count]
+            index += 2 + count
+        for synth in self._synths(args[0]):
+            synth.ranges.update(ranges)
+
+    def _record_map(self, args, address, stride):
+        node = self.nodes.get(args[0])
+        if node is None:
+            return
+        for index in range(1, len(args), stride):
+            control, map_args = args[index], args[index + 1:index + stride]
+            if map_args[0] < 0:
+                node.mappings.pop(control, None)
+            else:
+                node.mappings[control] = (address, map_args)
+
+    def _record_n_map(self, args):
+        self._record_map(args, "/n_map", 2)
+
+    def _record_n_mapa(self, args):
+        self._record_map(args, "/n_mapa", 2)
+
+    def _record_n_mapn(self, args):
+        self._record_map(args, "/n_mapn", 3)
+
+    def _record_n_mapan(self, args):
+        self._record_map(args, "/n_mapan", 3)
+
+    def _record_n_run(self, args):
+        for node_id, flag in zip(args[0::2], args[1::2]):
+            if node_id in self.nodes:
+                self.nodes[node_id].is_running = bool(flag)
+
+    def _record_n_free(self, args):
+        for node_id in args:
+            self._remove_node(node_id)
+
+    def _record_g_freeAll(self, args):
+        for group_id in args:
+            for node_id in self._descendants(group_id):
+                self.nodes.pop(node_id, None)
+        self._prune_moves()
+
+    def _record_g_deepFree(self, args):
+        for group_id in args:
+            for node_id in self._descendants(group_id):
+                if not self.nodes[node_id].is_group:
+                    del self.nodes[node_id]
+        self._prune_moves()
+
+    def _record_n_move(self, args, address):
+        for node_id, target_id in zip(args[0::2], args[1::2]):
+            target = self.nodes.get(target_id)
+            self._set_parent(node_id, target.parent_id if target else 0)
+            self.moves.append((address, [node_id, target_id]))
+
+    def _record_n_before(self, args):
+        self._record_n_move(args, "/n_before")
+
+    def _record_n_after(self, args):
+        self._record_n_move(args, "/n_after")
+
+    def _record_g_move(self, args, address):
+        for group_id, node_id in zip(args[0::2], args[1::2]):
+            self._set_parent(node_id, group_id)
+            self.moves.append((address, [group_id, node_id]))
+
+    def _record_g_head(self, args):
+        self._record_g_move(args, "/g_head")
+
+    def _record_g_tail(self, args):
+        self._record_g_move(args, "/g_tail")
+
+    def _record_b_alloc(self, args):
+        self.buffers[args[0]] = ("/b_alloc", args)
+
+    def _record_b_allocRead(self, args):
+        self.buffers[args[0]] = ("/b_allocRead", args)
+
+    def _record_b_free(self, args):
+        self.buffers.pop(args[0], None)
+
+    def _record_d_recv(self, args):
+        for synthdef in SynthDef.parse(args[0]):
+            self.synthdefs[synthdef.name] = synthdef
+
+    def _record_d_load(self, args, address="/d_load"):
+        if (address, args[0]) not in self.synthdef_paths:
+            self.synthdef_paths.append((address, args[0]))
+
+    def _record_d_loadDir(self, args):
+        self._record_d_load(args, "/d_loadDir")
+
+    def _record_d_free(self, args):
+        for name in args:
+            self.synthdefs.pop(name, None)
+
+    def _record_c_set(self, args):
+        self.control_buses.update(zip(args[0::2], args[1::2]))
+
+    def _record_c_setn(self, args):
+        index = 0
+        while index < len(args):
+            start, count = args[index], args[index + 1]
+            self.control_buses.update(zip(range(start, start + count), args[index + 2:index + 2 + count]))
+            index += 2 + count
+
+    def _record_c_fill(self, args):
+        for start, count, value in zip(args[0::3], args[1::3], args[2::3]):
+            self.control_buses.update((index, value) for index in range(start, start + count))
+
+    RECORDERS = {
+        "/s_new": _record_s_new,
+        "/g_new": _record_g_new,
+        "/n_set": _record_n_set,
+        "/n_setn": _record_n_setn,
+        "/n_map": _record_n_map,
+        "/n_mapa": _record_n_mapa,
+        "/n_mapn": _record_n_mapn,
+        "/n_mapan": _record_n_mapan,
+        "/n_run": _record_n_run,
+        "/n_free": _record_n_free,
+        "/n_before": _record_n_before,
+        "/n_after": _record_n_after,
+        "/g_head": _record_g_head,
+        "/g_tail": _record_g_tail,
+        "/g_freeAll": _record_g_freeAll,
+        "/g_deepFree": _record_g_deepFree,
+        "/b_alloc": _record_b_alloc,
+        "/b_allocRead": _record_b_allocRead,
+        "/b_free": _record_b_free,
+        "/d_recv": _record_d_recv,
+        "/d_load": _record_d_load,
+        "/d_loadDir": _record_d_loadDir,
+        "/d_free": _record_d_free,
+        "/c_set": _record_c_set,
+        "/c_setn": _record_c_setn,
+        "/c_fill": _record_c_fill,
+    }
+
+class HealthMonitor:
+    def __init__(self,
+                 server: Server,
+                 interval: float = 1.0,
+                 max_failures: int = 3,
+                 timeout: Optional[float] = None,
+                 replay: bool = True,
+                 on_failure: Optional[Callable] = None,
+                 on_recovery: Optional[Callable] = None):
+        """
+        Checks that a server is alive by querying its status periodically, in a background thread.
+        The server is considered down after `max_failures` consecutive queries go unanswered.
+
+        When the server's status shows that it has lost the state recorded in its journal (because it
+        has restarted), or when it comes back after a failure without the Buffers in the journal, the
+        journal is replayed to rebuild the state. A server that was merely slow to reply keeps its
+        state, and is not replayed to.
+        Typically created by `Server.start_health_monitor()`.
+
+        Args:
+            server (Server): The SC server to monitor.
+            interval (float): The time between status queries, in seconds.
+            max_failures (int): The number of consecutive failed queries after which the server is
+                                considered down.
+            timeout (float): The time to wait for each status reply, in seconds. Defaults to the
+                             server's adaptive query timeout.
+            replay (bool): Whether to replay the server's journal, if enabled, when the server has lost its state.
+            on_failure (function): Called with the Server when it is considered down.
+            on_recovery (function): Called with the Server when it is back, after any replay.
+        """
+        self.server = server
+        self.interval = interval
+        self.max_failures = max_failures
+        self.timeout = timeout
+        self.replay = replay
+        self.on_failure = on_failure
+        self.on_recovery = on_recovery
+
+        self.is_alive = True
+        self.num_failures = 0
+        self.failed_at = None
+        self.last_status = None
+        self.stopped = Event()
+        self.thread = None
+
+    def start(self) -> None:
+        self.stopped.clear()
+        self.thread = Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def check(self) -> bool:
+        """
+        Query the server's status once, updating the monitor's state and replaying the
+        journal if required.
+
+        Returns:
+            True if the server replied.
+        """
+        try:
+            status = self.server.get_status(timeout=self.timeout)
+        except SuperColliderConnectionError:
+            self.num_failures += 1
+            if self.is_alive and self.num_failures >= self.max_failures:
+                self.is_alive = False
+                self.failed_at = time.time()
+                logger.error("SuperCollider server is not responding")
+                if self.on_failure is not None:
+                    self.on_failure(self.server)
+            return False
+
+        self.num_failures = 0
+        self.last_status = status
+        journal = self.server.journal
+        recovered = not self.is_alive
+        if recovered:
+            logger.warning("SuperCollider server is responding again")
+            # The server may have restarted while it was down, losing the SynthDefs it was sent.
+            synthdef_cache.clear(self.server)
+
+        if self.replay and journal is not None:
+            # The server may only have been slow to reply, or the journal may already have been
+            # replayed (e.g. by the ServerProcess that restarted it), so the journal is replayed
+            # only if the server has evidently lost its state: replaying it to a server that still
+            # holds the state would overwrite it.
+            if journal.is_missing(status, self.server.node_tree is not None) or \
+                    (recovered and journal.missing_buffers(self.server)):
+                journal.replay(self.server)
+
+        self.is_alive = True
+        if recovered and self.on_recovery is not None:
+            self.on_recovery(self.server)
+        return True
+
+    def _run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.warning("Health check failed: %s" % e)
@@ -0,0 +1,246 @@
+import re
+import threading
+import time
+from collections import deque
+from typing import Optional, Callable
+from .exceptions import SuperColliderCommandError
+
+# The node ID in a /fail message, e.g. "Node 1001 not found".
+NODE_ID_PATTERN = re.compile(r"\bNode (-?\d+)\b")
+
+class PendingResponse:
+    def __init__(self,
+                 address: str,
+                 match_args: tuple,
+                 future,
+                 callback: Optional[Callable] = None,
+                 command: Optional[str] = None):
+        """
+        A single request that is waiting for a reply from the SC server.
+
+        Args:
+            address (str): The OSC address of the expected reply.
+            match_args (tuple): Leading arguments that the reply must contain.
+            future: The Future that is resolved with the (optionally transformed) reply.
+            callback (function): Called with the reply's address and arguments, and whose return
+                                 value is used as the Future's result.
+            command (str): The address of the command that was sent, whose /fail reply fails the request.
+        """
+        self.address = address
+        self.match_args = match_args
+        self.future = future
+        self.callback = callback
+        self.command = command
+        self.created = time.perf_counter()
+
+    def resolve(self, address: str, args: tuple):
+        if self.future.done():
+            return
+        try:
+            if self.callback:
+                rv = self.callback(address, *args)
+            else:
+                rv = args
+        except Exception as e:
+            self.future.set_exception(e)
+        else:
+            self.future.set_result(rv)
+
+class ResponseTable:
+    def __init__(self):
+        """
+        A table of requests awaiting replies, keyed by reply address plus the leading
+        arguments that identify the reply (for example, a node ID and parameter name).
+
+        Any number of requests can be in flight at once. Each incoming reply resolves the
+        oldest pending request whose key matches, preferring the most specific key.
+        """
+        self.lock = threading.Lock()
+
+        # address -> { match_args -> deque of PendingResponse }
+        self.pending = {}
+
+        # address -> { len(match_args) -> number of keys of that length }
+        self.key_lengths = {}
+
+        # future -> PendingResponse, for discarding requests that time out
+        self.entries = {}
+
+        # command -> deque of PendingResponse, for failing requests on /fail
+        self.commands = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self,
+            address: str,
+            match_args,
+            future,
+            callback: Optional[Callable] = None,
+            command: Optional[str] = None) -> PendingResponse:
+        """
+        Register a request for a reply.
+
+        Args:
+            address (str): The OSC address of the expected reply.
+            match_args (list): Leading arguments that the reply must contain, or None to match any reply.
+            future: The Future to resolve.
+            callback (function): Optional transform applied to the reply.
+            command (str): The address of the command sent, if a /fail reply to it should fail the request.
+        """
+        match_args = tuple(match_args) if match_args else ()
+        entry = PendingResponse(address, match_args, future, callback, command)
+        with self.lock:
+            by_key = self.pending.setdefault(address, {})
+            queue = by_key.get(match_args)
+            if queue is None:
+                queue = by_key[match_args] = deque()
+                lengths = self.key_lengths.setdefault(address, {})
+                lengths[len(match_args)] = lengths.get(len(match_args), 0) + 1
+            queue.append(entry)
+            self.entries[future] = entry
+            if command is not None:
+                self.commands.setdefault(command, deque()).append(entry)
+        return entry
+
+    def discard(self, future) -> Optional[PendingResponse]:
+        """
+        Remove a request from the table without resolving it, e.g. after a timeout.
+
+        Returns:
+            The removed request, or None if it was not pending.
+        """
+        with self.lock:
+            entry = self.entries.pop(future, None)
+            if entry is None:
+                return None
+            self._remove_entry(entry)
+        return entry
+
+    def dispatch(self, address: str, args: tuple) -> Optional[PendingResponse]:
+        """
+        Resolve the oldest pending request matching the given reply.
+
+        Returns:
+            The resolved request, or None if no pending request matched.
+        """
+        with self.lock:
+            lengths = self.key_lengths.get(address)
+            if not lengths:
+                return None
+            by_key = self.pending[address]
+            entry = None
+            for length in sorted(lengths, reverse=True):
+                if length > len(args):
+                    continue
+                key = tuple(args[:length])
+                queue = by_key.get(key)
+                if queue:
+                    entry = queue[0]
+                    del self.entries[entry.future]
+                    self._remove_entry(entry)
+                    break
+            if entry is None:
+                return None
+
+        # Resolve outside the lock, as resolution may run arbitrary callbacks.
+        entry.resolve(address, args)
+        return entry
+
+    def fail(self, command: str, message: str, args: tuple = ()) -> list[PendingResponse]:
+        """
+        Fail pending requests for the given command with SuperColliderCommandError, in response
+        to a /fail reply. The failed request is identified by the first further argument of the
+        reply (such as the buffer number of a failed buffer command), or else by the node ID in
+        the error message, as the request whose match arguments include it. If the reply does
+        not identify a pending request, every request for the command is failed, as any of them
+        may be the one that failed.
+
+        Args:
+            command (str): The address of the failed command.
+            message (str): The server's error message.
+            args (tuple): Any further arguments of the /fail reply.
+
+        Returns:
+            The failed requests, which are empty if no pending request was sent with the command.
+        """
+        identifier = args[0] if args else None
+        if identifier is None:
+            match = NODE_ID_PATTERN.search(message)
+            if match:
+                identifier = int(match.group(1))
+
+        with self.lock:
+            queue = self.commands.get(command)
+            if not queue:
+                return []
+            entries = [entry for entry in queue if identifier is not None and identifier in entry.match_args][:1]
+            if not entries:
+                entries = list(queue)
+            for entry in entries:
+                del self.entries[entry.future]
+                self._remove_entry(entry)
+
+        for entry in entries:
+            if not entry.future.done():
+                entry.future.set_exception(SuperColliderCommandError(command, message))
+        return entries
+
+    def _remove_entry(self, entry: PendingResponse) -> None:
+        queue = self.pending[entry.address][entry.match_args]
+        queue.remove(entry)
+        if not queue:
+            self._remove_key(entry.address, entry.match_args)
+        if entry.command is not None:
+            commands = self.commands[entry.command]
+            commands.remove(entry)
+            if not commands:
+                del self.commands[entry.command]
+
+    def _remove_key(self, address: str, key: tuple) -> None:
+        del self.pending[address][key]
+        lengths = self.key_lengths[address]
+        lengths[len(key)] -= 1
+        if lengths[len(key)] == 0:
+            del lengths[len(key)]
+
+class RoundTripEstimator:
+    def __init__(self, gain: float = 0.125, variance_gain: float = 0.25, variance_factor: float = 4.0):
+        """
+        Estimates the round-trip time of requests to the server, as a smoothed mean and mean
+        deviation (an exponentially-weighted moving average of each), from which a timeout is
+        derived that adapts to the network and the server's load, per TCP's RFC 6298.
+
+        Args:
+            gain (float): The weight of each new sample in the mean.
+            variance_gain (float): The weight of each new sample in the deviation.
+            variance_factor (float): The number of deviations above the mean at which to time out.
+        """
+        self.gain = gain
+        self.variance_gain = variance_gain
+        self.variance_factor = variance_factor
+        self.mean = None
+        self.deviation = None
+        self.num_samples = 0
+
+    def update(self, rtt: float) -> None:
+        """
+        Add a round-trip time measurement, in seconds.
+        """
+        if self.mean is None:
+            self.mean = rtt
+            self.deviation = rtt / 2
+        else:
+            self.deviation += self.variance_gain * (abs(rtt - self.mean) - self.deviation)
+            self.mean += self.gain * (rtt - self.mean)
+        self.num_samples += 1
+
+    @property
+    def timeout(self) -> Optional[float]:
+        """
+        The time after which a request should be considered lost, in seconds,
+        or None if no measurements have been made.
+        """
+        if self.mean is None:
+            return None
+        return self.mean + self.variance_factor * self.deviation
@@ -1,17 +1,33 @@
-from pythonosc.osc_server import ThreadingOSCUDPServer
+from pythonosc.osc_server import BlockingOSCUDPServer
 from pythonosc.udp_client import SimpleUDPClient
-from pythonosc.dispatcher import Dispatcher
-from threading import Thread, Event
+from threading import Thread, Lock, Condition, local, current_thread
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 from .exceptions import SuperColliderConnectionError
+from .responses import ResponseTable, RoundTripEstimator, PendingResponse
+from .allocators import Allocator, NodeIDAllocator
+from .bundle import Bundle
+from .nodetree import NodeTree, TreeSnapshot, parse_query_tree, NODE_NOTIFICATIONS
+from .recovery import StateJournal, HealthMonitor
+from .metrics import ClientStats, StatusMonitor
+from .instrumentation import Hooks, InstrumentedDispatcher, RESPONSE_MATCHED, RESPONSE_FAILED, RESPONSE_TIMEOUT
+from .osc import encode_message, encode_bundle, encode_timetag, TIMETAG_IMMEDIATE
 from typing import Optional, Callable
 from . import globals
+import heapq
+import itertools
 import logging
+import queue
 import socket
+import time
 
 logger = logging.getLogger(__name__)
 
+# Replies sent when an asynchronous command has completed, which may take far longer
+# than a round trip.
+COMMAND_REPLIES = ("/done", "/synced")
+
 class Server:
-    def __init__(self, hostname: str = "127.0.0.1", port: int = 57110):
+    def __init__(self, hostname: str = "127.0.0.1", port: int = 57110, latency: Optional[float] = None):
         """
         Create a new Server object, which is a local representation of a remote
         SuperCollider server.
@@ -25,53 +41,379 @@ class Server:
         Args:
             hostname (str): Hostname or IP address of the server
             port (int): Port of the server
+            latency (float): If set, commands are scheduled to execute this many seconds after
+                             they are sent, so that they are not subject to timing jitter.
         """
 
+        self._init_state(hostname, port, latency)
+
         # UDP Client for sending messages
-        self.client_address = (hostname, port)
         self.sc_client = SimpleUDPClient(hostname, port)
         self.sc_client._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.sc_client._sock.bind(('', 0))
 
-        # OSC Server for receiving messages.
-        self.dispatcher = Dispatcher()
+        # OSC Server for receiving messages. Messages are handled one at a time, in the order
+        # they are received, so that node notifications are applied in order. User callbacks are
+        # passed to the callback thread, as the receiving thread cannot wait for replies.
         self.osc_server_address = ("127.0.0.1", self.sc_client._sock.getsockname()[1])
-        ThreadingOSCUDPServer.allow_reuse_address = True
-        self.osc_server = ThreadingOSCUDPServer(self.osc_server_address, self.dispatcher)
+        BlockingOSCUDPServer.allow_reuse_address = True
+        self.osc_server = BlockingOSCUDPServer(self.osc_server_address, self.dispatcher)
+        self.osc_server.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, globals.SOCKET_RECEIVE_BUFFER_SIZE)
 
         self.osc_server_thread = Thread(target=self._osc_server_listen, daemon=True)
         self.osc_server_thread.start()
 
-        # For callback timeouts
-        self.event = Event()
+        # Check that the server is running, without waiting for the longer command timeout.
+        self.sync(timeout=self.response_timeout)
+
+    def _init_state(self, hostname: str, port: int, latency: Optional[float]) -> None:
+        """
+        Initialise the transport-independent state shared by Server and AsyncServer.
+        """
+        self.client_address = (hostname, port)
+        self.latency = latency
+
+        # Requests awaiting replies, and the reply addresses routed to them.
+        self.responses = ResponseTable()
+        self.response_addresses = set()
+        self.response_lock = Lock()
+        self.ping_ids = itertools.count(1)
+
+        # Deadlines of non-blocking requests, and other delayed calls: heap of (deadline, sequence,
+        # callback), called by a single reaper thread, started on first use.
+        self.response_deadlines = []
+        self.response_deadline_ids = itertools.count()
+        self.response_deadline_condition = Condition()
+        self.response_reaper_thread = None
+
+        # User callbacks (end callbacks, and those of non-blocking queries), called in order by
+        # a single callback thread, started on first use, rather than the receiving thread.
+        self.callback_queue = queue.SimpleQueue()
+        self.callback_thread = None
+        self.osc_server_thread = None
+
+        # Instrumentation hooks, called as messages are sent and received.
+        self.hooks = ()
+
+        # Routes incoming OSC messages to handlers.
+        self.dispatcher = InstrumentedDispatcher(self)
+        self._route_responses("/fail")
+
+        # Message batching: the per-thread stack of open bundles, and the optional
+        # server-wide bundle that queues all other messages.
+        self.max_packet_size = globals.MAX_PACKET_SIZE
+        self.bundle_state = local()
+        self.auto_bundle = None
 
         # SC node ID for Add actions
         self.id = 0
 
-        self.sync()
+        # Mirror of the server's node tree, maintained while notifications are enabled.
+        self.node_tree = None
+
+        # Most recent get_tree() queries: (group ID, controls flag) -> (timestamp, Future)
+        self.tree_snapshots = {}
+
+        # Record of the state created on the server, for replay after a restart, and the
+        # monitor that checks the server is alive. Both are disabled until started.
+        self.journal = None
+        self.health_monitor = None
+
+        # Totals of messages sent and received, and the optional status sampling thread.
+        self.client_stats = ClientStats()
+        self.status_monitor = None
+
+        # ID spaces and timeouts are owned by each Server, so that several servers
+        # can be driven from one process without collisions.
+        self.node_id_allocator = NodeIDAllocator(globals.NODE_ID_START)
+        self.buffer_allocator = Allocator("buffer", globals.ALLOCATOR_BUFFER_START_INDEX, globals.ALLOCATOR_BUFFER_CAPACITY)
+        self.control_bus_allocator = Allocator("control", globals.ALLOCATOR_BUS_START_INDEX, globals.ALLOCATOR_BUS_CAPACITY)
+        self.audio_bus_allocator = Allocator("audio", globals.ALLOCATOR_BUS_START_INDEX, globals.ALLOCATOR_BUS_CAPACITY)
+        self.response_timeout = globals.RESPONSE_TIMEOUT
+
+        # Queries time out after a multiple of the measured round-trip time, if adaptive_timeouts
+        # is set, or else after response_timeout. Commands that wait for the server to complete
+        # asynchronous work (/sync, and those replying with /done) time out after command_timeout.
+        self.adaptive_timeouts = True
+        self.round_trip = RoundTripEstimator()
+        self.command_timeout = globals.COMMAND_TIMEOUT
+
+        # The time at which a message was last received from the server, by time.perf_counter().
+        self.last_received = 0.0
 
     #--------------------------------------------------------------------------------
     # Client messages
     #--------------------------------------------------------------------------------
 
-    def _send_msg(self, address: str, *args) -> None:
-        self.sc_client.send_message(address, [*args])
+    def _send_msg(self, address: str, *args, timestamp: Optional[float] = None) -> None:
+        """
+        Send a message to the server, or queue it if a bundle is open.
+
+        Args:
+            address (str): The OSC address.
+            args: The message arguments.
+            timestamp (float): The time at which the server should execute the message, in seconds
+                               since the epoch (as per time.time()). If None, the timestamp of the open
+                               bundle is used, or else the current time plus the server's latency.
+                               Pass 0 to execute immediately regardless of latency, as queries do.
+        """
+        if self.journal is not None:
+            self.journal.record(address, args)
+        self.client_stats.messages_sent += 1
+
+        dgram = encode_message(address, args)
+        if self.hooks:
+            now = time.perf_counter()
+            for hook in self.hooks:
+                hook.on_send(address, len(dgram), now)
+        bundle = self._current_bundle()
+        timetag = encode_timetag(self._resolve_timestamp(timestamp))
+
+        if bundle is not None:
+            bundle.add(dgram, timetag)
+        else:
+            self._send_bundle([dgram], timetag)
+
+    def _send_bundle(self, dgrams: list[bytes], timetag: bytes = TIMETAG_IMMEDIATE) -> None:
+        """
+        Send encoded messages as a single bundle with the given timetag, or as a
+        plain message if there is only one and it is to be executed immediately.
+        """
+        if len(dgrams) == 1 and timetag == TIMETAG_IMMEDIATE:
+            dgram = dgrams[0]
+        else:
+            dgram = encode_bundle(dgrams, timetag)
+        self.client_stats.datagrams_sent += 1
+        self.client_stats.bytes_sent += len(dgram)
+        self._send_dgram(dgram)
+
+    def _send_dgram(self, dgram: bytes) -> None:
+        self.sc_client._sock.sendto(dgram, self.client_address)
+
+    #--------------------------------------------------------------------------------
+    # Bundling
+    #--------------------------------------------------------------------------------
+
+    def bundle(self, timestamp: Optional[float] = None, max_size: Optional[int] = None) -> Bundle:
+        """
+        Returns a context manager that batches all messages sent by the current thread
+        within its block into OSC bundles, which are sent when the block exits.
+
+        All messages in the block share the same timestamp, so are executed together
+        (and sample-accurately) by the server.
+
+        Example:
+            >>> with server.bundle(time.time() + 0.2):
+            ...     synth = Synth(server, "sine", {"freq": 440.0})
+            ...     group = Group(server)
+
+        Args:
+            timestamp (float): The time at which to execute the messages, in seconds since the epoch.
+                               Defaults to the current time plus the server's latency, if set.
+            max_size (int): The maximum size of each bundle, in bytes. Defaults to max_packet_size.
+        """
+        return Bundle(self, max_size, self._resolve_timestamp(timestamp))
+
+    def set_auto_bundle(self, interval: Optional[float], max_size: Optional[int] = None) -> None:
+        """
+        Enable or disable automatic bundling. When enabled, every message that is not sent within
+        an explicit `bundle()` block is queued, and the queue is sent as OSC bundles when it reaches
+        `max_size` bytes, or `interval` seconds after the first message was queued.
+
+        Args:
+            interval (float): The maximum time to hold a message before sending it, in seconds,
+                              or None to disable automatic bundling.
+            max_size (int): The maximum size of each bundle, in bytes. Defaults to max_packet_size.
+        """
+        previous_bundle = self.auto_bundle
+        if interval is None:
+            self.auto_bundle = None
+        else:
+            self.auto_bundle = Bundle(self, max_size)
+            self._start_auto_bundle(self.auto_bundle, interval)
+
+        if previous_bundle is not None:
+            previous_bundle.flush()
+            # Wake the flush thread so that it can exit.
+            previous_bundle.pending.set()
+
+    def _start_auto_bundle(self, bundle: Bundle, interval: float) -> None:
+        def _flush_loop():
+            while self.auto_bundle is bundle:
+                bundle.pending.wait()
+                time.sleep(interval)
+                bundle.flush()
+
+        Thread(target=_flush_loop, daemon=True).start()
+
+    def _current_bundle(self) -> Optional[Bundle]:
+        """
+        Returns the bundle that messages sent by the current thread are queued in, if any.
+        """
+        bundles = getattr(self.bundle_state, "stack", None)
+        return bundles[-1] if bundles else self.auto_bundle
+
+    def _resolve_timestamp(self, timestamp: Optional[float]) -> Optional[float]:
+        """
+        Returns the timestamp at which to execute a message for which `timestamp` was specified:
+        the open bundle's timestamp, or else the current time plus the server's latency. Messages
+        queued by the auto bundle within one flush window share the time of the first.
+        """
+        if timestamp is None:
+            bundle = self._current_bundle()
+            if bundle is not None and bundle.timestamp is not None:
+                return bundle.timestamp
+            if self.latency is not None:
+                if bundle is not None:
+                    return bundle.get_window_timestamp(self.latency)
+                return time.time() + self.latency
+        return timestamp
+
+    def _push_bundle(self, bundle: Bundle) -> None:
+        if not hasattr(self.bundle_state, "stack"):
+            self.bundle_state.stack = []
+        bundle.parent = self.bundle_state.stack[-1] if self.bundle_state.stack else None
+        self.bundle_state.stack.append(bundle)
+
+    def _pop_bundle(self, bundle: Bundle) -> None:
+        self.bundle_state.stack.remove(bundle)
+
+    def _flush_bundles(self) -> None:
+        """
+        Send any messages queued by the current thread, so that a query is not held back
+        waiting for a reply to a message that has not yet been sent.
+        """
+        # Innermost first, as nested bundles flush into their enclosing bundle.
+        for bundle in reversed(getattr(self.bundle_state, "stack", ())):
+            bundle.flush()
+        if self.auto_bundle is not None:
+            self.auto_bundle.flush()
+
+    #--------------------------------------------------------------------------------
+    # Server queries
+    #--------------------------------------------------------------------------------
+
+    def sync(self, ping_id: Optional[int] = None, timeout: Optional[float] = None):
+        """
+        Wait until all asynchronous commands previously sent to the server have completed.
 
-    def sync(self, ping_id: int = 1):
+        Args:
+            ping_id (int): The ID to send with /sync. If None, a unique ID is used, so that
+                           concurrent calls each receive their own reply.
+            timeout (float): The time to wait, in seconds. Defaults to the server's command_timeout.
+        """
         def _handler(address, *args):
             return args
 
-        self._send_msg("/sync", ping_id)
-        return self._await_response("/synced", None, _handler)
+        if ping_id is None:
+            ping_id = next(self.ping_ids)
+
+        future = self._expect_response("/synced", [ping_id], _handler)
+        self._send_msg("/sync", ping_id, timestamp=0)
+        return self._await_response(future, timeout)
 
-    def query_tree(self, group=None):
+    def notify(self, enabled: bool = True):
+        """
+        Register (or unregister) to receive notifications of node state changes from the server.
+        While registered, `node_tree` mirrors the server's node tree, which provides the
+        `is_playing`, `is_running` and `on_end` properties of Synths and Groups.
+
+        Example:
+            >>> server.notify()
+            >>> synth = Synth(server, "sine")
+            >>> synth.on_end(lambda node_id: print("Synth %d ended" % node_id))
+
+        Args:
+            enabled (bool): True to register for notifications, False to unregister.
+        """
+        if enabled:
+            if self.node_tree is None:
+                self.node_tree = NodeTree(self._run_callback)
+            for address in NODE_NOTIFICATIONS:
+                self._route_responses(address)
+        else:
+            self.node_tree = None
+
+        future = self._expect_response("/done", ["/notify"], command="/notify")
+        self._send_msg("/notify", int(enabled), timestamp=0)
+        return self._await_response(future)
+
+    def set_nodes(self, updates: dict, timestamp: Optional[float] = None) -> None:
+        """
+        Set the controls of many nodes at once. Each node's controls are set with a single
+        /n_set message, and all messages are sent together in as few OSC bundles as possible.
+
+        Example:
+            >>> server.set_nodes({synth: {"freq": 440.0, "gain": -6.0} for synth in synths})
+
+        Args:
+            updates (dict): A dict mapping each Synth or Group to a dict of control names and values.
+            timestamp (float): The time at which to execute the commands, in seconds since the epoch.
+                               Defaults to now, plus the server's latency if set.
+        """
+        with self.bundle(timestamp):
+            for node, parameters in updates.items():
+                node.set(parameters)
+
+    def query_tree(self, group=None, timeout: Optional[float] = None):
         def _handler(address, *args):
             return args
 
-        self._send_msg("/g_queryTree", group.id if group else 0, 0)
-        return self._await_response("/g_queryTree.reply", callback=_handler)
+        group_id = group.id if group else 0
+        future = self._expect_response("/g_queryTree.reply", [0, group_id], _handler, command="/g_queryTree")
+        self._send_msg("/g_queryTree", group_id, 0, timestamp=0)
+        return self._await_response(future, timeout)
+
+    def get_tree(self,
+                 group=None,
+                 controls: bool = False,
+                 max_age: float = 0.0,
+                 timeout: Optional[float] = None) -> TreeSnapshot:
+        """
+        Query the tree of Groups and Synths under a Group, parsed into a TreeSnapshot.
+
+        Snapshots are cached: if a snapshot of the same Group (with or without controls) was
+        requested less than `max_age` seconds ago, it is returned without querying the server.
+        Concurrent callers share a single query.
 
-    def get_status(self):
+        Example:
+            >>> tree = server.get_tree(controls=True, max_age=1.0)
+            >>> tree.root.children
+            [GroupSnapshot(id=1, children=[1000])]
+            >>> tree[1000].controls
+            {'out': 0.0, 'freq': 440.0, 'gain': 0.0}
+
+        Args:
+            group (Group): The Group to query. Defaults to the root node.
+            controls (bool): If True, include the control values of each Synth.
+            max_age (float): The maximum age of a cached snapshot to return, in seconds.
+            timeout (float): The time to wait for a reply, in seconds. Defaults to the adaptive timeout.
+
+        Returns:
+            A TreeSnapshot.
+        """
+        group_id = group.id if group else 0
+        flag = int(controls)
+        key = (group_id, flag)
+
+        cached = self.tree_snapshots.get(key)
+        if cached is not None:
+            timestamp, future = cached
+            failed = future.done() and (future.cancelled() or future.exception() is not None)
+            if time.time() - timestamp < max_age and not failed:
+                return self._await_response(future, timeout)
+
+        timestamp = time.time()
+
+        def _handler(address, *args):
+            return parse_query_tree(args, timestamp)
+
+        future = self._expect_response("/g_queryTree.reply", [flag, group_id], _handler, command="/g_queryTree")
+        self.tree_snapshots[key] = (timestamp, future)
+        self._send_msg("/g_queryTree", group_id, flag, timestamp=0)
+        return self._await_response(future, timeout)
+
+    def get_status(self, timeout: Optional[float] = None):
         """
         Query the current Server status, including the number of active units, CPU
         load, etc.
@@ -103,11 +445,11 @@ class Server:
 
             return status_dict
 
-        self._send_msg("/status")
-
-        return self._await_response("/status.reply", None, _handler)
+        future = self._expect_response("/status.reply", None, _handler, command="/status")
+        self._send_msg("/status", timestamp=0)
+        return self._await_response(future, timeout)
 
-    def get_version(self) -> dict:
+    def get_version(self, timeout: Optional[float] = None) -> dict:
         """
         Returns the current Server version.
 
@@ -134,41 +476,339 @@ class Server:
 
             return version_dict
 
-        self._send_msg("/version")
-
-        return self._await_response("/version.reply", None, _handler)
+        future = self._expect_response("/version.reply", None, _handler)
+        self._send_msg("/version", timestamp=0)
+        return self._await_response(future, timeout)
 
     #--------------------------------------------------------------------------------
-    # Callback timeout logic
+    # Request/response correlation
     #--------------------------------------------------------------------------------
 
-    def _await_response(self,
-                        address: str,
-                        match_args=(),
-                        callback: Optional[Callable] = None) -> list:
-        rv = None
-
-        # Sets the thread event when message is received
-        # It also overwrites the callback (dispatcher) function to capture the return value.
-        # This is necessary because the dispatcher handler can't return anything.
-        # Make sure to unmap the callback before it is overwritten to avoid duplicate callbacks.
-        def _callback_with_timeout(*args):
-            self.event.set()
-            if callback:
-                nonlocal rv
-                rv = callback(address, *args[1:])
-
-        self.dispatcher.map(address, _callback_with_timeout)
-
-        responded_before_timeout = self.event.wait(globals.RESPONSE_TIMEOUT)
-        if responded_before_timeout:
-            self.event.clear()
-        else:
+    def _expect_response(self,
+                         address: str,
+                         match_args=(),
+                         callback: Optional[Callable] = None,
+                         command: Optional[str] = None) -> Future:
+        """
+        Register interest in a reply from the server, before sending the request that triggers it.
+
+        Args:
+            address (str): The OSC address of the expected reply.
+            match_args (list): Leading arguments that identify the reply (e.g. a node ID), or None.
+            callback (function): Transforms the reply's (address, *args) into the Future's result.
+            command (str): The address of the command to be sent. If given, a /fail reply to the
+                           command fails the Future with SuperColliderCommandError.
+
+        Returns:
+            A Future that is resolved when the matching reply is received.
+        """
+        self._route_responses(address)
+        future = self._create_future()
+        self.responses.add(address, match_args, future, callback, command)
+        return future
+
+    def _route_responses(self, address: str) -> None:
+        """
+        Route messages received at the given address to the response table. Each address
+        is routed by a single dispatcher handler, mapped the first time the address is used.
+        """
+        if address not in self.response_addresses:
+            with self.response_lock:
+                if address not in self.response_addresses:
+                    self.dispatcher.map(address, self._dispatch_response)
+                    self.response_addresses.add(address)
+
+    def _create_future(self) -> Future:
+        return Future()
+
+    def _get_timeout(self, future: Future, timeout: Optional[float] = None) -> float:
+        """
+        Returns the time to wait for a reply to resolve the given Future: `timeout` if given,
+        the command timeout for replies to asynchronous commands, or else the query timeout.
+        """
+        if timeout is not None:
+            return timeout
+        entry = self.responses.entries.get(future)
+        if entry is not None and entry.address in COMMAND_REPLIES:
+            return self.command_timeout
+        return self.query_timeout
+
+    @property
+    def query_timeout(self) -> float:
+        """
+        Returns the time to wait for the reply to a query. If adaptive_timeouts is set and
+        round-trip times have been measured, this is the mean round-trip time plus four times
+        its mean deviation, bounded by MIN_RESPONSE_TIMEOUT and command_timeout, after which
+        the reply is given a grace period before the query fails (see _get_grace_period).
+        Otherwise, it is response_timeout.
+        """
+        timeout = self.round_trip.timeout
+        if not self.adaptive_timeouts or timeout is None:
+            return self.response_timeout
+        return min(max(timeout, globals.MIN_RESPONSE_TIMEOUT), self.command_timeout)
+
+    def _get_grace_period(self, future: Future) -> float:
+        """
+        Returns the further time to wait for the reply to a query once its adaptive timeout has
+        expired, or 0 if it should fail at once. The reply is given as long again, in case it has
+        merely been held up (e.g. while the client was paused for garbage collection). If anything
+        has been received from the server since the query was sent, the server is evidently alive,
+        so the reply is awaited for up to response_timeout in all.
+        """
+        entry = self.responses.entries.get(future)
+        if entry is None or entry.address in COMMAND_REPLIES:
+            return 0.0
+        if not self.adaptive_timeouts or self.round_trip.timeout is None:
+            return 0.0
+        timeout = self.query_timeout
+        if self.last_received > entry.created:
+            return max(self.response_timeout - timeout, timeout)
+        return timeout
+
+    def _await_response(self, future: Future, timeout: Optional[float] = None):
+        """
+        Block until the given Future is resolved by a reply.
+
+        Args:
+            future (Future): The Future returned by _expect_response.
+            timeout (float): The time to wait, in seconds. Defaults to a timeout chosen by _get_timeout.
+
+        Raises:
+            SuperColliderConnectionError: If no reply is received within the timeout.
+            SuperColliderCommandError: If the server replies to the command with /fail.
+            RuntimeError: If called from the thread that receives replies, which could then never
+                          receive the reply.
+        """
+        if current_thread() is self.osc_server_thread:
+            self.responses.discard(future)
+            raise RuntimeError("Cannot wait for a reply on the thread that receives replies. "
+                               "Query from another thread, or with blocking=False.")
+        grace = timeout is None
+        timeout = self._get_timeout(future, timeout)
+        self._flush_bundles()
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            pass
+        grace_period = self._get_grace_period(future) if grace else 0.0
+        try:
+            return future.result(grace_period)
+        except FutureTimeoutError:
+            self._discard_timed_out(future)
             raise SuperColliderConnectionError("Connection to SuperCollider server timed out. Is scsynth running?")
 
-        self.dispatcher.unmap(address, _callback_with_timeout)
+    def _defer_response(self,
+                        future: Future,
+                        callback: Optional[Callable] = None,
+                        timeout: Optional[float] = None) -> Future:
+        """
+        Return immediately, leaving the given Future to be resolved by a reply, or failed with
+        SuperColliderConnectionError if no reply is received within the timeout. In either case,
+        the request is removed from the response table, so no handler outlives it.
+
+        Args:
+            future (Future): The Future returned by _expect_response.
+            callback (function): Called with the result from the callback thread, if a reply is received.
+            timeout (float): The time to wait, in seconds. Defaults to a timeout chosen by _get_timeout.
+
+        Returns:
+            The Future.
+        """
+        if callback is not None:
+            def _done(future):
+                if not future.cancelled() and future.exception() is None:
+                    self._run_callback(callback, future.result())
+            future.add_done_callback(_done)
+
+        self._schedule_timeout(future, self._get_timeout(future, timeout), grace=timeout is None)
+        self._flush_bundles()
+        return future
+
+    def _schedule_timeout(self, future: Future, timeout: float, grace: bool = False) -> None:
+        self._call_later(timeout, lambda: self._expire_response(future, grace))
+
+    def _call_later(self, delay: float, callback: Callable) -> None:
+        """
+        Call `callback` with no arguments after `delay` seconds, from the reaper thread.
+        """
+        with self.response_deadline_condition:
+            entry = (time.time() + delay, next(self.response_deadline_ids), callback)
+            heapq.heappush(self.response_deadlines, entry)
+            if self.response_reaper_thread is None:
+                self.response_reaper_thread = Thread(target=self._reap_responses, daemon=True)
+                self.response_reaper_thread.start()
+            elif self.response_deadlines[0] is entry:
+                self.response_deadline_condition.notify()
+
+    def _reap_responses(self) -> None:
+        with self.response_deadline_condition:
+            while True:
+                while self.response_deadlines and self.response_deadlines[0][0] <= time.time():
+                    _, _, callback = heapq.heappop(self.response_deadlines)
+                    callback()
+                timeout = self.response_deadlines[0][0] - time.time() if self.response_deadlines else None
+                self.response_deadline_condition.wait(timeout)
+
+    def _run_callback(self, callback: Callable, *args) -> None:
+        """
+        Call a user callback from the callback thread, so that it can wait for replies itself.
+        """
+        self.callback_queue.put((callback, args))
+        if self.callback_thread is None:
+            with self.response_lock:
+                if self.callback_thread is None:
+                    self.callback_thread = Thread(target=self._process_callbacks, daemon=True)
+                    self.callback_thread.start()
+
+    def _process_callbacks(self) -> None:
+        while True:
+            callback, args = self.callback_queue.get()
+            try:
+                callback(*args)
+            except Exception:
+                logger.exception("Exception in callback %s" % callback)
+
+    def _expire_response(self, future: Future, grace: bool = False) -> None:
+        if future.done():
+            return
+        grace_period = self._get_grace_period(future) if grace else 0.0
+        if grace_period:
+            self._call_later(grace_period, lambda: self._expire_response(future))
+        else:
+            self._discard_timed_out(future)
+
+    def _discard_timed_out(self, future) -> None:
+        """
+        Remove a request that has timed out from the response table, and fail its Future, so that
+        any other callers waiting on it (e.g. for a cached tree snapshot) do not wait in vain.
+        """
+        entry = self.responses.discard(future)
+        if entry is not None:
+            # Otherwise, the reply arrived in time after all, and the request was matched.
+            self.client_stats.response_timeouts += 1
+            if not future.done():
+                future.set_exception(SuperColliderConnectionError("Connection to SuperCollider server timed out. Is scsynth running?"))
+            if self.hooks:
+                self._call_response_hooks(entry, RESPONSE_TIMEOUT)
+
+    def _call_response_hooks(self, entry: PendingResponse, status: str) -> None:
+        latency = time.perf_counter() - entry.created
+        for hook in self.hooks:
+            hook.on_response(entry.address, entry.command, latency, status)
+
+    def _dispatch_response(self, address: str, *args) -> None:
+        self.client_stats.messages_received += 1
+        self.last_received = time.perf_counter()
+        if address == "/fail":
+            entries = self.responses.fail(args[0], args[1] if len(args) > 1 else "", args[2:])
+            if not entries:
+                logger.warning("SuperCollider command failed: %s" % " ".join(str(arg) for arg in args))
+            elif self.hooks:
+                for entry in entries:
+                    self._call_response_hooks(entry, RESPONSE_FAILED)
+            return
+        if self.node_tree is not None and address in NODE_NOTIFICATIONS:
+            self.node_tree.update(address, args)
+            if self.journal is not None:
+                self.journal.update(address, args)
+        entry = self.responses.dispatch(address, args)
+        if entry is not None:
+            self.client_stats.replies_matched += 1
+            if self.hooks:
+                self._call_response_hooks(entry, RESPONSE_MATCHED)
+        if entry is not None and address not in COMMAND_REPLIES:
+            # Replies to asynchronous commands are not a measure of round-trip time.
+            self.round_trip.update(time.perf_counter() - entry.created)
+
+    #--------------------------------------------------------------------------------
+    # Recovery
+    #--------------------------------------------------------------------------------
+
+    def enable_journal(self) -> StateJournal:
+        """
+        Start recording the Groups, Synths, Buffers, SynthDefs and control bus values created
+        on the server, so that they can be rebuilt with `journal.replay()` if the server restarts.
+        Only state created after the journal is enabled is recorded.
+
+        Returns:
+            The StateJournal, which is also stored in `journal`.
+        """
+        if self.journal is None:
+            self.journal = StateJournal()
+        return self.journal
+
+    def start_health_monitor(self,
+                             interval: float = 1.0,
+                             max_failures: int = 3,
+                             timeout: Optional[float] = None,
+                             replay: bool = True,
+                             on_failure: Optional[Callable] = None,
+                             on_recovery: Optional[Callable] = None) -> HealthMonitor:
+        """
+        Start checking that the server is alive, by querying its status every `interval` seconds.
+        If the journal is enabled, its state is replayed when the server is found to have restarted
+        and lost it. See `HealthMonitor` for details of the arguments.
+
+        Example:
+            >>> server.enable_journal()
+            >>> server.start_health_monitor(on_failure=lambda server: print("Server is down"))
+
+        Returns:
+            The HealthMonitor, which is also stored in `health_monitor`.
+        """
+        self.stop_health_monitor()
+        self.health_monitor = HealthMonitor(self, interval, max_failures, timeout, replay, on_failure, on_recovery)
+        self.health_monitor.start()
+        return self.health_monitor
+
+    def stop_health_monitor(self) -> None:
+        if self.health_monitor is not None:
+            self.health_monitor.stop()
+            self.health_monitor = None
+
+    #--------------------------------------------------------------------------------
+    # Metrics
+    #--------------------------------------------------------------------------------
+
+    def start_status_monitor(self,
+                             interval: float = 1.0,
+                             capacity: int = 3600,
+                             timeout: Optional[float] = None,
+                             callback: Optional[Callable] = None) -> StatusMonitor:
+        """
+        Start sampling the server's status, and the client's traffic, every `interval` seconds,
+        keeping the most recent `capacity` samples. See `StatusMonitor` for details.
+
+        Example:
+            >>> monitor = server.start_status_monitor(interval=0.5)
+            >>> monitor.serve(port=9110)
+
+        Returns:
+            The StatusMonitor, which is also stored in `status_monitor`.
+        """
+        self.stop_status_monitor()
+        self.status_monitor = StatusMonitor(self, interval, capacity, timeout, callback)
+        self.status_monitor.start()
+        return self.status_monitor
+
+    def stop_status_monitor(self) -> None:
+        if self.status_monitor is not None:
+            self.status_monitor.stop()
+            self.status_monitor = None
+
+    def add_hooks(self, hooks: Hooks) -> None:
+        """
+        Register instrumentation hooks, which are called for each message sent and received,
+        and as each request completes. See `Hooks`, and the built-in `MessageStats`.
+
+        Example:
+            >>> stats = MessageStats()
+            >>> server.add_hooks(stats)
+        """
+        self.hooks = self.hooks + (hooks,)
 
-        return rv
+    def remove_hooks(self, hooks: Hooks) -> None:
+        self.hooks = tuple(hook for hook in self.hooks if hook is not hooks)
 
     #--------------------------------------------------------------------------------
     # OSC server thread
@@ -181,8 +821,10 @@ class Server:
 
     def clear_all_handlers(self):
         """
-        Useful for cleaning up after using handlers with blocking=False.
+        Remove all handlers mapped directly on the dispatcher, other than the
+        routing of replies to pending requests.
         """
         for address, handlers in self.dispatcher._map.items():
             for handler in handlers.copy():
-                self.dispatcher.unmap(address, handler)
+                if handler.callback != self._dispatch_response:
+                    self.dispatcher.unmap(address, handler)
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+from . import globals
+from .server import Server
+from .synth import Synth
+from .group import Group
+from typing import Callable, Optional, Union
+from threading import Lock
+import itertools
+import time
+
+class ServerLoad:
+    def __init__(self, server: Server):
+        """
+        The estimated load of a server in a ServerPool: its most recently measured status,
+        plus an estimate of the cost of the nodes placed on it since then.
+        """
+        self.server = server
+        self.cpu_average = 0.0
+        self.num_synths = 0
+        self.updated = None
+
+    def update(self, status: dict) -> None:
+        self.cpu_average = status["cpu_average"]
+        self.num_synths = status["num_synths"]
+        self.updated = time.time()
+
+    def add_synth(self) -> None:
+        # Assume the new Synth costs as much as the average of those already running.
+        if self.num_synths:
+            self.cpu_average += self.cpu_average / self.num_synths
+        self.num_synths += 1
+
+class RoundRobinPolicy:
+    """
+    Places each node on the next server in turn.
+    """
+    def __init__(self):
+        self.counter = itertools.count()
+
+    def __call__(self, pool: ServerPool) -> Server:
+        return pool.servers[next(self.counter) % len(pool.servers)]
+
+class LeastLoadedPolicy:
+    """
+    Places each node on the server with the lowest estimated CPU load, breaking ties
+    by the number of Synths running.
+    """
+    def __call__(self, pool: ServerPool) -> Server:
+        load = min(pool.get_loads(), key=lambda load: (load.cpu_average, load.num_synths))
+        return load.server
+
+class ServerPool:
+    def __init__(self,
+                 servers: list[Server],
+                 policy: Optional[Callable] = None,
+                 status_interval: float = 1.0):
+        """
+        A pool of SC servers, across which new Synths and Groups are placed, to make use of
+        several scsynth processes (and hence several CPU cores) from one controller.
+
+        Nodes are placed by a policy: a callable that is passed the pool and returns the Server
+        on which to place the next node. The default LeastLoadedPolicy uses each server's
+        measured CPU load, re-measured at most every `status_interval` seconds and adjusted
+        for the nodes placed since.
+
+        Each node created by the pool belongs to a single server, so subsequent calls to its
+        methods (set, get, free, etc.) are sent to the server that owns it.
+
+        Example:
+            >>> pool = ServerPool([Server(port=57110), Server(port=57111)])
+            >>> synth = pool.synth("sine", {"freq": 440.0})
+            >>> synth.set("freq", 880.0)
+
+        Args:
+            servers (list[Server]): The servers in the pool.
+            policy (function): Chooses the server for each new node. Defaults to LeastLoadedPolicy.
+            status_interval (float): The maximum age of the status used to estimate load, in seconds.
+        """
+        self.servers = list(servers)
+        self.policy = policy or LeastLoadedPolicy()
+        self.status_interval = status_interval
+        self.loads = {server: ServerLoad(server) for server in self.servers}
+        self.lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self.servers)
+
+    def choose_server(self) -> Server:
+        """
+        Returns the Server on which to place the next node, as chosen by the policy.
+        """
+        with self.lock:
+            return self.policy(self)
+
+    def get_loads(self) -> list[ServerLoad]:
+        """
+        Returns the estimated load of each server, first re-measuring any whose
+        status is older than `status_interval`.
+        """
+        now = time.time()
+        for load in self.loads.values():
+            if load.updated is None or now - load.updated > self.status_interval:
+                load.update(load.server.get_status())
+        return list(self.loads.values())
+
+    def synth(self,
+              name: str,
+              args: dict = None,
+              action: int = globals.ADD_TO_HEAD,
+              target: Union[Synth, Group, None] = None,
+              timestamp: Optional[float] = None) -> Synth:
+        """
+        Create a new Synth on the server chosen by the policy, or on the server of `target` if given.
+        Arguments are as per the Synth constructor.
+        """
+        with self.lock:
+            server = target.server if target is not None else self.policy(self)
+            self.loads[server].add_synth()
+        return Synth(server, name, args, action, target, timestamp)
+
+    def group(self,
+              action: int = globals.ADD_TO_HEAD,
+              target: Union[Synth, Group, None] = None,
+              timestamp: Optional[float] = None) -> Group:
+        """
+        Create a new Group on the server chosen by the policy, or on the server of `target` if given.
+        Arguments are as per the Group constructor.
+        """
+        server = target.server if target is not None else self.choose_server()
+        target_id = target.id if target is not None else 0
+        return Group(server, action, target_id, timestamp)
+
+    def sync(self) -> None:
+        """
+        Wait until all asynchronous commands sent to every server have completed.
+        """
+        for server in self.servers:
+            server.sync()
+
+    def get_status(self) -> dict:
+        """
+        Query the status of every server, and return the totals across the pool:
+        the sums of the unit, Synth, Group and SynthDef counts, the mean of the
+        average CPU loads, and the maximum of the peak CPU loads.
+
+        Example:
+            >>> pool.get_status()
+            {
+                'num_servers': 2,
+                'num_ugens': 10,
+                'num_synths': 2,
+                'num_groups': 4,
+                'num_synthdefs': 214,
+                'cpu_average': 0.0817,
+                'cpu_peak': 0.3491
+            }
+        """
+        statuses = []
+        for server in self.servers:
+            status = server.get_status()
+            self.loads[server].update(status)
+            statuses.append(status)
+
+        return {
+            "num_servers": len(statuses),
+            "num_ugens": sum(status["num_ugens"] for status in statuses),
+            "num_synths": sum(status["num_synths"] for status in statuses),
+            "num_groups": sum(status["num_groups"] for status in statuses),
+            "num_synthdefs": sum(status["num_synthdefs"] for status in statuses),
+            "cpu_average": sum(status["cpu_average"] for status in statuses) / len(statuses),
+            "cpu_peak": max(status["cpu_peak"] for status in statuses)
+        }
@@ -1,88 +1,79 @@
+from concurrent.futures import Future
 from typing import Optional, Union, Callable
 from . import globals
-from .buffer import Buffer
-from .bus import Bus
+from .node import Node, control_args
 from .server import Server
 
-class Synth:
+class Synth(Node):
     def __init__(self,
                  server: Server,
                  name: str,
                  args: dict = None,
                  action: int = globals.ADD_TO_HEAD,
-                 target: Optional[int] = None):
+                 target: Optional[int] = None,
+                 timestamp: Optional[float] = None):
         """
         Create a new SuperCollider Synth object.
 
         Args:
             server (Server): The SC server on which the Synth is created.
             name (str): The name of the SynthDef.
-            args (dict): A dict of parameters and values.
+            args (dict): A dict of parameters and values. Buffer and Bus values are replaced by their IDs.
             target (int): The Group to create the Synth in, default 0.
             action (int): The add action. See supercollider.globals for available actions.
+            timestamp (float): The time at which to execute the command, in seconds since the epoch.
+                               Defaults to now, plus the server's latency if set.
         """
         self.server = server
         self.name = name
         self.args = args
-        self.id = globals.LAST_NODE_ID
-        globals.LAST_NODE_ID += 1
-
-        args_list = []
-        if args:
-            for item, value in args.items():
-                # TODO: Move this to a more general place (so `set` can also work with Bus/Buffer objects)
-                if isinstance(value, Buffer):
-                    args_list += [item, value.id]
-                elif isinstance(value, Bus):
-                    args_list += [item, value.id]
-                else:
-                    args_list += [item, value]
+        self.id = server.node_id_allocator.allocate()
 
+        args_list = control_args(args) if args else []
         target_id = target.id if target else 0
-        self.server._send_msg("/s_new", self.name, self.id, action, target_id, *args_list)
-
-    def set(self,
-            parameter: str,
-            value: Union[int, float, str]) -> None:
-        """
-        Set a named parameter of the Synth.
-
-        Args:
-            parameter (str): The parameter name.
-            value: The value. Can be of type int, float, str.
-        """
-        self.server._send_msg("/n_set", self.id, parameter, value)
+        self.server._send_msg("/s_new", self.name, self.id, action, target_id, *args_list, timestamp=timestamp)
 
     def get(self,
             parameter: str,
             callback: Optional[Callable] = None,
-            blocking: bool = True) -> Union[int, float, str]:
+            blocking: bool = True,
+            timeout: Optional[float] = None) -> Union[int, float, str, Future]:
         """
         Get the current value of a named parameter of the Synth.
 
         Args:
             parameter (str): The name of the parameter to query.
-            callback (function): Called when the return value is received from the SC server.
-            blocking (bool): Set to False to query the value asynchronously and return None.
+            callback (function): Called with the value when it is received from the SC server.
+            blocking (bool): Set to False to query the value asynchronously, returning a Future
+                             that is resolved with the value, or fails if the server does not reply
+                             within the timeout.
+            timeout (float): The time to wait for a reply, in seconds. Defaults to the adaptive timeout.
 
         Example:
             >>> synth.get("freq")
             440.0
+            >>> future = synth.get("freq", blocking=False)
+            >>> future.result()
+            440.0
         """
 
         def _handler(_, *args):
             return args[2]
 
-        self.server._send_msg("/s_get", self.id, parameter)
-
+        future = self.server._expect_response("/n_set", [self.id, parameter], _handler, command="/s_get")
+        self.server._send_msg("/s_get", self.id, parameter, timestamp=0)
         if blocking:
-            rv = self.server._await_response("/n_set", [self.id, parameter], _handler)
-            return rv
+            return self.server._await_response(future, timeout)
         else:
-            self.server.dispatcher.map("/n_set", lambda *args: callback(_handler(*args)))
+            return self.server._defer_response(future, callback, timeout)
 
-    def free(self):
+    def free(self, timestamp: Optional[float] = None):
         """
-        Free the Synth.
+        Free the Synth, and release its node ID for reuse.
+
+        Args:
+            timestamp (float): The time at which to execute the command, in seconds since the epoch.
+                               Defaults to now, plus the server's latency if set.
         """
-        self.server._send_msg("/n_free", self.id)
+        self.server._send_msg("/n_free", self.id, timestamp=timestamp)
+        self.server.node_id_allocator.free(self.id)
@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+from .wavfile import temporary_path
+from . import globals
+from collections import deque
+from threading import Lock
+from typing import TYPE_CHECKING, Optional
+import glob
+import hashlib
+import os
+import struct
+
+if TYPE_CHECKING:
+    from .server import Server
+
+SYNTHDEF_FILE_HEADER = b"SCgf"
+
+# Size of the OSC address, type tags and blob size of a /d_recv message.
+D_RECV_OVERHEAD = 24
+
+class SynthDef:
+    def __init__(self, name: str, version: int, body: bytes, controls: Optional[dict] = None):
+        """
+        A compiled SynthDef, as stored in a .scsyndef file by sclang's SynthDef.store or writeDefFile.
+        SynthDefs are usually created from a file with `SynthDef.read`, or from file contents with
+        `SynthDef.parse`.
+
+        Args:
+            name (str): The SynthDef's name.
+            version (int): The file format version, 1 or 2.
+            body (bytes): The encoded SynthDef, excluding the file header.
+            controls (dict): The names and default values of the SynthDef's controls.
+        """
+        self.name = name
+        self.version = version
+        self.body = body
+        self.controls = controls or {}
+        self.hash = hashlib.sha1(body).hexdigest()
+
+    def __repr__(self):
+        return "SynthDef(%r)" % self.name
+
+    @property
+    def data(self) -> bytes:
+        """
+        The contents of a .scsyndef file containing just this SynthDef.
+        """
+        return encode_synthdefs([self])
+
+    @classmethod
+    def parse(cls, data: bytes) -> list[SynthDef]:
+        """
+        Parse the contents of a .scsyndef file, which may contain several SynthDefs.
+
+        Raises:
+            ValueError: If the data is not a valid SynthDef file.
+        """
+        if data[:4] != SYNTHDEF_FILE_HEADER:
+            raise ValueError("Not a SynthDef file")
+        version, num_defs = struct.unpack(">ih", data[4:10])
+        if version not in (1, 2):
+            raise ValueError("Unsupported SynthDef file version: %d" % version)
+
+        synthdefs = []
+        offset = 10
+        for _ in range(num_defs):
+            synthdef, offset = _parse_synthdef(data, offset, version)
+            synthdefs.append(synthdef)
+        return synthdefs
+
+    @classmethod
+    def read(cls, path: str) -> list[SynthDef]:
+        """
+        Read the SynthDefs in a .scsyndef file.
+        """
+        with open(path, "rb") as fd:
+            return cls.parse(fd.read())
+
+    def send(self, server: Server, force: bool = False, timeout: Optional[float] = None) -> None:
+        """
+        Send the SynthDef to the server, unless the server already has an identical copy.
+        See `SynthDef.send_many`.
+        """
+        SynthDef.send_many(server, [self], force=force, timeout=timeout)
+
+    @classmethod
+    def send_many(cls,
+                  server: Server,
+                  synthdefs: list[SynthDef],
+                  force: bool = False,
+                  timeout: Optional[float] = None) -> list[SynthDef]:
+        """
+        Send SynthDefs to the server, skipping any that the server is known to have already.
+
+        SynthDefs are packed into as few /d_recv messages as possible, which are sent together,
+        and then the completion of each is awaited. SynthDefs too large for a single datagram
+        are written to a temporary file and loaded with /d_load, which requires the server to
+        be running on the local machine. Requires a Server rather than an AsyncServer.
+
+        Example:
+            >>> synthdefs = SynthDef.read("synthdefs/all.scsyndef")
+            >>> SynthDef.send_many(server, synthdefs)
+
+        Args:
+            server (Server): The SC server.
+            synthdefs (list[SynthDef]): The SynthDefs to send.
+            force (bool): Send every SynthDef, even if the server is known to have it.
+            timeout (float): The time to wait for each message to complete, in seconds.
+                             Defaults to the server's command_timeout.
+
+        Returns:
+            The SynthDefs that were sent.
+
+        Raises:
+            SuperColliderCommandError: If the server fails to load a SynthDef.
+        """
+        if not force:
+            synthdefs = [synthdef for synthdef in synthdefs if not synthdef_cache.contains(server, synthdef)]
+
+        # Batches of SynthDefs, each sent as a single message.
+        batches = []
+        batch = []
+        batch_size = 0
+        max_size = globals.MAX_DATAGRAM_SIZE - D_RECV_OVERHEAD
+        for synthdef in synthdefs:
+            size = len(synthdef.body)
+            if batch and (batch_size + size > max_size or synthdef.version != batch[0].version):
+                batches.append(batch)
+                batch, batch_size = [], 0
+            batch.append(synthdef)
+            batch_size += size
+        if batch:
+            batches.append(batch)
+
+        in_flight = deque()
+        temporary_paths = []
+        try:
+            for batch in batches:
+                data = encode_synthdefs(batch)
+                if len(data) + D_RECV_OVERHEAD <= globals.MAX_DATAGRAM_SIZE:
+                    future = server._expect_response("/done", ["/d_recv"], command="/d_recv")
+                    server._send_msg("/d_recv", data, timestamp=0)
+                else:
+                    path = temporary_path(".scsyndef")
+                    temporary_paths.append(path)
+                    with open(path, "wb") as fd:
+                        fd.write(data)
+                    future = server._expect_response("/done", ["/d_load"], command="/d_load")
+                    server._send_msg("/d_load", path, timestamp=0)
+                in_flight.append((batch, future))
+
+            while in_flight:
+                batch, future = in_flight[0]
+                server._await_response(future, timeout)
+                in_flight.popleft()
+                for synthdef in batch:
+                    synthdef_cache.add(server, synthdef)
+        finally:
+            for _, future in in_flight:
+                server.responses.discard(future)
+            for path in temporary_paths:
+                os.unlink(path)
+
+        return synthdefs
+
+    @classmethod
+    def load(cls, server: Server, path: str, timeout: Optional[float] = None) -> None:
+        """
+        Load SynthDefs from a file on the server's filesystem, with /d_load.
+
+        Args:
+            server (Server): The SC server.
+            path (str): The path of a .scsyndef file, which may contain wildcards.
+            timeout (float): The time to wait, in seconds. Defaults to the server's command_timeout.
+        """
+        future = server._expect_response("/done", ["/d_load"], command="/d_load")
+        server._send_msg("/d_load", path, timestamp=0)
+        server._await_response(future, timeout)
+        for filename in glob.glob(path):
+            _cache_file(server, filename)
+
+    @classmethod
+    def load_dir(cls, server: Server, path: str, timeout: Optional[float] = None) -> None:
+        """
+        Load every SynthDef in a directory on the server's filesystem, with /d_loadDir.
+
+        Args:
+            server (Server): The SC server.
+            path (str): The path of the directory.
+            timeout (float): The time to wait, in seconds. Defaults to the server's command_timeout.
+        """
+        future = server._expect_response("/done", ["/d_loadDir"], command="/d_loadDir")
+        server._send_msg("/d_loadDir", path, timestamp=0)
+        server._await_response(future, timeout)
+        for filename in glob.glob(os.path.join(path, "**", "*.scsyndef"), recursive=True):
+            _cache_file(server, filename)
+
+class SynthDefCache:
+    def __init__(self):
+        """
+        Records the content hash of each SynthDef that each server has been sent, keyed by the
+        server's address, so that SynthDefs are not resent to a server that already has them,
+        including by a new Server object after reconnecting.
+
+        A server's entries are discarded when it is known to have restarted: when a ServerProcess
+        relaunches it, or when a HealthMonitor sees it recover. If scsynth is restarted by other
+        means, call `clear()`, or send with `force=True`.
+        """
+        self.hashes = {}
+        self.lock = Lock()
+
+    def contains(self, server: Server, synthdef: SynthDef) -> bool:
+        return self.hashes.get(server.client_address, {}).get(synthdef.name) == synthdef.hash
+
+    def add(self, server: Server, synthdef: SynthDef) -> None:
+        with self.lock:
+            self.hashes.setdefault(server.client_address, {})[synthdef.name] = synthdef.hash
+
+    def clear(self, server: Optional[Server] = None) -> None:
+        """
+        Discard the entries for the given server, or for every server.
+        """
+        with self.lock:
+            if server is None:
+                self.hashes.clear()
+            else:
+                self.hashes.pop(server.client_address, None)
+
+# The SynthDefs sent to each server by this process.
+synthdef_cache = SynthDefCache()
+
+def encode_synthdefs(synthdefs: list[SynthDef]) -> bytes:
+    """
+    Encode SynthDefs of the same version as the contents of a .scsyndef file.
+    """
+    version = synthdefs[0].version if synthdefs else 2
+    header = SYNTHDEF_FILE_HEADER + struct.pack(">ih", version, len(synthdefs))
+    return header + b"".join(synthdef.body for synthdef in synthdefs)
+
+def _cache_file(server: Server, path: str) -> None:
+    try:
+        synthdefs = SynthDef.read(path)
+    except (OSError, ValueError, struct.error):
+        return
+    for synthdef in synthdefs:
+        synthdef_cache.add(server, synthdef)
+
+def _parse_synthdef(data: bytes, offset: int, version: int) -> tuple:
+    """
+    Parse a single SynthDef from a .scsyndef file.
+
+    Returns:
+        A tuple of the SynthDef, and the offset of the data following it.
+    """
+    # Counts and indices are int32 in version 2, and int16 in version 1.
+    count_format = ">i" if version == 2 else ">h"
+    count_size = struct.calcsize(count_format)
+    start = offset
+
+    def read(format: str):
+        nonlocal offset
+        values = struct.unpack_from(format, data, offset)
+        offset += struct.calcsize(format)
+        return values
+
+    def read_count() -> int:
+        return read(count_format)[0]
+
+    def read_string() -> str:
+        nonlocal offset
+        length = data[offset]
+        value = data[offset + 1:offset + 1 + length].decode()
+        offset += 1 + length
+        return value
+
+    name = read_string()
+    num_constants = read_count()
+    offset += 4 * num_constants
+    num_params = read_count()
+    defaults = read(">%df" % num_params)
+    controls = {}
+    for _ in range(read_count()):
+        param_name = read_string()
+        controls[param_name] = defaults[read_count()]
+
+    for _ in range(read_count()):
+        read_string()
+        offset += 1
+        num_inputs = read_count()
+        num_outputs = read_count()
+        offset += 2 + num_inputs * 2 * count_size + num_outputs
+
+    num_variants = read(">h")[0]
+    for _ in range(num_variants):
+        read_string()
+        offset += 4 * num_params
+
+    if offset > len(data):
+        raise ValueError("Truncated SynthDef file")
+    return SynthDef(name, version, data[start:offset], controls), offset
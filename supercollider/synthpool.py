@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+from . import globals
+from .server import Server
+from .synth import Synth
+from .group import Group
+from collections import deque
+from threading import Lock
+from typing import Callable, Optional, Union
+import itertools
+import time
+
+class Voice:
+    def __init__(self, synth: Synth):
+        """
+        A pre-instantiated Synth in a SynthPool, and its allocation state.
+        """
+        self.synth = synth
+        self.is_active = False
+        self.start_time = None
+        self.controls = dict(synth.args or {})
+
+        # Incremented each time the voice is allocated, to identify its current holder.
+        self.generation = 0
+
+class PooledSynth(Synth):
+    def __init__(self, voice: Voice):
+        """
+        A handle to a voice of a SynthPool, as returned by `SynthPool.allocate()`. It is used as
+        the voice's Synth, but is tied to a single allocation: once the voice has been stolen and
+        reallocated, releasing the handle has no effect, so that it cannot stop the new note.
+        """
+        self.server = voice.synth.server
+        self.name = voice.synth.name
+        self.args = voice.synth.args
+        self.id = voice.synth.id
+        self.generation = voice.generation
+
+class OldestVoicePolicy:
+    """
+    Steals the voice that was allocated least recently.
+    """
+    def __call__(self, pool: SynthPool) -> Voice:
+        return min(pool.active_voices(), key=lambda voice: voice.start_time)
+
+class QuietestVoicePolicy:
+    def __init__(self, control: str = "gain"):
+        """
+        Steals the voice with the lowest level, as last set through the pool.
+
+        Args:
+            control (str): The name of the control that sets each voice's level (e.g. gain or amp).
+        """
+        self.control = control
+
+    def __call__(self, pool: SynthPool) -> Voice:
+        return min(pool.active_voices(), key=lambda voice: voice.controls.get(self.control, 0.0))
+
+class RoundRobinVoicePolicy:
+    """
+    Steals each voice in turn.
+    """
+    def __init__(self):
+        self.counter = itertools.count()
+
+    def __call__(self, pool: SynthPool) -> Voice:
+        return pool.voices[next(self.counter) % len(pool.voices)]
+
+class SynthPool:
+    def __init__(self,
+                 server: Server,
+                 name: str,
+                 size: int,
+                 args: dict = None,
+                 policy: Optional[Callable] = None,
+                 gate: Optional[str] = None,
+                 action: int = globals.ADD_TO_HEAD,
+                 target: Union[Synth, Group, None] = None):
+        """
+        A fixed set of voices of a SynthDef, which are created once and then reused, so that
+        playing a note needs a single /n_set (plus /n_run), rather than creating a new Synth
+        with /s_new and freeing it afterwards.
+
+        The voices are created in a new Group. Idle voices are either paused with /n_run, or, if
+        a `gate` control is given, left running with the gate closed, for SynthDefs with gated
+        envelopes (and doneAction 0, so that the Synth is not freed when its envelope ends).
+
+        When every voice is in use, a voice is stolen, as chosen by the policy: a callable that
+        is passed the pool and returns the Voice to reuse. A stolen voice is reassigned in place,
+        so its envelope is not retriggered.
+
+        Example:
+            >>> pool = SynthPool(server, "grain", 32, {"gain": -96.0}, policy=QuietestVoicePolicy())
+            >>> synth = pool.allocate({"freq": 440.0, "gain": -12.0})
+            >>> pool.release(synth)
+
+        Args:
+            server (Server): The SC server on which the voices are created.
+            name (str): The name of the SynthDef.
+            size (int): The number of voices.
+            args (dict): The initial controls of every voice.
+            policy (function): Chooses the voice to steal when all are in use. Defaults to OldestVoicePolicy.
+            gate (str): The name of the voices' gate control, or None to pause idle voices.
+            action (int): The add action of the pool's Group.
+            target (Synth or Group): The target of the pool's Group. Defaults to the root node.
+        """
+        self.server = server
+        self.name = name
+        self.policy = policy or OldestVoicePolicy()
+        self.gate = gate
+        self.lock = Lock()
+
+        self.group = Group(server, action, target.id if target else 0)
+        args = dict(args or {})
+        if gate is not None:
+            args[gate] = 0
+
+        with server.bundle():
+            self.voices = [Voice(Synth(server, name, args, globals.ADD_TO_TAIL, self.group)) for _ in range(size)]
+            if gate is None:
+                for voice in self.voices:
+                    voice.synth.run(False)
+
+        self.free_voices = deque(self.voices)
+        self.voices_by_id = {voice.synth.id: voice for voice in self.voices}
+
+    def __len__(self) -> int:
+        return len(self.voices)
+
+    @property
+    def num_active(self) -> int:
+        """
+        The number of voices in use.
+        """
+        return len(self.voices) - len(self.free_voices)
+
+    def active_voices(self) -> list[Voice]:
+        return [voice for voice in self.voices if voice.is_active]
+
+    def allocate(self, args: dict = None, timestamp: Optional[float] = None) -> Synth:
+        """
+        Start a voice, stealing one if none are free.
+
+        Args:
+            args (dict): Controls to set on the voice.
+            timestamp (float): The time at which to start the voice, in seconds since the epoch.
+                               Defaults to now, plus the server's latency if set.
+
+        Returns:
+            A PooledSynth, which can be used as the voice's Synth, and must be returned to the pool
+            with `release()` rather than freed.
+        """
+        with self.lock:
+            voice = self.free_voices.popleft() if self.free_voices else self.policy(self)
+            voice.is_active = True
+            voice.start_time = time.time()
+            voice.generation += 1
+            synth = PooledSynth(voice)
+            if args:
+                voice.controls.update(args)
+
+        parameters = dict(args or {})
+        if self.gate is not None:
+            parameters[self.gate] = 1
+        timestamp = self.server._resolve_timestamp(timestamp)
+        if parameters:
+            voice.synth.set(parameters, timestamp=timestamp)
+        if self.gate is None:
+            voice.synth.run(True, timestamp=timestamp)
+        return synth
+
+    def release(self, synth: Synth, timestamp: Optional[float] = None) -> None:
+        """
+        Stop a voice, by closing its gate or pausing it, and return it to the pool.
+        Voices are reused least-recently-released first, so that released voices can
+        complete their envelopes. If the voice has since been stolen, it is left playing.
+
+        Args:
+            synth (Synth): A Synth returned by `allocate()`.
+            timestamp (float): The time at which to stop the voice, in seconds since the epoch.
+                               Defaults to now, plus the server's latency if set.
+        """
+        voice = self.voices_by_id[synth.id]
+        with self.lock:
+            if not voice.is_active:
+                return
+            if isinstance(synth, PooledSynth) and synth.generation != voice.generation:
+                return
+            voice.is_active = False
+            self.free_voices.append(voice)
+
+        if self.gate is not None:
+            synth.set(self.gate, 0, timestamp=timestamp)
+        else:
+            synth.run(False, timestamp=timestamp)
+
+    def free(self, timestamp: Optional[float] = None) -> None:
+        """
+        Free every voice, and the pool's Group.
+
+        Args:
+            timestamp (float): The time at which to execute the command, in seconds since the epoch.
+                               Defaults to now, plus the server's latency if set.
+        """
+        self.group.free(timestamp)
+        for voice in self.voices:
+            self.server.node_id_allocator.free(voice.synth.id)
+        self.voices = []
+        self.free_voices.clear()
+        self.voices_by_id.clear()
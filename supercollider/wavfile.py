@@ -0,0 +1,105 @@
+"""
+Reading and writing 32-bit float WAV files through memory-mapped views, used to exchange
+large Buffers with a local SC server without encoding every sample as OSC.
+"""
+
+import os
+import struct
+import tempfile
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# The Linux shared-memory filesystem, where temporary files never touch the disk.
+SHARED_MEMORY_DIR = "/dev/shm"
+
+def temporary_path(suffix: str = ".wav") -> str:
+    """
+    Returns the path of a new, empty temporary file, in shared memory if available.
+    """
+    directory = SHARED_MEMORY_DIR if os.access(SHARED_MEMORY_DIR, os.W_OK) else None
+    fd, path = tempfile.mkstemp(suffix=suffix, prefix="supercollider-", dir=directory)
+    os.close(fd)
+    return path
+
+def write_float_wav(path: str, samples, sample_rate: int) -> None:
+    """
+    Write samples to a 32-bit float WAV file.
+
+    Args:
+        path (str): The path to write to.
+        samples: A NumPy array of shape (frames,) or (frames, channels).
+        sample_rate (int): The sample rate stored in the file's header.
+    """
+    samples = np.asarray(samples, dtype="<f4")
+    num_frames = samples.shape[0]
+    num_channels = samples.shape[1] if samples.ndim > 1 else 1
+    data_size = samples.size * 4
+
+    header = b"".join([
+        b"RIFF", struct.pack("<I", 36 + data_size), b"WAVE",
+        b"fmt ", struct.pack("<IHHIIHH", 16, WAVE_FORMAT_IEEE_FLOAT, num_channels, sample_rate,
+                             sample_rate * num_channels * 4, num_channels * 4, 32),
+        b"data", struct.pack("<I", data_size)
+    ])
+    with open(path, "wb") as fd:
+        fd.write(header)
+        fd.truncate(len(header) + data_size)
+
+    if data_size:
+        view = np.memmap(path, dtype="<f4", mode="r+", offset=len(header), shape=(num_frames, num_channels))
+        view[:] = samples.reshape(num_frames, num_channels)
+        view.flush()
+        del view
+
+def read_float_wav(path: str):
+    """
+    Read the samples of a 32-bit float WAV file.
+
+    Returns:
+        A NumPy float32 array of shape (frames,) for mono files, or (frames, channels) otherwise.
+
+    Raises:
+        ValueError: If the file is not a 32-bit float WAV file.
+    """
+    with open(path, "rb") as fd:
+        riff, _, wave = struct.unpack("<4sI4s", fd.read(12))
+        if riff != b"RIFF" or wave != b"WAVE":
+            raise ValueError("Not a WAV file: %s" % path)
+
+        num_channels = None
+        while True:
+            chunk_header = fd.read(8)
+            if len(chunk_header) < 8:
+                raise ValueError("WAV file has no data chunk: %s" % path)
+            chunk_id, chunk_size = struct.unpack("<4sI", chunk_header)
+            if chunk_id == b"fmt ":
+                fmt = fd.read(chunk_size)
+                format_tag, num_channels, _, _, _, bits_per_sample = struct.unpack("<HHIIHH", fmt[:16])
+                if format_tag == WAVE_FORMAT_EXTENSIBLE:
+                    # The actual format is the first 2 bytes of the sub-format GUID.
+                    format_tag, = struct.unpack("<H", fmt[24:26])
+                if format_tag != WAVE_FORMAT_IEEE_FLOAT or bits_per_sample != 32:
+                    raise ValueError("WAV file is not 32-bit float: %s" % path)
+            elif chunk_id == b"data":
+                if num_channels is None:
+                    raise ValueError("WAV file has no fmt chunk: %s" % path)
+                offset = fd.tell()
+                num_frames = chunk_size // (num_channels * 4)
+                break
+            else:
+                # Chunks are padded to an even number of bytes.
+                fd.seek(chunk_size + (chunk_size % 2), os.SEEK_CUR)
+
+    if num_frames == 0:
+        samples = np.empty((0, num_channels), dtype=np.float32)
+    else:
+        view = np.memmap(path, dtype="<f4", mode="r", offset=offset, shape=(num_frames, num_channels))
+        samples = np.array(view, dtype=np.float32)
+        del view
+    return samples[:, 0] if num_channels == 1 else samples
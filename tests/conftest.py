@@ -0,0 +1,19 @@
+import os
+import pytest
+
+from supercollider.mock import MockSCSynth
+from tests.shared import SC_REAL_PORT
+
+@pytest.fixture(scope="session", autouse=True)
+def mock_scsynth():
+    """
+    If the SC_MOCK environment variable is set, run the tests against a mock SC server
+    on the test port, rather than a real scsynth.
+    """
+    if not os.environ.get("SC_MOCK"):
+        yield None
+        return
+
+    with MockSCSynth(port=SC_REAL_PORT) as mock:
+        mock.add_synthdef("sine", {"out": 0.0, "freq": 440.0, "gain": 0.0})
+        yield mock
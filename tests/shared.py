@@ -1,3 +1,4 @@
+import struct
 import pytest
 import supercollider
 
@@ -8,3 +9,23 @@ SC_REAL_PORT = 57110
 def server():
     server = supercollider.Server(port=SC_REAL_PORT)
     return server
+
+def pstring(value: str) -> bytes:
+    return bytes([len(value)]) + value.encode()
+
+def encode_synthdef(name: str, controls: dict, version: int = 2) -> bytes:
+    """
+    Encode a SynthDef containing a single Control UGen with the given controls.
+    """
+    count = ">i" if version == 2 else ">h"
+    body = pstring(name)
+    body += struct.pack(count, 0)
+    body += struct.pack(count, len(controls)) + struct.pack(">%df" % len(controls), *controls.values())
+    body += struct.pack(count, len(controls))
+    for index, control in enumerate(controls):
+        body += pstring(control) + struct.pack(count, index)
+    body += struct.pack(count, 1)
+    body += pstring("Control") + struct.pack(">b", 1) + struct.pack(count, 0) + struct.pack(count, len(controls))
+    body += struct.pack(">h", 0) + bytes([1] * len(controls))
+    body += struct.pack(">h", 0)
+    return b"SCgf" + struct.pack(">ih", version, 1) + body
@@ -0,0 +1,49 @@
+import pytest
+import supercollider
+from supercollider.allocators import Allocator, NodeIDAllocator
+
+def test_allocator_reuse():
+    allocator = Allocator("test", 0, 8)
+    a = allocator.allocate(2)
+    b = allocator.allocate(2)
+    c = allocator.allocate(4)
+    assert (a, b, c) == (0, 2, 4)
+    with pytest.raises(supercollider.SuperColliderAllocationError):
+        allocator.allocate(1)
+
+    allocator.free(b)
+    assert allocator.allocate(1) == 2
+    assert allocator.allocate(1) == 3
+
+def test_allocator_coalesce():
+    allocator = Allocator("test", 0, 8)
+    blocks = [allocator.allocate(2) for _ in range(4)]
+    for index in [blocks[0], blocks[2], blocks[1]]:
+        allocator.free(index)
+    assert allocator.free_ranges == [(0, 6)]
+    assert allocator.allocate(6) == 0
+
+    # Freeing an unallocated index is ignored
+    allocator.free(0)
+    allocator.free(0)
+    assert allocator.num_free == 6
+
+def test_allocator_split():
+    allocator = Allocator("test", 0, 8)
+    start = allocator.allocate(4, split=True)
+    for index in range(start, start + 4):
+        allocator.free(index)
+    assert allocator.free_ranges == [(0, 8)]
+
+def test_node_id_allocator():
+    allocator = NodeIDAllocator(1000, 1003)
+    ids = [allocator.allocate() for _ in range(3)]
+    assert ids == [1000, 1001, 1002]
+    with pytest.raises(supercollider.SuperColliderAllocationError):
+        allocator.allocate()
+
+    allocator.free(1001)
+    allocator.free(1000)
+    allocator.free(1000)
+    assert allocator.allocate() == 1001
+    assert allocator.allocate() == 1000
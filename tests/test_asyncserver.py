@@ -0,0 +1,33 @@
+import asyncio
+import pytest
+import supercollider
+
+from tests.shared import SC_DUMMY_PORT, SC_REAL_PORT
+
+def test_async_server_connection_fail():
+    async def main():
+        server = supercollider.AsyncServer(port=SC_DUMMY_PORT)
+        await server.connect()
+
+    with pytest.raises(supercollider.SuperColliderConnectionError):
+        asyncio.run(main())
+
+def test_async_server_queries():
+    async def main():
+        async with supercollider.AsyncServer(port=SC_REAL_PORT) as server:
+            status = await server.get_status()
+            assert status["num_synths"] >= 0
+            version = await server.get_version()
+            assert version["version_major"] == 3
+
+            synth = supercollider.Synth(server, "sine", {"freq": 440.0, "gain": -96})
+            results = await asyncio.gather(*[synth.get("freq") for _ in range(64)])
+            assert results == [440.0] * 64
+            synth.free()
+
+            buf = await supercollider.Buffer.alloc(server, 128)
+            info = await buf.get_info()
+            assert info["num_frames"] == 128
+            buf.free()
+
+    asyncio.run(main())
@@ -1,11 +1,12 @@
 import os
+import time
 import wave
 import struct
 import pytest
 import supercollider
 from threading import Event
 
-from tests.shared import server
+from tests.shared import server, SC_REAL_PORT
 
 def test_buffer_write(server):
     length = 100
@@ -56,3 +57,96 @@ def test_buffer_read(server):
     buf.get_info(callback=callback, blocking=False)
     event.wait(1.0)
     assert rv == {'num_frames': 100, 'num_channels': 1, 'sample_rate': 44100}
+
+def test_buffer_array(server):
+    np = pytest.importorskip("numpy")
+    length = 10000
+    data = np.linspace(-1, 1, length, dtype=np.float32)
+    buf = supercollider.Buffer.alloc(server, length)
+    buf.set_array(data)
+    samples = buf.get_array()
+    assert samples.dtype == np.float32
+    assert np.array_equal(samples, data)
+    assert np.array_equal(buf.get_array(100, 10), data[100:110])
+    buf.free()
+
+def test_buffer_from_array(server):
+    np = pytest.importorskip("numpy")
+    data = np.random.uniform(-1, 1, (1000, 2)).astype(np.float32)
+    buf = supercollider.Buffer.from_array(server, data)
+    info = buf.get_info()
+    assert info["num_frames"] == 1000
+    assert info["num_channels"] == 2
+    assert np.array_equal(buf.to_array(), data)
+    buf.free()
+
+def test_buffer_read_fail(server):
+    # An existing file that is not an audio file fails immediately, rather than timing out.
+    with pytest.raises(supercollider.SuperColliderCommandError) as excinfo:
+        supercollider.Buffer.read(server, __file__)
+    assert excinfo.value.command == "/b_allocRead"
+
+def test_buffer_read_many(server):
+    paths = []
+    for n in range(10):
+        path = "/tmp/output-%d.wav" % n
+        with wave.open(path, "w") as fd:
+            fd.setnchannels(1)
+            fd.setsampwidth(2)
+            fd.setframerate(44100)
+            fd.writeframes(b"\x00\x00" * (n + 1))
+        paths.append(path)
+
+    completed = []
+    buffers = supercollider.Buffer.read_many(server, paths, window=4,
+                                             progress=lambda done, total: completed.append((done, total)))
+    assert [buf.get_info()["num_frames"] for buf in buffers] == list(range(1, 11))
+    assert completed[-1] == (10, 10)
+    for buf in buffers:
+        buf.free()
+
+    buffers = supercollider.Buffer.read_many(server, [paths[0], __file__], ignore_errors=True)
+    assert buffers[0] is not None
+    assert buffers[1] is None
+    buffers[0].free()
+
+    with pytest.raises(supercollider.SuperColliderCommandError):
+        supercollider.Buffer.read_many(server, [paths[0], __file__])
+
+def test_buffer_free_scheduled():
+    server = supercollider.Server(port=SC_REAL_PORT, latency=0.1)
+    buf = supercollider.Buffer.alloc(server, 512)
+    buf.free()
+    # The ID is not reused until the server has executed the scheduled /b_free.
+    other = supercollider.Buffer.alloc(server, 512)
+    assert other.id != buf.id
+    time.sleep(0.2)
+    server.sync()
+    assert supercollider.Buffer.alloc(server, 512).id == buf.id
+
+def test_buffer_read_many_timeout(monkeypatch):
+    server = supercollider.Server(port=SC_REAL_PORT)
+    paths = []
+    for n in range(4):
+        path = "/tmp/output-timeout-%d.wav" % n
+        with wave.open(path, "w") as fd:
+            fd.setnchannels(1)
+            fd.setsampwidth(2)
+            fd.setframerate(44100)
+            fd.writeframes(b"\x00\x00" * (n + 1))
+        paths.append(path)
+
+    # The read of the second file is lost, so it times out.
+    send_msg = server._send_msg
+    def _send_msg(address, *args, timestamp=None):
+        if address != "/b_allocRead" or args[1] != paths[1]:
+            send_msg(address, *args, timestamp=timestamp)
+    monkeypatch.setattr(server, "_send_msg", _send_msg)
+
+    with pytest.raises(supercollider.SuperColliderConnectionError):
+        supercollider.Buffer.read_many(server, paths, window=4, timeout=0.1)
+
+    # Every Buffer, whether read, timed out or still in flight, is freed and its ID released.
+    server.sync()
+    assert not server.buffer_allocator.allocated
+    assert not server.responses.entries
@@ -1,8 +1,9 @@
+import time
 import pytest
 import supercollider
 from supercollider.globals import ALLOCATOR_BUS_START_INDEX, ALLOCATOR_BUS_CAPACITY
 
-from tests.shared import server
+from tests.shared import server, SC_REAL_PORT
 
 def test_bus(server):
     for cls in [supercollider.AudioBus, supercollider.ControlBus]:
@@ -18,3 +19,60 @@ def test_bus(server):
         bus1.free()
         bus2.free()
         bus3.free()
+
+def test_control_bus_values(server):
+    bus = supercollider.ControlBus(server, 1)
+    bus.set(0.5)
+    assert bus.get() == 0.5
+    bus.free()
+
+    bus = supercollider.ControlBus(server, 3)
+    bus.set([0.25, 0.5, 0.75])
+    assert bus.get() == [0.25, 0.5, 0.75]
+    bus.free()
+
+def test_control_bus_numpy_scalar(server):
+    np = pytest.importorskip("numpy")
+    bus = supercollider.ControlBus(server, 1)
+    bus.set(np.float32(0.5))
+    assert bus.get() == 0.5
+    bus.free()
+
+def test_control_bus_array(server):
+    np = pytest.importorskip("numpy")
+    bus = supercollider.ControlBus(server, 512)
+    values = np.linspace(0, 1, 512, dtype=np.float32)
+    bus.set_array(values)
+    assert np.array_equal(bus.get_array(), values)
+    bus.free()
+
+def test_control_bus_stream(server):
+    bus = supercollider.ControlBus(server, 1)
+    stream = bus.stream([0.1, 0.2, 0.3, 0.4], rate=100, batch_interval=0.01, latency=0.01)
+    stream.join(1.0)
+    assert not stream.is_running
+    time.sleep(0.05)
+    assert bus.get() == pytest.approx(0.4)
+    bus.free()
+
+def test_bus_free_scheduled():
+    server = supercollider.Server(port=SC_REAL_PORT)
+    bus = supercollider.ControlBus(server, 1)
+    bus.set(0.5, timestamp=time.time() + 0.1)
+    bus.free()
+    # The channels are not reused until the scheduled /c_set has been executed.
+    other = supercollider.ControlBus(server, 1)
+    assert other.id != bus.id
+    time.sleep(0.2)
+    assert supercollider.ControlBus(server, 1).id == bus.id
+
+def test_bus_double_free(server):
+    bus = supercollider.ControlBus(server, 2)
+    bus.free()
+    other = supercollider.ControlBus(server, 2)
+    # Freeing a bus again must not release channels that have since been reallocated.
+    bus.free()
+    third = supercollider.ControlBus(server, 2)
+    assert third.id != other.id
+    other.free()
+    third.free()
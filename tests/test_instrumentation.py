@@ -0,0 +1,74 @@
+import pytest
+import supercollider
+from supercollider.instrumentation import Hooks, LatencyHistogram, MessageStats, RESPONSE_MATCHED, RESPONSE_TIMEOUT
+from supercollider.mock import MockSCSynth
+
+from tests.shared import server
+
+def test_latency_histogram():
+    histogram = LatencyHistogram(bounds=(0.001, 0.01, 0.1))
+    assert histogram.percentile(50) is None
+    assert histogram.mean is None
+
+    for value in (0.0005, 0.002, 0.003, 0.05, 1.0):
+        histogram.observe(value)
+    assert list(histogram.counts) == [1, 2, 1, 1]
+    assert histogram.percentile(0) == 0.001
+    assert histogram.percentile(50) == 0.01
+    assert histogram.percentile(80) == 0.1
+    assert histogram.percentile(100) == float("inf")
+    assert histogram.mean == pytest.approx(1.0555 / 5)
+
+def test_message_stats(server):
+    stats = MessageStats()
+    server.add_hooks(stats)
+    synth = supercollider.Synth(server, "sine", {"freq": 440.0, "gain": -96})
+    assert synth.get("freq") == 440.0
+    synth.free()
+    server.sync()
+    server.remove_hooks(stats)
+    assert server.hooks == ()
+
+    assert stats.sent["/s_new"][0] == 1
+    assert stats.sent["/s_get"][0] == 1
+    assert stats.sent["/s_get"][1] > 0
+    assert stats.received["/n_set"][0] >= 1
+    assert stats.responses["/s_get"] == {RESPONSE_MATCHED: 1}
+    assert stats.latencies["/s_get"].count == 1
+    assert stats.latencies["/s_get"].percentile(100) > 0
+
+    text = stats.export()
+    assert 'supercollider_messages_sent_total{address="/s_get"} 1' in text
+    assert 'supercollider_response_latency_seconds_count{command="/s_get"} 1' in text
+
+    synth = supercollider.Synth(server, "sine", {"gain": -96})
+    synth.free()
+    assert stats.sent["/s_new"][0] == 1
+
+    stats.on_send('/path"with\\odd\ncharacters', 8, 0.0)
+    assert 'address="/path\\"with\\\\odd\\ncharacters"' in stats.export()
+
+def test_hooks_timeout():
+    class _Hooks(Hooks):
+        def __init__(self):
+            self.responses = []
+
+        def on_response(self, address, command, latency, status):
+            self.responses.append((address, command, status))
+
+    hooks = _Hooks()
+    with MockSCSynth() as mock:
+        server = supercollider.Server(port=mock.port)
+        server.add_hooks(hooks)
+        server.get_status()
+    with pytest.raises(supercollider.SuperColliderConnectionError):
+        server.get_status(timeout=0.02)
+    assert server.client_stats.response_timeouts == 1
+
+    # A request that is matched before its timeout is handled is not counted as timed out.
+    future = server._expect_response("/status.reply", None, command="/status")
+    server.responses.dispatch("/status.reply", (1,))
+    server._discard_timed_out(future)
+    assert server.client_stats.response_timeouts == 1
+    assert hooks.responses == [("/status.reply", "/status", RESPONSE_MATCHED),
+                               ("/status.reply", "/status", RESPONSE_TIMEOUT)]
@@ -0,0 +1,54 @@
+import urllib.request
+import supercollider
+from supercollider.metrics import StatusHistory
+
+from tests.shared import server
+
+def test_status_history():
+    history = StatusHistory(capacity=4)
+    assert history.latest() is None
+    assert history.summary("cpu_peak") is None
+
+    for n in range(6):
+        history.append({"timestamp": float(n), "cpu_peak": 10.0 * n, "messages_sent": 100.0 * n})
+    assert len(history) == 4
+    assert history.get("cpu_peak") == [20.0, 30.0, 40.0, 50.0]
+    assert history.get("cpu_peak", window=2) == [40.0, 50.0]
+    assert history.latest()["cpu_peak"] == 50.0
+    assert history.summary("cpu_peak") == {"min": 20.0, "mean": 35.0, "max": 50.0}
+    assert history.rate("messages_sent") == 100.0
+    assert history.summary("num_synths") is None
+
+def test_status_monitor(server):
+    monitor = supercollider.metrics.StatusMonitor(server, capacity=16)
+    synth = supercollider.Synth(server, "sine", {"gain": -96})
+    assert monitor.sample()
+    assert monitor.sample()
+    synth.free()
+
+    latest = monitor.history.latest()
+    assert latest["num_synths"] >= 1
+    assert latest["status_latency"] > 0
+    assert 0 < latest["messages_sent"] <= server.client_stats.messages_sent
+    assert 0 <= monitor.cpu_headroom <= 100
+
+    text = monitor.export()
+    assert 'supercollider_synths{server="127.0.0.1:%d"}' % server.client_address[1] in text
+    assert "# TYPE supercollider_messages_sent_total counter" in text
+
+    # Label values are escaped as in MessageStats.export.
+    monitor.labels = {"server": 'studio "A"\\main'}
+    assert 'supercollider_synths{server="studio \\"A\\"\\\\main"}' in monitor.export()
+
+    port = monitor.serve(port=0)
+    with urllib.request.urlopen("http://127.0.0.1:%d/metrics" % port) as response:
+        assert b"supercollider_cpu_peak_percent" in response.read()
+    monitor.stop()
+
+    samples = []
+    monitor = server.start_status_monitor(interval=0.01, callback=lambda monitor: samples.append(monitor))
+    while len(samples) < 3:
+        monitor.stopped.wait(0.01)
+    server.stop_status_monitor()
+    assert len(monitor.history) >= 3
+    assert monitor.history.rate("messages_sent") > 0
@@ -0,0 +1,47 @@
+import pytest
+import time
+import supercollider
+from supercollider.mock import MockSCSynth
+
+@pytest.fixture(scope="module")
+def mock():
+    with MockSCSynth() as mock:
+        yield mock
+
+@pytest.fixture(scope="module")
+def server(mock):
+    return supercollider.Server(port=mock.port)
+
+def test_mock_queries(mock, server):
+    assert server.get_version()["program_name"] == "scsynth"
+    synth = supercollider.Synth(server, "sine", {"freq": 440.0})
+    assert synth.get("freq") == 440.0
+    assert server.get_status()["num_synths"] == 1
+    synth.free()
+    server.sync()
+    assert server.get_status()["num_synths"] == 0
+
+def test_mock_fail(server):
+    buf = supercollider.Buffer(server, 999)
+    with pytest.raises(supercollider.SuperColliderCommandError) as excinfo:
+        buf.get_info()
+    assert excinfo.value.command == "/b_query"
+    assert excinfo.value.message == "Buffer 999 not allocated"
+
+def test_mock_notify(server):
+    future = server._expect_response("/done", ["/notify"])
+    server._send_msg("/notify", 1, timestamp=0)
+    server._await_response(future)
+
+    group = supercollider.Group(server)
+    future = server._expect_response("/n_end", [group.id])
+    group.free()
+    assert server._await_response(future)[:2] == (group.id, 0)
+
+def test_mock_scheduled(server):
+    group = supercollider.Group(server)
+    supercollider.Synth(server, "sine", target=group, timestamp=time.time() + 0.1)
+    assert server.query_tree(group)[2] == 0
+    time.sleep(0.15)
+    assert server.query_tree(group)[2] == 1
+    group.free()
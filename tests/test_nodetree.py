@@ -0,0 +1,70 @@
+import pytest
+import supercollider
+from supercollider.mock import MockSCSynth
+from supercollider.nodetree import NodeTree, parse_query_tree
+
+def test_nodetree_notifications():
+    tree = NodeTree()
+    tree.update("/n_go", (1000, 0, -1, -1, 1, -1, -1))
+    tree.update("/n_go", (1001, 1000, -1, -1, 0))
+    tree.update("/n_go", (1002, 1000, -1, 1001, 0))
+    tree.update("/n_go", (1003, 1000, 1001, -1, 0))
+    assert tree.children(1000) == [1002, 1001, 1003]
+
+    tree.update("/n_off", (1001, 1000, 1002, 1003, 0))
+    assert not tree.get(1001).is_running
+
+    tree.update("/n_move", (1002, 1000, 1003, -1, 0))
+    assert tree.children(1000) == [1001, 1003, 1002]
+
+    tree.update("/n_end", (1003, 1000, 1001, 1002, 0))
+    assert tree.children(1000) == [1001, 1002]
+    assert 1003 not in tree
+
+def test_nodetree_end_callbacks():
+    tree = NodeTree()
+    ended = []
+    tree.update("/n_go", (1000, 0, -1, -1, 1, -1, -1))
+    tree.update("/n_go", (1001, 1000, -1, -1, 0))
+    tree.add_end_callback(1001, ended.append)
+    tree.add_end_callback(1000, ended.append)
+
+    # Ending a group also ends any of its children that are still known.
+    tree.update("/n_end", (1000, 0, -1, -1, 1, 1001, 1001))
+    assert sorted(ended) == [1000, 1001]
+    assert len(tree) == 1
+    assert tree.children(0) == []
+
+def test_nodetree_parse_query_tree():
+    args = (1, 0, 2,
+            1000, 1, 1001, -1, "sine", 2, "freq", 440.0, "out", "c0",
+            1002, -1, "noise", 0)
+    snapshot = parse_query_tree(args)
+    assert [node.id for node in snapshot.root.children] == [1000, 1002]
+    assert snapshot[1000].children[0] is snapshot[1001]
+    assert snapshot[1001].controls == {"freq": 440.0, "out": "c0"}
+    assert snapshot[1001].parent_id == 1000
+    assert snapshot[1002].synthdef == "noise"
+    assert len(snapshot.synths()) == 2
+
+def test_nodetree_diff():
+    before = parse_query_tree((1, 0, 2, 1000, 0, 1001, -1, "sine", 1, "freq", 440.0))
+    after = parse_query_tree((1, 0, 1, 1000, 2, 1001, -1, "sine", 1, "freq", 880.0, 1002, -1, "sine", 1, "freq", 440.0))
+    diff = after.diff(before)
+    assert diff.added == [1002]
+    assert diff.removed == []
+    assert diff.moved == [1001]
+    assert diff.changed == {1001: {"freq": (440.0, 880.0)}}
+    assert not after.diff(after)
+
+def test_get_tree_timeout():
+    with MockSCSynth() as mock:
+        port = mock.port
+        server = supercollider.Server(port=port)
+
+    with pytest.raises(supercollider.SuperColliderConnectionError):
+        server.get_tree(max_age=60, timeout=0.02)
+
+    # A query that timed out is not returned from the cache, but queried again.
+    with MockSCSynth(port=port) as mock:
+        assert server.get_tree(max_age=60).root.id == 0
@@ -0,0 +1,15 @@
+from pythonosc.osc_message import OscMessage
+
+from supercollider.osc import encode_message
+
+def test_osc_encode_message():
+    args = [1000, "freq", 440.0, -(1 << 40), "", True, False, None, b"\x01\x02\x03"]
+    message = OscMessage(encode_message("/n_set", args))
+    assert message.address == "/n_set"
+    assert message.params == args
+
+def test_osc_encode_message_cached():
+    # Messages of the same shape share a template, but strings of differing lengths do not.
+    assert OscMessage(encode_message("/n_set", [1000, "freq", 440.0])).params == [1000, "freq", 440.0]
+    assert OscMessage(encode_message("/n_set", [1001, "amplitude", 0.5])).params == [1001, "amplitude", 0.5]
+    assert OscMessage(encode_message("/n_set", [1002, "gain", -6.0])).params == [1002, "gain", -6.0]
@@ -0,0 +1,81 @@
+import socket
+import sys
+import wave
+import pytest
+import supercollider
+from threading import Event
+
+from tests.shared import encode_synthdef
+
+# The mock server accepts scsynth's command-line arguments, so stands in for the binary.
+MOCK_BINARY = [sys.executable, "-m", "supercollider.mock"]
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def test_process_start_stop(tmp_path):
+    synthdef_path = tmp_path / "test_process.scsyndef"
+    synthdef_path.write_bytes(encode_synthdef("test_process", {"freq": 330.0}))
+    wav_path = str(tmp_path / "test_process.wav")
+    with wave.open(wav_path, "w") as fd:
+        fd.setnchannels(1)
+        fd.setsampwidth(2)
+        fd.setframerate(44100)
+        fd.writeframes(b"\x00\x00" * 100)
+
+    process = supercollider.ServerProcess(MOCK_BINARY, port=free_port(), block_size=64,
+                                          synthdefs=[str(synthdef_path)], buffers=[wav_path])
+    assert process.command[-2:] == ["-z", "64"]
+    with process as server:
+        assert process.is_running
+        assert process.startup_time < process.startup_timeout
+        synth = supercollider.Synth(server, "test_process", {})
+        assert synth.get("freq") == 330.0
+        assert process.buffers[wav_path].get_info()["num_frames"] == 100
+    assert not process.is_running
+    assert process.process.returncode == 0
+
+def test_process_restart(tmp_path):
+    synthdef_path = tmp_path / "test_restart.scsyndef"
+    synthdef_path.write_bytes(encode_synthdef("test_restart", {"freq": 330.0}))
+    wav_path = str(tmp_path / "test_restart.wav")
+    with wave.open(wav_path, "w") as fd:
+        fd.setnchannels(1)
+        fd.setsampwidth(2)
+        fd.setframerate(44100)
+        fd.writeframes(b"\x00\x00" * 100)
+
+    restarted = Event()
+    process = supercollider.ServerProcess(MOCK_BINARY, port=free_port(), restart=True,
+                                          synthdefs=[str(synthdef_path)], buffers=[wav_path],
+                                          on_restart=lambda process: restarted.set())
+    server = process.start()
+    server.enable_journal()
+    group = supercollider.Group(server)
+    prewarmed = process.buffers[wav_path]
+    server.sync()
+
+    process.process.kill()
+    assert restarted.wait(process.startup_timeout)
+    assert process.restart_count == 1
+    assert process.is_running
+    assert group.id in server.get_tree()
+
+    # Pre-warmed Buffers are read again into the same Buffer objects, and are left out of the
+    # journal, so are not also replayed.
+    assert process.buffers[wav_path] is prewarmed
+    assert prewarmed.get_info()["num_frames"] == 100
+    assert not server.journal.buffers
+    assert not server.journal.synthdefs
+    assert list(server.buffer_allocator.allocated) == [prewarmed.id]
+    assert supercollider.Buffer.alloc(server, 16).id != prewarmed.id
+    assert supercollider.Synth(server, "test_restart", {}).get("freq") == 330.0
+    process.stop()
+    assert not process.is_running
+
+def test_process_exit():
+    process = supercollider.ServerProcess([sys.executable, "-c", "print('bad option'); exit(1)"], port=free_port())
+    with pytest.raises(supercollider.SuperColliderConnectionError, match="bad option"):
+        process.start()
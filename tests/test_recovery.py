@@ -0,0 +1,193 @@
+import pytest
+import supercollider
+from threading import Event
+from supercollider.mock import MockSCSynth
+from supercollider.recovery import StateJournal
+from supercollider.synthdef import SynthDef, synthdef_cache
+
+from tests.shared import encode_synthdef
+
+def test_journal_record():
+    journal = StateJournal()
+    journal.record("/g_new", (1000, 0, 0, 1001, 1, 1000))
+    journal.record("/s_new", ("sine", 1002, 0, 1001, "freq", 440.0))
+    journal.record("/s_new", ("sine", 1003, 3, 1002, "freq", 220.0))
+    journal.record("/n_set", (1000, "gain", -6.0))
+    assert journal.nodes[1002].controls == {"freq": 440.0, "gain": -6.0}
+    assert journal.nodes[1003].parent_id == 1001
+
+    # Node notifications report each node's current parent.
+    journal.update("/n_move", (1003, 1000, 1001, -1, 0))
+    assert journal.nodes[1003].parent_id == 1000
+
+    journal.record("/g_deepFree", (1000,))
+    assert list(journal.nodes) == [1000, 1001]
+    journal.record("/n_free", (1000,))
+    assert journal.nodes == {}
+
+    journal.record("/b_alloc", (0, 1024, 2))
+    journal.record("/b_free", (0,))
+    journal.record("/c_setn", (10, 2, 0.5, 0.25))
+    assert journal.buffers == {}
+    assert journal.control_buses == {10: 0.5, 11: 0.25}
+
+def test_journal_replay():
+    with MockSCSynth() as mock:
+        port = mock.port
+        server = supercollider.Server(port=port)
+        server.enable_journal()
+
+        SynthDef.parse(encode_synthdef("test_replay", {"freq": 110.0, "gain": 0.0}))[0].send(server)
+        group = supercollider.Group(server)
+        synth = supercollider.Synth(server, "test_replay", {"freq": 220.0}, target=group)
+        synth.set("gain", -12.0)
+        freed = supercollider.Synth(server, "test_replay", {}, target=group)
+        freed.free()
+        buf = supercollider.Buffer.alloc(server, 512)
+        bus = supercollider.ControlBus(server, 1)
+        bus.set(0.75)
+        server.sync()
+        before = server.get_tree(controls=True)
+
+    # A fresh server on the same port, as after scsynth restarts
+    with MockSCSynth(port=port) as mock:
+        assert server.journal.is_missing(server.get_status())
+        server.journal.replay(server)
+
+        after = server.get_tree(controls=True)
+        assert not after.diff(before)
+        assert synth.get("gain") == -12.0
+        assert buf.get_info()["num_frames"] == 512
+        assert bus.get() == 0.75
+        assert not server.journal.is_missing(server.get_status())
+
+def test_journal_replay_freed_target():
+    with MockSCSynth() as mock:
+        port = mock.port
+        server = supercollider.Server(port=port)
+        server.enable_journal()
+
+        group = supercollider.Group(server)
+        first = supercollider.Synth(server, "sine", {}, target=group)
+        second = supercollider.Synth(server, "sine", {}, supercollider.ADD_AFTER, first)
+        third = supercollider.Synth(server, "sine", {}, supercollider.ADD_BEFORE, second)
+        first.free()
+        server.sync()
+        before = server.get_tree()
+
+    # Nodes created relative to a node that has since been freed are still rebuilt.
+    with MockSCSynth(port=port) as mock:
+        server.journal.replay(server)
+        after = server.get_tree()
+        assert not after.diff(before)
+        assert [child.id for child in after[group.id].children] == [child.id for child in before[group.id].children]
+
+def test_journal_is_missing():
+    journal = StateJournal()
+    journal.record("/d_recv", (encode_synthdef("test_missing", {"freq": 110.0}),))
+    journal.record("/g_new", (1000, 0, 0))
+
+    # SynthDefs are not counted, as a restarted server may have its default SynthDefs.
+    assert not journal.is_missing({"num_groups": 2, "num_synths": 0, "num_synthdefs": 0})
+    assert journal.is_missing({"num_groups": 1, "num_synths": 0, "num_synthdefs": 100})
+
+def test_health_monitor():
+    with MockSCSynth() as mock:
+        port = mock.port
+        server = supercollider.Server(port=port)
+        server.enable_journal()
+        group = supercollider.Group(server)
+        server.sync()
+
+        failed = Event()
+        recovered = Event()
+        server.start_health_monitor(interval=0.02, max_failures=2, timeout=0.02,
+                                    on_failure=lambda server: failed.set(),
+                                    on_recovery=lambda server: recovered.set())
+        assert server.health_monitor.check()
+        assert server.health_monitor.is_alive
+
+    assert failed.wait(2.0)
+    assert not server.health_monitor.is_alive
+
+    with MockSCSynth(port=port) as mock:
+        assert recovered.wait(2.0)
+        assert server.health_monitor.is_alive
+        assert group.id in server.get_tree()
+        server.stop_health_monitor()
+
+def test_health_monitor_stall():
+    with MockSCSynth() as mock:
+        server = supercollider.Server(port=mock.port)
+        server.enable_journal()
+        SynthDef.parse(encode_synthdef("test_stall", {"freq": 110.0}))[0].send(server)
+        group = supercollider.Group(server)
+        synth = supercollider.Synth(server, "test_stall", {}, target=group)
+        buf = supercollider.Buffer.alloc(server, 4)
+        buf.fill(4, 0.5)
+        bus = supercollider.ControlBus(server, 1)
+        bus.set(0.25)
+        server.sync()
+        monitor = supercollider.recovery.HealthMonitor(server, max_failures=2, timeout=0.02)
+
+        # The server stops replying for a while, but does not restart.
+        with mock.lock:
+            assert not monitor.check()
+            assert not monitor.check()
+        assert not monitor.is_alive
+        server.sync()
+
+        # Its state is intact, so the journal is not replayed over it.
+        bus.set(0.75)
+        server.sync()
+        assert monitor.check()
+        assert monitor.is_alive
+        assert server.journal.last_replay is None
+        assert list(buf.get(0, 4)) == [0.5] * 4
+        assert bus.get() == 0.75
+
+def test_health_monitor_buffers():
+    with MockSCSynth() as mock:
+        port = mock.port
+        server = supercollider.Server(port=port)
+        server.enable_journal()
+        buf = supercollider.Buffer.alloc(server, 512)
+        kept = supercollider.Buffer.alloc(server, 256)
+        monitor = supercollider.recovery.HealthMonitor(server, max_failures=1, timeout=0.02)
+
+    assert not monitor.check()
+
+    # A restarted server with no nodes in the journal is found to have lost its Buffers.
+    # Any Buffer that it does hold is not allocated again.
+    with MockSCSynth(port=port) as mock:
+        mock.buffers[kept.id] = supercollider.mock.MockBuffer(256, 1, 44100.0)
+        mock.buffers[kept.id].samples[0] = 0.5
+        assert monitor.check()
+        assert server.journal.last_replay is not None
+        assert buf.get_info()["num_frames"] == 512
+        assert list(kept.get(0, 1)) == [0.5]
+
+def test_health_monitor_synthdef_cache():
+    synthdef = SynthDef.parse(encode_synthdef("test_cache", {"freq": 110.0}))[0]
+    with MockSCSynth() as mock:
+        port = mock.port
+        server = supercollider.Server(port=port)
+        synthdef.send(server)
+        assert synthdef_cache.contains(server, synthdef)
+
+        failed = Event()
+        recovered = Event()
+        server.start_health_monitor(interval=0.02, max_failures=2, timeout=0.02,
+                                    on_failure=lambda server: failed.set(),
+                                    on_recovery=lambda server: recovered.set())
+
+    assert failed.wait(2.0)
+
+    # The restarted server has default SynthDefs, but not those sent before the restart.
+    with MockSCSynth(port=port) as mock:
+        mock.add_synthdef("default", {"freq": 440.0})
+        mock.add_synthdef("sine", {"freq": 440.0})
+        assert recovered.wait(2.0)
+        assert SynthDef.send_many(server, [synthdef]) == [synthdef]
+        assert "test_cache" in mock.synthdefs
+        server.stop_health_monitor()
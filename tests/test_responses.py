@@ -0,0 +1,81 @@
+import pytest
+from concurrent.futures import Future
+
+from supercollider.exceptions import SuperColliderCommandError
+from supercollider.responses import ResponseTable, RoundTripEstimator
+
+def test_responses_match_args():
+    table = ResponseTable()
+    future_a = Future()
+    future_b = Future()
+    table.add("/n_set", [1000, "freq"], future_a)
+    table.add("/n_set", [1001, "freq"], future_b)
+
+    assert table.dispatch("/n_set", (1001, "freq", 880.0))
+    assert future_b.result(0) == (1001, "freq", 880.0)
+    assert not future_a.done()
+
+    assert not table.dispatch("/n_set", (1002, "freq", 220.0))
+    assert table.dispatch("/n_set", (1000, "freq", 440.0))
+    assert future_a.result(0) == (1000, "freq", 440.0)
+    assert len(table) == 0
+
+def test_responses_fifo_and_callback():
+    table = ResponseTable()
+    futures = [Future() for _ in range(3)]
+    for future in futures:
+        table.add("/status.reply", None, future, lambda address, *args: args[1])
+    for n in range(3):
+        table.dispatch("/status.reply", (1, n))
+    assert [future.result(0) for future in futures] == [0, 1, 2]
+
+def test_responses_discard():
+    table = ResponseTable()
+    future = Future()
+    table.add("/done", ["/b_alloc", 0], future)
+    table.discard(future)
+    assert len(table) == 0
+    assert not table.dispatch("/done", ("/b_alloc", 0))
+
+def test_responses_fail():
+    table = ResponseTable()
+    future_a = Future()
+    future_b = Future()
+    table.add("/done", ["/b_allocRead", 0], future_a, command="/b_allocRead")
+    table_entry_b = table.add("/done", ["/b_allocRead", 1], future_b, command="/b_allocRead")
+
+    # The buffer number in the /fail reply identifies the failed request.
+    assert table.fail("/b_allocRead", "File could not be opened", (1,)) == [table_entry_b]
+    with pytest.raises(SuperColliderCommandError):
+        future_b.result(0)
+    assert not future_a.done()
+    assert not table.fail("/b_alloc", "Invalid buffer")
+    assert table.dispatch("/done", ("/b_allocRead", 0))
+    assert len(table) == 0
+    assert not table.commands
+
+def test_responses_fail_node():
+    table = ResponseTable()
+    futures = [Future() for _ in range(3)]
+    for node_id, future in zip([1000, 1001, 1002], futures):
+        table.add("/n_set", [node_id, "freq"], future, command="/s_get")
+
+    # The node ID in the error message identifies the failed request.
+    assert len(table.fail("/s_get", "Node 1001 not found")) == 1
+    assert [future.done() for future in futures] == [False, True, False]
+
+    # A /fail that does not identify a request fails all requests for the command.
+    assert len(table.fail("/s_get", "Invalid arguments")) == 2
+    for future in futures:
+        with pytest.raises(SuperColliderCommandError):
+            future.result(0)
+    assert len(table) == 0
+
+def test_responses_round_trip():
+    estimator = RoundTripEstimator()
+    assert estimator.timeout is None
+    for _ in range(100):
+        estimator.update(0.002)
+    assert estimator.timeout == pytest.approx(0.002, abs=1e-4)
+    estimator.update(0.01)
+    assert estimator.timeout > 0.01
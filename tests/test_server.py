@@ -1,5 +1,9 @@
+import time
 import pytest
 import supercollider
+from concurrent.futures import ThreadPoolExecutor
+from supercollider import globals
+from supercollider.instrumentation import Hooks
 
 from tests.shared import SC_DUMMY_PORT, SC_REAL_PORT
 
@@ -38,3 +42,77 @@ def test_server_get_version(server):
     assert isinstance(rv["version_patch"], str)
     assert isinstance(rv["git_branch"], str)
     assert isinstance(rv["commit_hash"], str)
+
+def test_server_concurrent_queries(server):
+    synth = supercollider.Synth(server, "sine", {"freq": 440.0, "gain": -96})
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: synth.get("freq"), range(64)))
+    assert results == [440.0] * 64
+    synth.free()
+
+def test_server_independent_resources(server):
+    other = supercollider.Server(port=SC_REAL_PORT)
+    other.response_timeout = 1.0
+    assert server.response_timeout == 0.25
+    bus1 = supercollider.ControlBus(other, 2)
+    bus2 = supercollider.ControlBus(other, 2)
+    assert server.control_bus_allocator.num_free == server.control_bus_allocator.capacity
+    assert bus2.id == bus1.id + 2
+
+def test_server_auto_bundle_latency():
+    server = supercollider.Server(port=SC_REAL_PORT, latency=0.05)
+    server.set_auto_bundle(0.05)
+    datagrams_sent = server.client_stats.datagrams_sent
+    synths = [supercollider.Synth(server, "sine", {"gain": -96}) for _ in range(8)]
+    server.set_auto_bundle(None)
+    # Messages queued within one flush window share a timetag, so are sent in one bundle.
+    assert server.client_stats.datagrams_sent == datagrams_sent + 1
+    for synth in synths:
+        synth.free()
+    server.sync()
+
+def test_server_receive_thread_query(server):
+    # Waiting for a reply on the receiving thread fails immediately, rather than timing out.
+    errors = []
+
+    class _Hooks(Hooks):
+        def on_receive(self, address, size, timestamp):
+            server.remove_hooks(self)
+            try:
+                server.get_status()
+            except RuntimeError as e:
+                errors.append(e)
+
+    server.add_hooks(_Hooks())
+    server.sync()
+    assert len(errors) == 1
+
+def test_server_late_reply(server):
+    # Fast replies bring the adaptive timeout down to its floor.
+    for _ in range(20):
+        server.get_status()
+    assert server.query_timeout == globals.MIN_RESPONSE_TIMEOUT
+
+    # A reply that is held up beyond the timeout, but within the grace period, is still matched.
+    future = server._expect_response("/status.reply", None, command="/status")
+    server._send_msg("/status", timestamp=time.time() + 0.03)
+    assert server._await_response(future)
+
+    # While other replies are received, a held-up reply is awaited for up to response_timeout.
+    future = server._expect_response("/c_set", [0], command="/c_get")
+    server._send_msg("/c_get", 0, timestamp=time.time() + 0.1)
+    server.get_status()
+    assert server._await_response(future)
+
+def test_server_fast_failure(server):
+    for _ in range(20):
+        server.get_status()
+    assert server.query_timeout == globals.MIN_RESPONSE_TIMEOUT
+
+    # A reply that never arrives fails the query after its timeout and one grace period,
+    # well before response_timeout.
+    future = server._expect_response("/status.reply", None, command="/status")
+    t0 = time.perf_counter()
+    with pytest.raises(supercollider.SuperColliderConnectionError):
+        server._await_response(future)
+    assert time.perf_counter() - t0 < server.response_timeout
@@ -0,0 +1,30 @@
+import supercollider
+from supercollider.allocators import NodeIDAllocator
+from supercollider.serverpool import RoundRobinPolicy
+
+from tests.shared import server, SC_REAL_PORT
+
+def test_server_pool(server):
+    # Two clients of the same scsynth, with distinct node ID ranges.
+    other = supercollider.Server(port=SC_REAL_PORT)
+    other.node_id_allocator = NodeIDAllocator(100000)
+
+    pool = supercollider.ServerPool([server, other], RoundRobinPolicy())
+    synths = [pool.synth("sine", {"freq": 440.0, "gain": -96}) for _ in range(4)]
+    assert [synth.server for synth in synths] == [server, other, server, other]
+    synths[1].set("freq", 880.0)
+    assert synths[1].get("freq") == 880.0
+
+    status = pool.get_status()
+    assert status["num_servers"] == 2
+    assert status["num_synths"] >= 8
+
+    for synth in synths:
+        synth.free()
+
+def test_server_pool_least_loaded(server):
+    pool = supercollider.ServerPool([server])
+    group = pool.group()
+    synth = pool.synth("sine", {"gain": -96}, target=group)
+    assert synth.server is server
+    group.free()
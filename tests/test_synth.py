@@ -1,3 +1,4 @@
+import time
 import pytest
 import supercollider
 from threading import Event
@@ -31,6 +32,39 @@ def test_synth_get_nonblocking(server):
     assert rv == 440.0
     synth.free()
 
+def test_synth_get_nonblocking_future(server):
+    synth = supercollider.Synth(server, "sine", {"freq": 440.0, "gain": -24})
+    num_handlers = len(server.dispatcher._map.get("/n_set", []))
+    futures = [synth.get("freq", blocking=False) for _ in range(100)]
+    assert [future.result(1.0) for future in futures] == [440.0] * 100
+
+    # Replies are routed through the response table, so no handlers are added,
+    # and none remain pending.
+    assert len(server.dispatcher._map.get("/n_set", [])) == num_handlers
+    assert len(server.responses) == 0
+    synth.free()
+
+    # A query of a node that does not exist fails when the server replies with /fail.
+    future = synth.get("freq", blocking=False)
+    with pytest.raises(supercollider.SuperColliderCommandError):
+        future.result(1.0)
+    assert len(server.responses) == 0
+
+def test_synth_get_invalid(server):
+    synth = supercollider.Synth(server, "sine", {"freq": 440.0, "gain": -24})
+    missing = supercollider.Synth(server, "sine", {"freq": 880.0, "gain": -24})
+    missing.free()
+
+    # Only the query of the missing node fails, although the other is still pending: its
+    # reply is held up until after the /fail.
+    future = server._expect_response("/n_set", [synth.id, "freq"], lambda _, *args: args[2], command="/s_get")
+    server._send_msg("/s_get", synth.id, "freq", timestamp=time.time() + 0.05)
+    future_missing = missing.get("freq", blocking=False)
+    with pytest.raises(supercollider.SuperColliderCommandError):
+        future_missing.result(1.0)
+    assert future.result(1.0) == 440.0
+    synth.free()
+
 def test_synth_actions(server):
     group = supercollider.Group(server)
 
@@ -64,3 +98,102 @@ def test_synth_actions(server):
     assert tree[9] == synth4.id
 
     group.free()
+
+def test_synth_bundle(server):
+    group = supercollider.Group(server)
+    with server.bundle():
+        synths = [supercollider.Synth(server, "sine", {"gain": -96}, target=group) for _ in range(50)]
+    tree = server.query_tree(group)
+    assert tree[2] == 50
+    assert tree[3] == synths[-1].id
+    group.free()
+
+def test_synth_scheduled(server):
+    synth = supercollider.Synth(server, "sine", {"freq": 440.0, "gain": -96})
+    synth.set("freq", 880.0, timestamp=time.time() + 0.2)
+    assert synth.get("freq") == 440.0
+    time.sleep(0.3)
+    assert synth.get("freq") == 880.0
+    synth.free()
+
+def test_synth_set_multiple(server):
+    synths = [supercollider.Synth(server, "sine", {"freq": 440.0, "gain": -96}) for _ in range(4)]
+    synths[0].set({"freq": 880.0, "gain": -90})
+    assert synths[0].get("freq") == 880.0
+    assert synths[0].get("gain") == -90
+
+    server.set_nodes({synth: {"freq": 220.0 * (n + 1)} for n, synth in enumerate(synths)})
+    assert [synth.get("freq") for synth in synths] == [220.0, 440.0, 660.0, 880.0]
+    for synth in synths:
+        synth.free()
+
+def test_synth_notify(server):
+    server.notify()
+    synth = supercollider.Synth(server, "sine", {"gain": -96})
+    ended = []
+    event = Event()
+    synth.on_end(lambda node_id: (ended.append(node_id), event.set()))
+    server.sync()
+    assert synth.is_playing
+    assert synth.is_running
+    synth.free()
+    server.sync()
+    assert not synth.is_playing
+    assert event.wait(1.0)
+    assert ended == [synth.id]
+    server.notify(False)
+
+def test_synth_callback_query(server):
+    # Callbacks are called from the callback thread, so can themselves wait for replies.
+    server.notify()
+    synth = supercollider.Synth(server, "sine", {"freq": 440.0, "gain": -96})
+    other = supercollider.Synth(server, "sine", {"freq": 220.0, "gain": -96})
+    results = []
+    event = Event()
+
+    def _on_end(node_id):
+        results.append(other.get("freq"))
+        other.get("freq", callback=lambda value: (results.append(value), event.set()), blocking=False)
+
+    synth.on_end(_on_end)
+    synth.free()
+    assert event.wait(1.0)
+    assert results == [220.0, 220.0]
+    other.free()
+    server.notify(False)
+
+def test_synth_get_tree(server):
+    group = supercollider.Group(server)
+    synth = supercollider.Synth(server, "sine", {"freq": 440.0, "gain": -96}, target=group)
+    tree = server.get_tree(group, controls=True)
+    assert tree.root.children[0].id == synth.id
+    assert tree[synth.id].controls["freq"] == 440.0
+
+    assert server.get_tree(group, controls=True, max_age=60) is tree
+    synth.set("freq", 880.0)
+    diff = server.get_tree(group, controls=True).diff(tree)
+    assert diff.changed == {synth.id: {"freq": (440.0, 880.0)}}
+    group.free()
+
+def test_synth_map(server):
+    synth = supercollider.Synth(server, "sine", {"freq": 440.0, "gain": -96})
+    control_bus = supercollider.ControlBus(server, 1)
+    audio_bus = supercollider.AudioBus(server, 1)
+    synth.map({"freq": control_bus, "gain": audio_bus})
+    controls = server.get_tree(controls=True)[synth.id].controls
+    assert controls["freq"] == "c%d" % control_bus.id
+    assert controls["gain"] == "a%d" % audio_bus.id
+
+    synth.unmap(["freq", "gain"])
+    controls = server.get_tree(controls=True)[synth.id].controls
+    assert controls["freq"] == 440.0
+    synth.free()
+    control_bus.free()
+    audio_bus.free()
+
+def test_synth_get_timeout(server):
+    synth = supercollider.Synth(server, "sine", {"freq": 440.0, "gain": -96})
+    assert synth.get("freq", timeout=1.0) == 440.0
+    assert server.round_trip.num_samples > 0
+    assert server.query_timeout <= server.command_timeout
+    synth.free()
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import pytest
+import supercollider
+from supercollider.synthdef import SynthDef, encode_synthdefs, synthdef_cache
+
+from tests.shared import server, encode_synthdef
+
+def test_synthdef_parse():
+    data = encode_synthdef("test_parse", {"freq": 440.0, "gain": -6.0})
+    synthdef, = SynthDef.parse(data)
+    assert synthdef.name == "test_parse"
+    assert synthdef.version == 2
+    assert synthdef.controls == {"freq": 440.0, "gain": -6.0}
+    assert synthdef.data == data
+
+    synthdef, = SynthDef.parse(encode_synthdef("test_parse_v1", {"freq": 220.0}, version=1))
+    assert synthdef.name == "test_parse_v1"
+    assert synthdef.controls == {"freq": 220.0}
+
+    synthdefs = [SynthDef.parse(encode_synthdef("test_parse_%d" % n, {"freq": n}))[0] for n in range(3)]
+    parsed = SynthDef.parse(encode_synthdefs(synthdefs))
+    assert [synthdef.name for synthdef in parsed] == ["test_parse_0", "test_parse_1", "test_parse_2"]
+    assert [synthdef.hash for synthdef in parsed] == [synthdef.hash for synthdef in synthdefs]
+
+    with pytest.raises(ValueError):
+        SynthDef.parse(b"RIFF0000")
+
+def test_synthdef_send(server):
+    synthdef_cache.clear()
+    synthdefs = [SynthDef.parse(encode_synthdef("test_send_%d" % n, {"freq": 100.0 + n}))[0] for n in range(200)]
+    assert len(SynthDef.send_many(server, synthdefs)) == 200
+
+    synth = supercollider.Synth(server, "test_send_5", {})
+    assert synth.get("freq") == 105.0
+    synth.free()
+
+    # Unchanged SynthDefs are not resent, including after reconnecting
+    assert SynthDef.send_many(server, synthdefs) == []
+    reconnected = supercollider.Server(port=server.client_address[1])
+    assert SynthDef.send_many(reconnected, synthdefs) == []
+
+    changed = SynthDef.parse(encode_synthdef("test_send_5", {"freq": 500.0}))[0]
+    assert SynthDef.send_many(server, synthdefs + [changed]) == [changed]
+    assert len(SynthDef.send_many(server, synthdefs[:3], force=True)) == 3
+
+def test_synthdef_load_dir(server):
+    synthdef_cache.clear()
+    with tempfile.TemporaryDirectory() as path:
+        for n in range(3):
+            with open(os.path.join(path, "test_load_%d.scsyndef" % n), "wb") as fd:
+                fd.write(encode_synthdef("test_load_%d" % n, {"freq": 300.0 + n}))
+        SynthDef.load_dir(server, path)
+        SynthDef.load(server, os.path.join(path, "test_load_0.scsyndef"))
+
+        synthdefs = SynthDef.read(os.path.join(path, "test_load_2.scsyndef"))
+        assert SynthDef.send_many(server, synthdefs) == []
+
+    synth = supercollider.Synth(server, "test_load_2", {})
+    assert synth.get("freq") == 302.0
+    synth.free()
+
+    with pytest.raises(supercollider.SuperColliderCommandError):
+        SynthDef.load_dir(server, "/nonexistent/synthdefs")
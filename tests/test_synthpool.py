@@ -0,0 +1,54 @@
+import supercollider
+from supercollider.synthpool import QuietestVoicePolicy, RoundRobinVoicePolicy
+
+from tests.shared import server
+
+def test_synth_pool(server):
+    pool = supercollider.SynthPool(server, "sine", 4, {"gain": -96})
+    tree = server.query_tree(pool.group)
+    assert tree[2] == 4
+
+    synths = [pool.allocate({"freq": 440.0 + n}) for n in range(4)]
+    assert pool.num_active == 4
+    assert len(set(synth.id for synth in synths)) == 4
+    assert synths[2].get("freq") == 442.0
+
+    # All voices are in use, so the oldest is stolen.
+    synth = pool.allocate({"freq": 880.0})
+    assert synth.id == synths[0].id
+    assert synth.get("freq") == 880.0
+
+    pool.release(synths[1])
+    assert pool.num_active == 3
+    assert pool.allocate().id == synths[1].id
+
+    # Voices are reused rather than created.
+    assert server.query_tree(pool.group)[2] == 4
+    pool.free()
+
+def test_synth_pool_policies(server):
+    pool = supercollider.SynthPool(server, "sine", 3, {"gain": -96}, policy=QuietestVoicePolicy("gain"))
+    synths = [pool.allocate({"gain": gain}) for gain in [-12, -48, -24]]
+    assert pool.allocate({"gain": -6}).id == synths[1].id
+    pool.free()
+
+    pool = supercollider.SynthPool(server, "sine", 2, {"gain": -96}, policy=RoundRobinVoicePolicy(), gate="gate")
+    synths = [pool.allocate() for _ in range(2)]
+    assert [pool.allocate().id for _ in range(2)] == [synth.id for synth in synths]
+    pool.free()
+
+def test_synth_pool_stale_release(server):
+    pool = supercollider.SynthPool(server, "sine", 1, {"gain": -96}, gate="gate")
+    first = pool.allocate({"freq": 440.0})
+    second = pool.allocate({"freq": 880.0})
+    assert second.id == first.id
+
+    # The voice was stolen, so releasing it through the previous allocation has no effect.
+    pool.release(first)
+    assert pool.num_active == 1
+    assert second.get("gate") == 1
+
+    pool.release(second)
+    assert pool.num_active == 0
+    assert second.get("gate") == 0
+    pool.free()